@@ -0,0 +1,7 @@
+"""
+Antifraude - código compartilhado pelos exemplos de API de fraude
+=================================================================
+
+Os exemplos de cada bloco continuam independentes (cada um tem seu
+main.py), mas as regras de negócio vivem aqui, em um único lugar.
+"""
@@ -0,0 +1,28 @@
+"""
+Autorização dos Endpoints de Administração
+==========================================
+
+Endpoints de diagnóstico (perfil de CPU, memória) e de operação (troca
+do modelo, releitura da configuração) só respondem com o header
+X-Admin-Token igual ao ADMIN_TOKEN configurado. Sem ADMIN_TOKEN
+configurado, todas as chamadas são recusadas.
+"""
+
+import secrets
+from typing import Callable, Optional
+
+from fastapi import Header, HTTPException
+
+
+def exigir_admin(token_esperado: Optional[str]) -> Callable[..., None]:
+    """Cria a dependência FastAPI que confere o X-Admin-Token"""
+
+    def verificar(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")) -> None:
+        if not token_esperado:
+            raise HTTPException(status_code=403, detail="ADMIN_TOKEN não configurado")
+        if x_admin_token is None or not secrets.compare_digest(
+            x_admin_token.encode("utf-8"), token_esperado.encode("utf-8")
+        ):
+            raise HTTPException(status_code=403, detail="X-Admin-Token inválido")
+
+    return verificar
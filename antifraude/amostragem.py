@@ -0,0 +1,161 @@
+"""
+Amostragem e Limite de Taxa por Evento de Log
+=============================================
+
+Eventos de alto volume (transaction_received, transaction_approved)
+não precisam ser todos registrados; eventos raros e importantes
+(fraud_detected) sim.
+
+- Taxa de amostragem por evento: 0.01 = registra ~1% dos eventos
+- Limite por evento em registros/segundo (token bucket, rajada de 1s)
+- Eventos sem configuração usam taxa_padrao (1.0 = todos) e não têm limite
+
+A configuração é trocada inteira e de forma atômica (configurar), então
+pode mudar em tempo de execução sem reiniciar a API.
+
+Formato texto (variáveis de ambiente LOG_SAMPLING / LOG_RATE_LIMIT):
+    "transaction_approved=0.01,transaction_received=0.1"
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+
+def ler_config(texto: Optional[str]) -> Dict[str, float]:
+    """Converte "evento=valor,evento=valor" em dicionário"""
+    config: Dict[str, float] = {}
+    for item in (texto or "").split(","):
+        if not item.strip():
+            continue
+        evento, separador, valor = item.partition("=")
+        if not separador or not evento.strip():
+            raise ValueError(f"Item inválido {item!r}: use evento=valor")
+        try:
+            config[evento.strip()] = float(valor)
+        except ValueError:
+            raise ValueError(f"Valor inválido para {evento.strip()!r}: {valor!r}") from None
+    return config
+
+
+@dataclass(frozen=True)
+class ConfigAmostragem:
+    """Configuração imutável: trocada inteira, nunca alterada no lugar"""
+    taxas: Mapping[str, float] = field(default_factory=dict)
+    limites: Mapping[str, float] = field(default_factory=dict)  # registros/segundo
+    taxa_padrao: float = 1.0
+
+    def __post_init__(self):
+        for evento, taxa in {**self.taxas, "taxa_padrao": self.taxa_padrao}.items():
+            if not 0.0 <= taxa <= 1.0:
+                raise ValueError(f"Taxa de amostragem de {evento!r} deve estar entre 0 e 1: {taxa}")
+        for evento, limite in self.limites.items():
+            if limite <= 0:
+                raise ValueError(f"Limite de {evento!r} deve ser positivo: {limite}")
+
+
+class _Balde:
+    """Token bucket de um evento"""
+
+    __slots__ = ("tokens", "atualizado_em")
+
+    def __init__(self, tokens: float, agora: float):
+        self.tokens = tokens
+        self.atualizado_em = agora
+
+
+class AmostragemEventos:
+    """Decide, por evento, se um registro de log deve ser emitido"""
+
+    def __init__(
+        self,
+        config: Optional[ConfigAmostragem] = None,
+        aleatorio: Callable[[], float] = random.random,
+        relogio: Callable[[], float] = time.monotonic,
+    ):
+        self.aleatorio = aleatorio
+        self.relogio = relogio
+        self._config = config or ConfigAmostragem()
+        self._baldes: Dict[str, _Balde] = {}
+        self._lock = threading.Lock()  # só protege os baldes e contadores
+        self._amostrados_fora: Dict[str, int] = {}
+        self._limitados: Dict[str, int] = {}
+
+    @property
+    def config(self) -> ConfigAmostragem:
+        return self._config
+
+    def configurar(
+        self,
+        taxas: Optional[Mapping[str, float]] = None,
+        limites: Optional[Mapping[str, float]] = None,
+        taxa_padrao: Optional[float] = None,
+    ) -> ConfigAmostragem:
+        """Troca a configuração; campos None mantêm o valor atual"""
+        atual = self._config
+        nova = ConfigAmostragem(
+            taxas=dict(atual.taxas if taxas is None else taxas),
+            limites=dict(atual.limites if limites is None else limites),
+            taxa_padrao=atual.taxa_padrao if taxa_padrao is None else taxa_padrao,
+        )
+        with self._lock:
+            self._config = nova  # troca de referência: atômica
+            self._baldes.clear()  # limites novos começam com o balde cheio
+        return nova
+
+    def permitir(self, evento: str) -> bool:
+        """True se o registro do evento deve ser emitido"""
+        config = self._config
+        taxa = config.taxas.get(evento, config.taxa_padrao)
+        limite = config.limites.get(evento)
+
+        # Caminho rápido: evento sem amostragem nem limite (sem lock)
+        if taxa >= 1.0 and limite is None:
+            return True
+
+        if taxa < 1.0 and self.aleatorio() >= taxa:
+            with self._lock:
+                self._amostrados_fora[evento] = self._amostrados_fora.get(evento, 0) + 1
+            return False
+
+        if limite is None:
+            return True
+
+        agora = self.relogio()
+        with self._lock:
+            # ⚠️ Capacidade mínima de 1 registro: com limite < 1/s o balde
+            # nunca chegaria a 1 token e o evento sumiria de vez
+            capacidade = max(1.0, limite)
+            balde = self._baldes.get(evento)
+            if balde is None:
+                balde = self._baldes[evento] = _Balde(capacidade, agora)
+            else:
+                balde.tokens = min(capacidade, balde.tokens + (agora - balde.atualizado_em) * limite)
+                balde.atualizado_em = agora
+            if balde.tokens >= 1.0:
+                balde.tokens -= 1.0
+                return True
+            self._limitados[evento] = self._limitados.get(evento, 0) + 1
+            return False
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Configuração atual + registros suprimidos por evento"""
+        config = self._config
+        with self._lock:
+            amostrados_fora = dict(self._amostrados_fora)
+            limitados = dict(self._limitados)
+        eventos: List[str] = sorted(set(amostrados_fora) | set(limitados))
+        return {
+            "taxa_padrao": config.taxa_padrao,
+            "taxas": dict(config.taxas),
+            "limites": dict(config.limites),
+            "suprimidos": {
+                evento: {
+                    "amostrados_fora": amostrados_fora.get(evento, 0),
+                    "limitados": limitados.get(evento, 0),
+                }
+                for evento in eventos
+            },
+        }
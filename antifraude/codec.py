@@ -0,0 +1,95 @@
+"""
+Codec Rápido para Endpoints FastAPI (opt-in)
+============================================
+
+Caminho padrão do FastAPI para um POST com body Pydantic:
+    bytes -> json.loads -> dict -> validação -> endpoint
+    -> validação de novo (response_model) -> jsonable_encoder -> json.dumps
+
+Com RotaCodecRapido:
+    bytes -> validate_json (parser em Rust do pydantic-core, valida os
+    Field: gt=0, ge=0, le=23...) -> endpoint -> dump_json (bytes prontos,
+    sem revalidar a resposta)
+
+A assinatura do endpoint não muda, então o schema OpenAPI é o mesmo.
+Rotas que não se encaixam (formulário, vários bodies, body "embed")
+usam o caminho padrão.
+"""
+
+import asyncio
+import copy
+
+from fastapi import params
+from fastapi.dependencies.utils import solve_dependencies
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute, run_endpoint_function
+from pydantic import TypeAdapter, ValidationError
+from starlette.requests import Request
+from starlette.responses import Response
+from typing_extensions import Annotated
+
+
+class RotaCodecRapido(APIRoute):
+    """APIRoute que decodifica o body e serializa a resposta direto em bytes"""
+
+    def get_route_handler(self):
+        campos_body = self.dependant.body_params
+        if (
+            len(campos_body) != 1
+            or isinstance(campos_body[0].field_info, params.Form)
+            or getattr(campos_body[0].field_info, "embed", False)
+        ):
+            return super().get_route_handler()
+
+        campo = campos_body[0]
+        # Mesmas restrições do body original (Field, min_length, ...)
+        entrada = TypeAdapter(Annotated[campo.field_info.annotation, campo.field_info])
+        saida = TypeAdapter(self.response_model) if self.response_model is not None else None
+
+        # Dependências sem o body: headers, Request etc. continuam resolvidos pelo FastAPI
+        sem_body = copy.copy(self.dependant)
+        sem_body.body_params = []
+
+        dependant = self.dependant
+        e_corrotina = asyncio.iscoroutinefunction(dependant.call)
+        status_code = self.status_code
+        overrides = self.dependency_overrides_provider
+
+        async def app(request: Request) -> Response:
+            corpo = await request.body()
+            try:
+                valor = entrada.validate_json(corpo)
+            except ValidationError as e:
+                erros = [{**erro, "loc": ("body", *erro["loc"])} for erro in e.errors()]
+                raise RequestValidationError(erros, body=corpo)
+
+            valores, erros, tarefas, sub_resposta, _ = await solve_dependencies(
+                request=request,
+                dependant=sem_body,
+                dependency_overrides_provider=overrides,
+            )
+            if erros:
+                raise RequestValidationError(erros)
+            valores[campo.name] = valor
+
+            bruto = await run_endpoint_function(dependant=dependant, values=valores, is_coroutine=e_corrotina)
+            if isinstance(bruto, Response):
+                if bruto.background is None:
+                    bruto.background = tarefas
+                return bruto
+
+            if saida is not None:
+                conteudo = saida.dump_json(bruto, warnings=False)
+            else:
+                conteudo = TypeAdapter(type(bruto)).dump_json(bruto)
+
+            resposta = Response(
+                content=conteudo,
+                status_code=sub_resposta.status_code or status_code or 200,
+                media_type="application/json",
+                background=tarefas,
+            )
+            resposta.headers.raw.extend(sub_resposta.headers.raw)
+            return resposta
+
+        return app
@@ -0,0 +1,183 @@
+"""
+Configuração Recarregável (.env sem reiniciar)
+==============================================
+
+Mudar o FRAUD_THRESHOLD não deveria exigir um restart (que joga fora
+modelo aquecido, caches e conexões). O GerenciadorConfiguracao:
+
+- Monta um snapshot IMUTÁVEL (ex.: dataclass frozen) a partir do .env
+- Observa o arquivo (mtime) e também recarrega com SIGHUP ou recarregar()
+- Valida antes de trocar: se construir() levantar erro, o snapshot atual
+  continua valendo e o erro vai para o log
+- Troca por atribuição de referência: quem lê `gerenciador.atual` não
+  precisa de lock (pegue o snapshot UMA vez por requisição)
+- Loga cada recarga com os valores antigos e novos
+
+Variáveis definidas de verdade no ambiente (export, docker -e) continuam
+valendo sobre o .env, como no load_dotenv().
+
+⚠️ Só o que está no snapshot é recarregável; o resto continua sendo lido
+uma vez na inicialização.
+"""
+
+import logging
+import os
+import signal
+import threading
+import time
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, Mapping, Optional, Sequence, Tuple, TypeVar
+
+from dotenv import dotenv_values
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _campos(snapshot: Any) -> Dict[str, Any]:
+    return asdict(snapshot) if is_dataclass(snapshot) else dict(vars(snapshot))
+
+
+def diferencas(anterior: Any, novo: Any) -> Dict[str, Tuple[Any, Any]]:
+    """Campos que mudaram: {campo: (antigo, novo)}"""
+    antes, depois = _campos(anterior), _campos(novo)
+    return {campo: (antes.get(campo), valor) for campo, valor in depois.items() if antes.get(campo) != valor}
+
+
+class GerenciadorConfiguracao(Generic[T]):
+    """Snapshot imutável da configuração, trocado atomicamente a cada recarga"""
+
+    def __init__(
+        self,
+        arquivo: str,
+        construir: Callable[[Mapping[str, str]], T],
+        ao_mudar: Sequence[Callable[[T, T], None]] = (),
+        intervalo: float = 2.0,
+    ):
+        self.arquivo = Path(arquivo)
+        self.construir = construir
+        self.ao_mudar = list(ao_mudar)
+        self.intervalo = intervalo
+        # Variáveis que não vieram do .env (o load_dotenv não sobrescreve)
+        do_arquivo = self._ler_arquivo()
+        self._ambiente = {k: v for k, v in os.environ.items() if do_arquivo.get(k) != v}
+        self._assinatura = self._assinatura_arquivo()
+        self._atual: T = construir(self._valores(do_arquivo))  # erro aqui = não sobe
+        self._lock = threading.Lock()  # serializa recargas, nunca as leituras
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._recargas = 0
+        self._rejeitadas = 0
+        self._ultima_recarga: Optional[float] = None
+        self._ultimo_erro: Optional[str] = None
+
+    @property
+    def atual(self) -> T:
+        return self._atual
+
+    def _ler_arquivo(self) -> Dict[str, str]:
+        if not self.arquivo.is_file():
+            return {}
+        return {k: v for k, v in dotenv_values(self.arquivo).items() if v is not None}
+
+    def _valores(self, do_arquivo: Mapping[str, str]) -> Dict[str, str]:
+        return {**do_arquivo, **self._ambiente}
+
+    def _assinatura_arquivo(self) -> Optional[Tuple[int, int]]:
+        try:
+            estado = self.arquivo.stat()
+        except OSError:
+            return None
+        return estado.st_mtime_ns, estado.st_size
+
+    def recarregar(self, motivo: str = "manual") -> Dict[str, Any]:
+        """
+        Relê o arquivo, valida e troca o snapshot.
+
+        Se a validação ou um callback ao_mudar falhar, o snapshot anterior
+        é mantido (ou restaurado) e o erro sobe para quem chamou.
+        """
+        with self._lock:
+            self._assinatura = self._assinatura_arquivo()
+            anterior = self._atual
+            try:
+                novo = self.construir(self._valores(self._ler_arquivo()))
+                mudancas = diferencas(anterior, novo)
+                if mudancas:
+                    self._atual = novo  # troca de referência: atômica
+                    for callback in self.ao_mudar:
+                        callback(anterior, novo)
+            except Exception as e:
+                self._atual = anterior
+                self._rejeitadas += 1
+                self._ultimo_erro = f"{type(e).__name__}: {e}"
+                logger.error("Recarga de configuração rejeitada (%s): %s", motivo, self._ultimo_erro)
+                raise
+
+            self._recargas += 1
+            self._ultima_recarga = time.time()
+            self._ultimo_erro = None
+
+        if mudancas:
+            logger.warning(
+                "Configuração recarregada (%s): %s",
+                motivo,
+                ", ".join(f"{campo}: {antes!r} -> {depois!r}" for campo, (antes, depois) in mudancas.items()),
+            )
+        else:
+            logger.info("Configuração recarregada (%s): nada mudou", motivo)
+        return {campo: {"anterior": antes, "novo": depois} for campo, (antes, depois) in mudancas.items()}
+
+    def _observar(self) -> None:
+        while not self._parar.is_set():
+            sinal = self._acordar.wait(self.intervalo if self.intervalo > 0 else None)
+            self._acordar.clear()
+            if self._parar.is_set():
+                return
+            if sinal:
+                motivo = "SIGHUP"
+            elif self._assinatura_arquivo() != self._assinatura:
+                motivo = f"{self.arquivo.name} alterado"
+            else:
+                continue
+            try:
+                self.recarregar(motivo)
+            except Exception:
+                pass  # já logado; segue observando
+
+    def iniciar(self, sighup: bool = True) -> None:
+        """
+        Sobe a thread que observa o arquivo (intervalo <= 0: só SIGHUP).
+
+        O handler de SIGHUP só acorda a thread: a recarga (que pode
+        carregar um modelo) nunca roda dentro do handler de sinal.
+        """
+        if self._thread is not None:
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._observar, name="configuracao", daemon=True)
+        self._thread.start()
+        if sighup and hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGHUP, lambda *_: self._acordar.set())
+
+    def parar(self) -> None:
+        if self._thread is None:
+            return
+        self._parar.set()
+        self._acordar.set()
+        self._thread.join()
+        self._thread = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "arquivo": str(self.arquivo),
+            "observando": self._thread is not None,
+            "intervalo_s": self.intervalo,
+            "recargas": self._recargas,
+            "rejeitadas": self._rejeitadas,
+            "ultima_recarga": self._ultima_recarga,
+            "ultimo_erro": self._ultimo_erro,
+        }
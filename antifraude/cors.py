@@ -0,0 +1,228 @@
+"""
+CORS Compilado com Cache de Preflight
+=====================================
+
+Navegadores mandam um OPTIONS (preflight) antes da maioria dos POST em
+/predict: sem cache, cada predição custa duas requisições. Este
+middleware:
+
+- Compila CORS_ORIGINS uma vez em um CorrespondenteOrigens: conjunto
+  (hash) de origens exatas + conjunto de sufixos para curingas
+  (`https://*.meu-site.com` casa `https://app.meu-site.com`, mas não
+  `https://meu-site.com`, que deve ser listado à parte)
+- Responde o preflight ele mesmo, sem passar pelo resto da aplicação
+  (registre-o por ÚLTIMO: é o middleware mais externo)
+- Manda Access-Control-Max-Age para o navegador guardar o preflight
+- Conta preflights e origens aceitas (por item de CORS_ORIGINS) e recusadas
+
+As origens vêm de uma função (ex.: o snapshot da configuração
+recarregável): o correspondente só é recompilado quando a tupla muda.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+METODOS_PADRAO = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+HEADERS_SIMPLES = {"accept", "accept-language", "content-language", "content-type"}
+MAX_CACHE_ORIGENS = 1024
+
+
+def _separar(origem: str) -> Tuple[str, str, str]:
+    """'https://app.site.com:8443' -> ('https', 'app.site.com', '8443')"""
+    esquema, separador, resto = origem.partition("://")
+    if not separador or not resto or "/" in resto:
+        raise ValueError(f"Origem inválida: {origem!r} (use esquema://host[:porta])")
+    if resto.endswith("]") or ":" not in resto:  # IPv6 sem porta ou sem porta
+        return esquema, resto, ""
+    host, _, porta = resto.rpartition(":")
+    return esquema, host, porta
+
+
+class CorrespondenteOrigens:
+    """Origens permitidas compiladas: lookup O(1) + um lookup por nível de subdomínio"""
+
+    def __init__(self, origens: Sequence[str]):
+        self.permitir_todas = False
+        self._exatas: Dict[str, str] = {}
+        self._curingas: Dict[Tuple[str, str, str], str] = {}
+        self._cache: Dict[str, Optional[str]] = {}
+        for bruta in origens:
+            origem = bruta.strip().lower().rstrip("/")
+            if not origem:
+                continue
+            if origem == "*":
+                self.permitir_todas = True
+                continue
+            esquema, host, porta = _separar(origem)
+            if "*" in host:
+                if not host.startswith("*.") or "*" in host[2:] or host.count(".") < 2:
+                    raise ValueError(f"Curinga inválido: {bruta!r} (use esquema://*.dominio.tld)")
+                self._curingas[(esquema, host[1:], porta)] = bruta.strip()
+            else:
+                self._exatas[origem] = bruta.strip()
+
+    def casar(self, origem: str) -> Optional[str]:
+        """Item de CORS_ORIGINS que permite a origem ("*" se todas) ou None"""
+        if origem in self._cache:
+            return self._cache[origem]
+        normalizada = origem.lower()
+        padrao = self._exatas.get(normalizada)
+        if padrao is None and self._curingas:
+            try:
+                esquema, host, porta = _separar(normalizada)
+            except ValueError:
+                esquema, host, porta = "", "", ""
+            indice = host.find(".")
+            while padrao is None and indice > 0:
+                padrao = self._curingas.get((esquema, host[indice:], porta))
+                indice = host.find(".", indice + 1)
+        if padrao is None and self.permitir_todas:
+            padrao = "*"
+        if len(self._cache) >= MAX_CACHE_ORIGENS:
+            self._cache.clear()  # origens arbitrárias não crescem a memória
+        self._cache[origem] = padrao
+        return padrao
+
+
+@dataclass
+class EstatisticasCORS:
+    """Contadores do MiddlewareCORS (atualizados só no event loop)"""
+    preflights: int = 0
+    preflights_recusados: int = 0
+    requisicoes_com_origem: int = 0
+    origens_recusadas: int = 0
+    por_origem_permitida: Dict[str, int] = field(default_factory=dict)
+
+    def permitida(self, padrao: str) -> None:
+        self.por_origem_permitida[padrao] = self.por_origem_permitida.get(padrao, 0) + 1
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "preflights": self.preflights,
+            "preflights_recusados": self.preflights_recusados,
+            "requisicoes_com_origem": self.requisicoes_com_origem,
+            "origens_recusadas": self.origens_recusadas,
+            "por_origem_permitida": dict(self.por_origem_permitida),
+        }
+
+
+class MiddlewareCORS:
+    """CORS em ASGI puro: preflight respondido aqui, com Max-Age"""
+
+    def __init__(
+        self,
+        app,
+        obter_origens: Callable[[], Sequence[str]],
+        allow_methods: Sequence[str] = ("*",),
+        allow_headers: Sequence[str] = ("*",),
+        allow_credentials: bool = False,
+        expose_headers: Sequence[str] = (),
+        max_age: int = 600,
+        estatisticas: Optional[EstatisticasCORS] = None,
+    ):
+        self.app = app
+        self.estatisticas = estatisticas if estatisticas is not None else EstatisticasCORS()
+        self.obter_origens = obter_origens
+        self.allow_credentials = allow_credentials
+        self.max_age = max_age
+        metodos = METODOS_PADRAO if "*" in allow_methods else tuple(m.upper() for m in allow_methods)
+        self._metodos = set(metodos)
+        self._todos_headers = "*" in allow_headers
+        self._headers = {h.lower() for h in allow_headers} | HEADERS_SIMPLES
+
+        # Headers fixos pré-montados (bytes) para não montar por requisição
+        self._preflight_fixos = [
+            (b"access-control-allow-methods", ", ".join(metodos).encode("latin-1")),
+            (b"access-control-max-age", str(max_age).encode("latin-1")),
+        ]
+        if not self._todos_headers:
+            self._preflight_fixos.append(
+                (b"access-control-allow-headers", ", ".join(sorted(self._headers)).encode("latin-1"))
+            )
+        self._simples_fixos = {}
+        if allow_credentials:
+            self._preflight_fixos.append((b"access-control-allow-credentials", b"true"))
+            self._simples_fixos["Access-Control-Allow-Credentials"] = "true"
+        if expose_headers:
+            self._simples_fixos["Access-Control-Expose-Headers"] = ", ".join(expose_headers)
+
+        self._origens = obter_origens()
+        self._correspondente = CorrespondenteOrigens(self._origens)
+
+    def _correspondente_atual(self) -> CorrespondenteOrigens:
+        origens = self.obter_origens()
+        if origens is not self._origens:  # configuração recarregada
+            self._correspondente = CorrespondenteOrigens(origens)
+            self._origens = origens
+        return self._correspondente
+
+    def _allow_origin(self, origem: str, padrao: str) -> str:
+        # "*" não vale com credenciais: devolve a própria origem
+        return "*" if padrao == "*" and not self.allow_credentials else origem
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        origem = headers.get("origin")
+        if origem is None:
+            await self.app(scope, receive, send)
+            return
+
+        padrao = self._correspondente_atual().casar(origem)
+        if scope["method"] == "OPTIONS" and "access-control-request-method" in headers:
+            await self._preflight(send, headers, origem, padrao)
+            return
+
+        self.estatisticas.requisicoes_com_origem += 1
+        if padrao is None:
+            self.estatisticas.origens_recusadas += 1
+            await self.app(scope, receive, send)  # sem headers CORS: o navegador bloqueia
+            return
+        self.estatisticas.permitida(padrao)
+        allow_origin = self._allow_origin(origem, padrao)
+
+        async def enviar(message):
+            if message["type"] == "http.response.start":
+                saida = MutableHeaders(scope=message)
+                saida["Access-Control-Allow-Origin"] = allow_origin
+                saida.update(self._simples_fixos)
+                if allow_origin != "*":
+                    saida.add_vary_header("Origin")
+            await send(message)
+
+        await self.app(scope, receive, enviar)
+
+    async def _preflight(self, send, headers: Headers, origem: str, padrao: Optional[str]) -> None:
+        self.estatisticas.preflights += 1
+        metodo = headers["access-control-request-method"].upper()
+        pedidos = headers.get("access-control-request-headers", "")
+        erros = []
+        if padrao is None:
+            erros.append("origin")
+        else:
+            self.estatisticas.permitida(padrao)
+        if metodo not in self._metodos:
+            erros.append("method")
+        if not self._todos_headers and any(
+            h.strip().lower() not in self._headers for h in pedidos.split(",") if h.strip()
+        ):
+            erros.append("headers")
+
+        resposta = [(b"vary", b"Origin")] + self._preflight_fixos
+        if padrao is not None:
+            resposta.append((b"access-control-allow-origin", self._allow_origin(origem, padrao).encode("latin-1")))
+        if self._todos_headers and pedidos:
+            resposta.append((b"access-control-allow-headers", pedidos.encode("latin-1")))
+        if erros:
+            self.estatisticas.preflights_recusados += 1
+            corpo = f"Disallowed CORS {', '.join(erros)}".encode("utf-8")
+            status = 400
+        else:
+            corpo, status = b"OK", 200
+        resposta += [(b"content-type", b"text/plain; charset=utf-8"), (b"content-length", str(len(corpo)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": resposta})
+        await send({"type": "http.response.body", "body": corpo})
@@ -0,0 +1,168 @@
+"""
+Fila de Logs Não Bloqueante
+===========================
+
+Handler de logging que NÃO escreve no stdout dentro da requisição:
+o registro formatado vai para uma fila em memória (limitada) e uma
+thread de fundo escreve em lotes, com um único write por lote.
+
+Se o coletor de logs ficar lento, a fila enche e a política decide:
+- "drop-oldest": descarta o registro mais antigo da fila (padrão)
+- "drop-newest": descarta o registro que acabou de chegar
+- "block": a requisição espera espaço na fila (nada é perdido)
+
+Registros descartados são contados em estatisticas(). Ao encerrar o
+processo, logging.shutdown() chama close(), que escreve o que sobrou.
+"""
+
+import logging
+import os
+import sys
+import threading
+from collections import deque
+from typing import IO, Any, Dict, List, Optional
+
+POLITICAS = ("drop-oldest", "drop-newest", "block")
+
+
+class HandlerFila(logging.Handler):
+    """logging.Handler com fila limitada e escritor em lotes (thread de fundo)"""
+
+    def __init__(
+        self,
+        stream: Optional[IO[str]] = None,
+        max_registros: int = 10_000,
+        politica: str = "drop-oldest",
+        max_lote: int = 1_000,
+    ):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de fila inválida: {politica!r} (use {', '.join(POLITICAS)})")
+        if max_registros < 1 or max_lote < 1:
+            raise ValueError("max_registros e max_lote devem ser >= 1")
+        super().__init__()
+        self.stream = stream if stream is not None else sys.stdout
+        self.max_registros = max_registros
+        self.politica = politica
+        self.max_lote = max_lote
+
+        self._fila: "deque[str]" = deque()
+        self._condicao = threading.Condition(threading.Lock())
+        self._escrevendo = 0  # registros retirados da fila e ainda não escritos
+        self._fechando = False
+
+        self.enfileirados = 0
+        self.escritos = 0
+        self.descartados = 0
+        self.lotes = 0
+        self.erros_escrita = 0
+
+        self._iniciar_escritor()
+        # Em processos filhos (fork) a thread não existe: cria outra
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._apos_fork)
+
+    def _iniciar_escritor(self) -> None:
+        self._escritor = threading.Thread(target=self._escrever, name="log-escritor", daemon=True)
+        self._escritor.start()
+
+    def _apos_fork(self) -> None:
+        self._condicao = threading.Condition(threading.Lock())
+        self._fila.clear()
+        self._escrevendo = 0
+        if not self._fechando:
+            self._iniciar_escritor()
+
+    # ===================================
+    # CAMINHO DA REQUISIÇÃO
+    # ===================================
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            linha = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        with self._condicao:
+            if self._fechando:
+                return
+            if len(self._fila) >= self.max_registros:
+                if self.politica == "drop-newest":
+                    self.descartados += 1
+                    return
+                if self.politica == "drop-oldest":
+                    self._fila.popleft()
+                    self.descartados += 1
+                else:  # block
+                    while len(self._fila) >= self.max_registros and not self._fechando:
+                        self._condicao.wait()
+            self._fila.append(linha)
+            self.enfileirados += 1
+            self._condicao.notify_all()
+
+    # ===================================
+    # THREAD ESCRITORA
+    # ===================================
+
+    def _retirar_lote(self) -> Optional[List[str]]:
+        """Espera registros e retira até max_lote; None quando fechado e vazio"""
+        with self._condicao:
+            while not self._fila and not self._fechando:
+                self._condicao.wait()
+            if not self._fila:
+                return None
+            quantidade = min(len(self._fila), self.max_lote)
+            lote = [self._fila.popleft() for _ in range(quantidade)]
+            self._escrevendo = quantidade
+            self._condicao.notify_all()  # libera quem espera espaço (block)
+            return lote
+
+    def _escrever(self) -> None:
+        while True:
+            lote = self._retirar_lote()
+            if lote is None:
+                return
+            try:
+                # Um único write por lote, fora do lock
+                self.stream.write("\n".join(lote) + "\n")
+                self.stream.flush()
+                escritos, erros = len(lote), 0
+            except Exception:
+                escritos, erros = 0, 1
+            with self._condicao:
+                self.escritos += escritos
+                self.erros_escrita += erros
+                self.lotes += 1
+                self._escrevendo = 0
+                self._condicao.notify_all()
+
+    # ===================================
+    # FLUSH / ENCERRAMENTO
+    # ===================================
+
+    def flush(self, timeout: Optional[float] = 5.0) -> None:
+        """Espera a fila esvaziar (útil em testes e antes de encerrar)"""
+        with self._condicao:
+            self._condicao.wait_for(lambda: not self._fila and not self._escrevendo, timeout)
+
+    def close(self) -> None:
+        """Escreve o que sobrou na fila e encerra a thread escritora"""
+        with self._condicao:
+            self._fechando = True
+            self._condicao.notify_all()
+        if self._escritor.is_alive() and self._escritor is not threading.current_thread():
+            self._escritor.join(timeout=5.0)
+        super().close()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores da fila (registros descartados indicam coletor lento)"""
+        return {
+            "politica": self.politica,
+            "max_registros": self.max_registros,
+            "pendentes": len(self._fila),
+            "enfileirados": self.enfileirados,
+            "escritos": self.escritos,
+            "descartados": self.descartados,
+            "lotes": self.lotes,
+            "erros_escrita": self.erros_escrita,
+        }
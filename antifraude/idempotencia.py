@@ -0,0 +1,135 @@
+"""
+Cache de Idempotência (Idempotency-Key)
+=======================================
+
+Retentativas do cliente com a mesma Idempotency-Key recebem a decisão já
+calculada, em vez de analisar a transação de novo.
+
+- LRU com TTL e número máximo de chaves (memória limitada)
+- Single-flight: requisições SIMULTÂNEAS com a mesma chave esperam a
+  primeira terminar e compartilham o resultado
+- Mesma chave com payload diferente é conflito (ConflitoIdempotencia)
+- Erros não ficam em cache: a próxima tentativa executa de novo
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class ConflitoIdempotencia(Exception):
+    """A chave já foi usada com outro payload"""
+
+
+class _EmAndamento:
+    """Avaliação em andamento que outras requisições podem esperar"""
+
+    __slots__ = ("impressao", "evento", "resultado", "erro")
+
+    def __init__(self, impressao: bytes):
+        self.impressao = impressao
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+class CacheIdempotencia:
+    """LRU + TTL de decisões por Idempotency-Key, com single-flight"""
+
+    def __init__(
+        self,
+        max_chaves: int = 10_000,
+        ttl_segundos: float = 300.0,
+        relogio: Callable[[], float] = time.monotonic,
+    ):
+        self.max_chaves = max_chaves
+        self.ttl_segundos = ttl_segundos
+        self.relogio = relogio
+        # chave -> (resultado, impressão do payload, expira_em)
+        self._itens: "OrderedDict[str, Tuple[Any, bytes, float]]" = OrderedDict()
+        self._em_andamento: Dict[str, _EmAndamento] = {}
+        self._lock = threading.Lock()  # nunca é mantido durante a avaliação
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.conflitos = 0
+
+    @staticmethod
+    def _impressao(payload: str) -> bytes:
+        return hashlib.sha256(payload.encode("utf-8")).digest()
+
+    def _conflito(self, chave: str) -> ConflitoIdempotencia:
+        self.conflitos += 1
+        return ConflitoIdempotencia(f"Idempotency-Key {chave!r} já usada com outro payload")
+
+    def executar(self, chave: str, payload: str, funcao: Callable[[], T]) -> T:
+        """
+        Retorna o resultado em cache para a chave ou executa funcao() uma vez.
+
+        payload identifica o conteúdo da requisição (ex.: model_dump_json()).
+        """
+        impressao = self._impressao(payload)
+        agora = self.relogio()
+
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[2] > agora:
+                if item[1] != impressao:
+                    raise self._conflito(chave)
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return item[0]
+
+            andamento = self._em_andamento.get(chave)
+            if andamento is not None:
+                if andamento.impressao != impressao:
+                    raise self._conflito(chave)
+                self.coalesced += 1
+                lider = False
+            else:
+                andamento = _EmAndamento(impressao)
+                self._em_andamento[chave] = andamento
+                self.misses += 1
+                lider = True
+
+        if not lider:
+            andamento.evento.wait()
+            if andamento.erro is not None:
+                raise andamento.erro
+            return andamento.resultado
+
+        try:
+            resultado = funcao()
+        except BaseException as e:
+            andamento.erro = e
+            with self._lock:
+                del self._em_andamento[chave]
+            andamento.evento.set()
+            raise
+
+        with self._lock:
+            self._itens[chave] = (resultado, impressao, self.relogio() + self.ttl_segundos)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_chaves:
+                self._itens.popitem(last=False)
+            del self._em_andamento[chave]
+        andamento.resultado = resultado
+        andamento.evento.set()
+        return resultado
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Contadores para dimensionar o cache"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "conflitos": self.conflitos,
+            "chaves": len(self._itens),
+            "em_andamento": len(self._em_andamento),
+            "max_chaves": self.max_chaves,
+            "ttl_segundos": self.ttl_segundos,
+        }
@@ -0,0 +1,255 @@
+"""
+Diagnóstico de Memória (tracemalloc)
+====================================
+
+Para descobrir por que o RSS dos workers cresce ao longo dos dias:
+
+1. POST /admin/memoria/iniciar   -> liga o tracemalloc
+2. POST /admin/memoria/snapshot  -> foto 1
+3. ... tráfego normal ...
+4. POST /admin/memoria/snapshot  -> foto 2
+5. GET  /admin/memoria/diff?de=1&para=2 -> linhas (arquivo:linha) que
+   mais cresceram + média de blocos acumulados por requisição no intervalo
+
+Também há contagem de instâncias vivas dos modelos Pydantic (objetos que
+deveriam morrer ao fim da requisição) e, por rota, duas medidas de cada
+requisição:
+
+- alocado_pico: quanto a memória rastreada subiu no pico da requisição
+  (tracemalloc.reset_peak() antes, pico - antes depois). Mostra o churn:
+  10 MB alocados e liberados aparecem aqui como 10 MB
+- retido_liquido: o que ficou ao fim (atual depois - antes); o mesmo
+  churn aparece como ~0, um vazamento aparece como > 0
+
+⚠️ Com o tracemalloc ligado, cada alocação fica mais lenta: ligue só
+durante o diagnóstico. Desligado, o middleware só confere uma flag.
+As medidas por requisição são aproximadas com requisições simultâneas
+(o tracemalloc e o seu pico são globais ao processo).
+"""
+
+import gc
+import threading
+import tracemalloc
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import APIRouter, HTTPException, Query
+
+
+@dataclass
+class _EstatisticaRota:
+    requisicoes: int = 0
+    alocado_pico_total: int = 0
+    alocado_pico_max: int = 0
+    retido_liquido_total: int = 0
+    retido_liquido_max: int = 0
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    id: int
+    foto: tracemalloc.Snapshot
+    requisicoes: Dict[str, int] = field(default_factory=dict)
+
+
+class RastreadorMemoria:
+    """Snapshots do tracemalloc + pico alocado e memória retida por requisição"""
+
+    def __init__(self, rotas: Sequence[str], max_snapshots: int = 10):
+        self.rotas = tuple(rotas)
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[int, _Snapshot]" = OrderedDict()
+        self._proximo_id = 1
+        self._por_rota = {rota: _EstatisticaRota() for rota in self.rotas}
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def iniciar(self, quadros: int = 1) -> Dict[str, Any]:
+        """Liga o tracemalloc (quadros = profundidade da pilha guardada)"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(quadros)
+        return self.estado()
+
+    def parar(self) -> Dict[str, Any]:
+        """Desliga o tracemalloc e descarta snapshots e estatísticas"""
+        tracemalloc.stop()
+        with self._lock:
+            self._snapshots.clear()
+            self._por_rota = {rota: _EstatisticaRota() for rota in self.rotas}
+        return self.estado()
+
+    def registrar_requisicao(self, rota: str, alocado_pico: int, retido_liquido: int) -> None:
+        with self._lock:
+            estatistica = self._por_rota[rota]
+            estatistica.requisicoes += 1
+            estatistica.alocado_pico_total += alocado_pico
+            estatistica.alocado_pico_max = max(estatistica.alocado_pico_max, alocado_pico)
+            estatistica.retido_liquido_total += retido_liquido
+            estatistica.retido_liquido_max = max(estatistica.retido_liquido_max, retido_liquido)
+
+    def capturar(self) -> Dict[str, Any]:
+        """Tira um snapshot (guarda os max_snapshots mais recentes)"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc desligado: chame iniciar() antes")
+        foto = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ])
+        with self._lock:
+            snapshot = _Snapshot(
+                id=self._proximo_id,
+                foto=foto,
+                requisicoes={rota: e.requisicoes for rota, e in self._por_rota.items()},
+            )
+            self._proximo_id += 1
+            self._snapshots[snapshot.id] = snapshot
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        atual, pico = tracemalloc.get_traced_memory()
+        return {"id": snapshot.id, "memoria_kb": round(atual / 1024, 1), "pico_recente_kb": round(pico / 1024, 1)}
+
+    def comparar(self, de: int, para: int, limite: int = 20) -> Dict[str, Any]:
+        """Diferença entre dois snapshots, agrupada por arquivo:linha"""
+        try:
+            antes, depois = self._snapshots[de], self._snapshots[para]
+        except KeyError as e:
+            raise KeyError(f"Snapshot {e.args[0]} não existe (ou já foi descartado)") from None
+
+        diferencas = depois.foto.compare_to(antes.foto, "lineno")
+        requisicoes = {
+            rota: depois.requisicoes.get(rota, 0) - antes.requisicoes.get(rota, 0) for rota in self.rotas
+        }
+        total_requisicoes = sum(requisicoes.values())
+        blocos = sum(d.count_diff for d in diferencas)
+        # Média do intervalo (crescimento ÷ requisições), não uma medida de cada requisição
+        media_blocos = round(blocos / total_requisicoes, 2) if total_requisicoes else None
+        return {
+            "de": de,
+            "para": para,
+            "diferenca_kb": round(sum(d.size_diff for d in diferencas) / 1024, 1),
+            "diferenca_blocos": blocos,
+            "requisicoes": requisicoes,
+            "media_blocos_acumulados_por_requisicao": media_blocos,
+            "linhas": [
+                {
+                    "local": f"{d.traceback[0].filename}:{d.traceback[0].lineno}",
+                    "diferenca_kb": round(d.size_diff / 1024, 2),
+                    "diferenca_blocos": d.count_diff,
+                    "total_kb": round(d.size / 1024, 2),
+                }
+                for d in diferencas[:limite]
+            ],
+        }
+
+    @staticmethod
+    def contar_objetos(classes: Sequence[type]) -> Dict[str, int]:
+        """Instâncias vivas de cada classe (percorre o heap: só para diagnóstico)"""
+        contagem = {classe.__name__: 0 for classe in classes}
+        tupla = tuple(classes)
+        for objeto in gc.get_objects():
+            if isinstance(objeto, tupla):
+                for classe in classes:
+                    if isinstance(objeto, classe):
+                        contagem[classe.__name__] += 1
+        return contagem
+
+    def estado(self) -> Dict[str, Any]:
+        ativo = tracemalloc.is_tracing()
+        atual, pico = tracemalloc.get_traced_memory() if ativo else (0, 0)
+        with self._lock:
+            por_rota = {
+                rota: {
+                    "requisicoes": e.requisicoes,
+                    "alocado_pico_bytes_medio": (
+                        round(e.alocado_pico_total / e.requisicoes, 1) if e.requisicoes else None
+                    ),
+                    "alocado_pico_bytes_max": e.alocado_pico_max,
+                    "retido_liquido_bytes_medio": (
+                        round(e.retido_liquido_total / e.requisicoes, 1) if e.requisicoes else None
+                    ),
+                    "retido_liquido_bytes_max": e.retido_liquido_max,
+                }
+                for rota, e in self._por_rota.items()
+            }
+            snapshots = list(self._snapshots)
+        return {
+            "tracemalloc": ativo,
+            "quadros": tracemalloc.get_traceback_limit() if ativo else None,
+            "memoria_kb": round(atual / 1024, 1),
+            # O middleware zera o pico no início de cada requisição medida
+            "pico_recente_kb": round(pico / 1024, 1),
+            "snapshots": snapshots,
+            "por_rota": por_rota,
+        }
+
+
+class MiddlewareAlocacoes:
+    """Mede o pico alocado e a memória retida por requisição nas rotas do rastreador"""
+
+    def __init__(self, app, rastreador: RastreadorMemoria):
+        self.app = app
+        self.rastreador = rastreador
+        self.rotas = set(rastreador.rotas)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.rotas or not tracemalloc.is_tracing():
+            await self.app(scope, receive, send)
+            return
+        # ✅ Pico zerado no início: o pico ao fim é o desta requisição
+        tracemalloc.reset_peak()
+        antes = tracemalloc.get_traced_memory()[0]
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if tracemalloc.is_tracing():
+                depois, pico = tracemalloc.get_traced_memory()
+                self.rastreador.registrar_requisicao(scope["path"], pico - antes, depois - antes)
+
+
+def criar_router_memoria(
+    rastreador: RastreadorMemoria,
+    modelos: Sequence[type],
+    dependencias: Optional[List[Any]] = None,
+) -> APIRouter:
+    """Endpoints /admin/memoria/* (proteja com dependencias=[apenas_admin])"""
+    router = APIRouter(prefix="/admin/memoria", tags=["admin"], dependencies=dependencias or [])
+
+    @router.get("")
+    def estado_memoria():
+        """tracemalloc ligado?, memória rastreada, pico alocado e retenção por rota"""
+        return rastreador.estado()
+
+    @router.post("/iniciar")
+    def iniciar_memoria(quadros: int = Query(1, ge=1, le=25)):
+        return rastreador.iniciar(quadros)
+
+    @router.post("/parar")
+    def parar_memoria():
+        return rastreador.parar()
+
+    @router.post("/snapshot")
+    def snapshot_memoria():
+        try:
+            return rastreador.capturar()
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    @router.get("/diff")
+    def diff_memoria(de: int, para: int, limite: int = Query(20, ge=1, le=200)):
+        try:
+            return rastreador.comparar(de, para, limite)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=e.args[0])
+
+    @router.get("/objetos")
+    def objetos_memoria():
+        """Instâncias vivas dos modelos Pydantic (devem voltar a ~0 sem tráfego)"""
+        gc.collect()
+        return rastreador.contar_objetos(modelos)
+
+    return router
@@ -0,0 +1,268 @@
+"""
+Métricas no Formato Prometheus (/metrics)
+=========================================
+
+Contadores e histogramas de buckets fixos, sem dependências externas.
+
+- Todas as métricas (e os valores de rótulo) são declaradas na
+  importação; cada combinação vira uma posição fixa num vetor de float64
+- Atualizar = somar numa posição do vetor, com um lock que nunca é
+  mantido durante I/O (nada de formatação nem escrita no caminho quente)
+- Vários workers (uvicorn --workers N): com diretorio definido, cada
+  processo escreve o seu vetor num arquivo mapeado em memória (mmap) e
+  /metrics soma os arquivos de todos os workers
+
+⚠️ Com diretorio, limpe o diretório ao (re)iniciar o serviço: arquivos de
+workers antigos continuam sendo somados (contadores não podem diminuir
+enquanto o serviço está no ar).
+"""
+
+import hashlib
+import mmap
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+BUCKETS_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+TIPO_CONTEUDO = "text/plain; version=0.0.4"  # o Starlette acrescenta o charset
+
+
+def _formatar(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor))
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(pares: Iterable[Tuple[str, str]]) -> str:
+    texto = ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares)
+    return f"{{{texto}}}" if texto else ""
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, registro: "RegistroMetricas", nome: str, ajuda: str,
+                 rotulo: Optional[str], valores: Sequence[str], slots_por_valor: int):
+        if (rotulo is None) != (not valores):
+            raise ValueError(f"{nome}: informe rotulo e valores juntos")
+        if len(set(valores)) != len(valores):
+            raise ValueError(f"{nome}: valores de rótulo repetidos")
+        self.registro = registro
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulo = rotulo
+        self.valores = tuple(valores) or (None,)
+        self.slots_por_valor = slots_por_valor
+        self.inicio = registro._reservar(self, len(self.valores) * slots_por_valor)
+        self._posicao = {valor: self.inicio + k * slots_por_valor for k, valor in enumerate(self.valores)}
+
+    def _base(self, valor_rotulo: Optional[str]) -> int:
+        try:
+            return self._posicao[valor_rotulo]
+        except KeyError:
+            raise ValueError(f"{self.nome}: valor de rótulo não declarado: {valor_rotulo!r}") from None
+
+    def _pares(self, valor_rotulo: Optional[str]) -> List[Tuple[str, str]]:
+        return [] if self.rotulo is None else [(self.rotulo, valor_rotulo)]
+
+    def assinatura(self) -> str:
+        return f"{self.tipo}:{self.nome}:{self.rotulo}:{self.valores}"
+
+
+class Contador(_Metrica):
+    """Contador monotônico, opcionalmente com um rótulo de valores fixos"""
+
+    tipo = "counter"
+
+    def __init__(self, registro, nome, ajuda, rotulo=None, valores=()):
+        super().__init__(registro, nome, ajuda, rotulo, valores, slots_por_valor=1)
+
+    def inc(self, valor_rotulo: Optional[str] = None, quantidade: float = 1.0) -> None:
+        self.registro._somar(self._base(valor_rotulo), quantidade)
+
+    def exportar(self, vetor: Sequence[float]) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        for valor in self.valores:
+            linhas.append(f"{self.nome}{_rotulos(self._pares(valor))} {_formatar(vetor[self._posicao[valor]])}")
+        return linhas
+
+
+class Histograma(_Metrica):
+    """Histograma de buckets fixos (le = limite superior, em segundos)"""
+
+    tipo = "histogram"
+
+    def __init__(self, registro, nome, ajuda, buckets=BUCKETS_PADRAO, rotulo=None, valores=()):
+        if list(buckets) != sorted(set(buckets)):
+            raise ValueError(f"{nome}: buckets devem ser crescentes e sem repetição")
+        self.buckets = tuple(float(b) for b in buckets)
+        # Por valor de rótulo: um slot por bucket + (+Inf) + soma + contagem
+        super().__init__(registro, nome, ajuda, rotulo, valores, slots_por_valor=len(self.buckets) + 3)
+
+    def observar(self, valor: float, valor_rotulo: Optional[str] = None) -> None:
+        base = self._base(valor_rotulo)
+        n = len(self.buckets)
+        self.registro._observar(base + bisect_left(self.buckets, valor), base + n + 1, base + n + 2, valor)
+
+    def assinatura(self) -> str:
+        return super().assinatura() + f":{self.buckets}"
+
+    def exportar(self, vetor: Sequence[float]) -> List[str]:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        n = len(self.buckets)
+        for valor in self.valores:
+            base = self._posicao[valor]
+            pares = self._pares(valor)
+            acumulado = 0.0
+            for k, limite in enumerate(self.buckets + (float("inf"),)):
+                acumulado += vetor[base + k]
+                linhas.append(
+                    f"{self.nome}_bucket{_rotulos(pares + [('le', _formatar(limite))])} {_formatar(acumulado)}"
+                )
+            linhas.append(f"{self.nome}_sum{_rotulos(pares)} {_formatar(vetor[base + n + 1])}")
+            linhas.append(f"{self.nome}_count{_rotulos(pares)} {_formatar(vetor[base + n + 2])}")
+        return linhas
+
+
+class RegistroMetricas:
+    """Conjunto de métricas de um serviço + armazenamento (memória ou mmap)"""
+
+    def __init__(self, diretorio: Optional[str] = None):
+        self.diretorio = Path(diretorio) if diretorio else None
+        self._metricas: List[_Metrica] = []
+        self._tamanho = 0
+        self._mmap: Optional[mmap.mmap] = None
+        self._valores: Optional[memoryview] = None
+        self._lock = threading.Lock()
+        # Processos filhos (fork) começam com vetor próprio, zerado
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._apos_fork)
+
+    # ===================================
+    # DECLARAÇÃO
+    # ===================================
+
+    def contador(self, nome: str, ajuda: str, rotulo: Optional[str] = None, valores: Sequence[str] = ()) -> Contador:
+        return Contador(self, nome, ajuda, rotulo, valores)
+
+    def histograma(self, nome: str, ajuda: str, buckets: Sequence[float] = BUCKETS_PADRAO,
+                   rotulo: Optional[str] = None, valores: Sequence[str] = ()) -> Histograma:
+        return Histograma(self, nome, ajuda, buckets, rotulo, valores)
+
+    def _reservar(self, metrica: _Metrica, slots: int) -> int:
+        if self._valores is not None:
+            raise RuntimeError("Declare todas as métricas antes da primeira atualização")
+        if any(m.nome == metrica.nome for m in self._metricas):
+            raise ValueError(f"Métrica duplicada: {metrica.nome}")
+        self._metricas.append(metrica)
+        inicio = self._tamanho
+        self._tamanho += slots
+        return inicio
+
+    @property
+    def assinatura(self) -> str:
+        """Identifica o layout do vetor: workers com código diferente não se misturam"""
+        texto = "|".join(m.assinatura() for m in self._metricas)
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:12]
+
+    # ===================================
+    # ARMAZENAMENTO
+    # ===================================
+
+    def _arquivo(self, pid: int) -> Path:
+        return self.diretorio / f"metricas-{self.assinatura}-{pid}.db"
+
+    def _abrir(self) -> memoryview:
+        with self._lock:
+            if self._valores is None:
+                tamanho = max(self._tamanho, 1) * 8
+                if self.diretorio is None:
+                    self._mmap = mmap.mmap(-1, tamanho)
+                else:
+                    self.diretorio.mkdir(parents=True, exist_ok=True)
+                    fd = os.open(self._arquivo(os.getpid()), os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+                    try:
+                        os.ftruncate(fd, tamanho)
+                        self._mmap = mmap.mmap(fd, tamanho)
+                    finally:
+                        os.close(fd)
+                self._valores = memoryview(self._mmap).cast("d")
+            return self._valores
+
+    def _apos_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._valores = None
+        self._mmap = None
+
+    def _somar(self, posicao: int, quantidade: float) -> None:
+        valores = self._valores
+        if valores is None:
+            valores = self._abrir()
+        with self._lock:
+            valores[posicao] += quantidade
+
+    def _observar(self, bucket: int, soma: int, contagem: int, valor: float) -> None:
+        valores = self._valores
+        if valores is None:
+            valores = self._abrir()
+        with self._lock:
+            valores[bucket] += 1
+            valores[soma] += valor
+            valores[contagem] += 1
+
+    def coletar(self) -> List[float]:
+        """Vetor somado de todos os workers (ou só deste processo, sem diretorio)"""
+        if self._valores is None:
+            self._abrir()
+        if self.diretorio is None:
+            return list(self._valores)
+
+        total = [0.0] * self._tamanho
+        for caminho in self.diretorio.glob(f"metricas-{self.assinatura}-*.db"):
+            vetor = array("d")
+            try:
+                vetor.frombytes(caminho.read_bytes()[: self._tamanho * 8])
+            except (OSError, ValueError):
+                continue  # arquivo sendo criado ou removido
+            for i, valor in enumerate(vetor):
+                total[i] += valor
+        return total
+
+    def exportar(self) -> str:
+        """Texto no formato de exposição do Prometheus"""
+        vetor = self.coletar()
+        linhas: List[str] = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.exportar(vetor))
+        return "\n".join(linhas) + "\n"
+
+
+class MiddlewareLatencia:
+    """Middleware ASGI que observa a latência por rota num Histograma"""
+
+    def __init__(self, app, histograma: Histograma, outros: str = "outros"):
+        self.app = app
+        self.histograma = histograma
+        self.rotas = set(histograma.valores)
+        if outros not in self.rotas:
+            raise ValueError(f"{histograma.nome}: declare o valor de rótulo {outros!r}")
+        self.outros = outros  # rótulo para rotas não declaradas (404, /docs...)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            rota = scope["path"] if scope["path"] in self.rotas else self.outros
+            self.histograma.observar(time.perf_counter() - inicio, rota)
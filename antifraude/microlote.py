@@ -0,0 +1,162 @@
+"""
+Micro-lotes de Inferência (asyncio)
+===================================
+
+Junta as requisições de /predict que chegam ao mesmo tempo e roda UMA
+inferência vetorizada para todas, em vez de uma chamada ao modelo por
+requisição.
+
+Um lote fecha quando atinge max_lote itens ou quando o primeiro item
+esperou max_espera_ms, o que vier primeiro. Cada requisição recebe de
+volta apenas a sua probabilidade.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# (features, future da requisição, instante de chegada)
+_Item = Tuple[Sequence[float], "asyncio.Future[float]", float]
+
+
+def _percentil(valores: List[float], p: float) -> Optional[float]:
+    if not valores:
+        return None
+    return float(np.percentile(valores, p))
+
+
+class AgendadorMicrolote:
+    """Fila de requisições + tarefa de fundo que monta e executa os lotes"""
+
+    def __init__(
+        self,
+        inferir: Callable[[np.ndarray], Sequence[float]],
+        max_lote: int = 64,
+        max_espera_ms: float = 2.0,
+        amostras_latencia: int = 10_000,
+    ):
+        if max_lote < 1 or max_espera_ms < 0:
+            raise ValueError("max_lote deve ser >= 1 e max_espera_ms >= 0")
+        self.inferir = inferir  # recebe matriz (n, features), devolve n probabilidades
+        self.max_lote = max_lote
+        self.max_espera = max_espera_ms / 1000
+        self._fila: Optional["asyncio.Queue[_Item]"] = None
+        self._tarefa: Optional["asyncio.Task[None]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lote_atual: List[_Item] = []  # lote sendo montado/executado
+
+        # Contadores expostos em estatisticas()
+        self._inicio = time.perf_counter()
+        self._requisicoes = 0
+        self._lotes = 0
+        self._erros = 0
+        self._latencias_ms: "deque[float]" = deque(maxlen=amostras_latencia)
+        self._tamanhos: "deque[int]" = deque(maxlen=amostras_latencia)
+
+    @property
+    def pendentes(self) -> int:
+        """Requisições aguardando na fila"""
+        return self._fila.qsize() if self._fila is not None else 0
+
+    def iniciar(self) -> None:
+        """Cria a fila e a tarefa de fundo no event loop atual"""
+        self._loop = asyncio.get_running_loop()
+        self._fila = asyncio.Queue()
+        self._tarefa = self._loop.create_task(self._executar())
+
+    async def parar(self) -> None:
+        """Cancela a tarefa de fundo e falha as requisições que sobraram"""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+        sobras = list(self._lote_atual)
+        while self._fila is not None and not self._fila.empty():
+            sobras.append(self._fila.get_nowait())
+        for _, futuro, _ in sobras:
+            if not futuro.done():
+                futuro.set_exception(RuntimeError("Agendador de micro-lotes encerrado"))
+        self._lote_atual = []
+        self._tarefa = None
+
+    async def prever(self, features: Sequence[float]) -> float:
+        """Enfileira uma requisição e espera a probabilidade do seu lote"""
+        loop = asyncio.get_running_loop()
+        # Sem lifespan (ex.: TestClient fora do "with"), inicia sob demanda
+        if self._tarefa is None or self._loop is not loop:
+            self.iniciar()
+        futuro = loop.create_future()
+        self._fila.put_nowait((features, futuro, time.perf_counter()))
+        return await futuro
+
+    async def _montar_lote(self, lote: List[_Item]) -> None:
+        lote.append(await self._fila.get())
+        prazo = self._loop.time() + self.max_espera
+        while len(lote) < self.max_lote:
+            try:
+                lote.append(self._fila.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            restante = prazo - self._loop.time()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._fila.get(), restante))
+            except asyncio.TimeoutError:
+                break
+
+    async def _executar(self) -> None:
+        while True:
+            lote = self._lote_atual = []
+            await self._montar_lote(lote)
+            try:
+                # ⚠️ Dentro do try: um lote ruim não pode matar a tarefa de fundo
+                X = np.asarray([features for features, _, _ in lote], dtype=np.float64)
+                # Em thread: o event loop continua recebendo o próximo lote
+                probabilidades = await self._loop.run_in_executor(None, self.inferir, X)
+                if len(probabilidades) != len(lote):
+                    raise RuntimeError(
+                        f"inferir devolveu {len(probabilidades)} probabilidades para um lote de {len(lote)}"
+                    )
+            except Exception as e:
+                self._erros += len(lote)
+                for _, futuro, _ in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+
+            agora = time.perf_counter()
+            for (_, futuro, chegada), probabilidade in zip(lote, probabilidades):
+                if not futuro.done():  # o cliente pode ter desistido
+                    futuro.set_result(float(probabilidade))
+                self._latencias_ms.append((agora - chegada) * 1000)
+            self._requisicoes += len(lote)
+            self._lotes += 1
+            self._tamanhos.append(len(lote))
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Vazão, tamanho dos lotes e latência (p50/p95/p99) recentes"""
+        segundos = time.perf_counter() - self._inicio
+        latencias = list(self._latencias_ms)
+        tamanhos = list(self._tamanhos)
+        return {
+            "max_lote": self.max_lote,
+            "max_espera_ms": self.max_espera * 1000,
+            "requisicoes": self._requisicoes,
+            "lotes": self._lotes,
+            "erros": self._erros,
+            "pendentes": self.pendentes,
+            "tamanho_medio_lote": round(sum(tamanhos) / len(tamanhos), 2) if tamanhos else None,
+            "requisicoes_por_segundo": round(self._requisicoes / segundos, 2) if segundos > 0 else None,
+            "latencia_ms": {
+                "p50": _percentil(latencias, 50),
+                "p95": _percentil(latencias, 95),
+                "p99": _percentil(latencias, 99),
+            },
+        }
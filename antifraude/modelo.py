@@ -0,0 +1,147 @@
+"""
+Gerenciador de Modelo (MODEL_PATH)
+==================================
+
+Carrega o artefato do modelo UMA vez (na inicialização ou no primeiro
+uso), faz uma inferência de aquecimento e entrega sempre a mesma
+instância para as requisições.
+
+A troca por um novo artefato (recarregar) é atômica: o novo modelo é
+carregado e aquecido ao lado do atual e só então substitui a referência.
+Requisições em andamento continuam com o modelo que já pegaram.
+
+O artefato é um pickle com a interface do scikit-learn:
+predict_proba(X) -> matriz (n, 2), coluna 1 = probabilidade de fraude.
+⚠️ Pickle executa código ao carregar: só use artefatos confiáveis.
+"""
+
+import logging
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ModeloThreshold:
+    """
+    Modelo de regra usado quando não há artefato em MODEL_PATH.
+
+    Mesma decisão da versão sem modelo: fraude se valor > threshold
+    (o valor é a primeira coluna das features).
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        valor = np.asarray(X, dtype=np.float64)[:, 0]
+        fraude = np.where(valor > self.threshold, np.minimum(valor / self.threshold, 1.0), 0.0)
+        return np.column_stack([1.0 - fraude, fraude])
+
+
+@dataclass(frozen=True)
+class ModeloCarregado:
+    """Modelo pronto para uso + de onde veio (trocado sempre por inteiro)"""
+    modelo: Any
+    origem: str  # caminho do artefato ou "fallback"
+    carregado_em: float
+    segundos_carga: float
+
+
+class GerenciadorModelo:
+    """Carga preguiçosa, aquecimento e troca atômica do modelo"""
+
+    def __init__(
+        self,
+        caminho: str,
+        fallback: Optional[Callable[[], Any]] = None,
+        exemplo_aquecimento: Optional[Sequence[Sequence[float]]] = None,
+    ):
+        self.caminho = caminho
+        self.fallback = fallback
+        self.exemplo_aquecimento = exemplo_aquecimento
+        self._atual: Optional[ModeloCarregado] = None
+        self._lock = threading.Lock()  # só serializa cargas, nunca a inferência
+
+    @property
+    def carregado(self) -> bool:
+        return self._atual is not None
+
+    def _ler_artefato(self, caminho: str) -> ModeloCarregado:
+        inicio = time.perf_counter()
+        if Path(caminho).is_file():
+            with open(caminho, "rb") as arquivo:
+                modelo = pickle.load(arquivo)
+            origem = caminho
+        elif self.fallback is not None:
+            modelo = self.fallback()
+            origem = "fallback"
+        else:
+            raise FileNotFoundError(f"Artefato do modelo não encontrado: {caminho}")
+
+        if not hasattr(modelo, "predict_proba"):
+            raise TypeError(f"Modelo em {origem} não tem predict_proba")
+
+        # Aquecimento: a primeira requisição real não paga a primeira inferência
+        if self.exemplo_aquecimento is not None:
+            modelo.predict_proba(np.asarray(self.exemplo_aquecimento, dtype=np.float64))
+
+        return ModeloCarregado(
+            modelo=modelo,
+            origem=origem,
+            carregado_em=time.time(),
+            segundos_carga=time.perf_counter() - inicio,
+        )
+
+    def carregar(self) -> Any:
+        """Carrega o modelo se ainda não foi carregado (idempotente)"""
+        with self._lock:
+            if self._atual is None:
+                self._atual = self._ler_artefato(self.caminho)
+                logger.info("Modelo carregado de %s em %.3fs", self._atual.origem, self._atual.segundos_carga)
+        return self._atual.modelo
+
+    def obter(self) -> Any:
+        """Modelo atual (carrega no primeiro uso)"""
+        atual = self._atual
+        if atual is None:
+            return self.carregar()
+        return atual.modelo
+
+    def recarregar(self, caminho: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Carrega um novo artefato e troca o modelo atual de forma atômica.
+
+        Se a carga falhar, o modelo atual continua em uso e o erro sobe.
+        """
+        with self._lock:
+            novo = self._ler_artefato(caminho or self.caminho)
+            anterior = self._atual
+            self._atual = novo  # troca de referência: atômica
+            if caminho:
+                self.caminho = caminho
+        logger.info(
+            "Modelo trocado: %s -> %s",
+            anterior.origem if anterior else None,
+            novo.origem,
+        )
+        return self.info()
+
+    def info(self) -> Dict[str, Any]:
+        """Resumo do modelo atual (para /config e endpoints de administração)"""
+        atual = self._atual
+        if atual is None:
+            return {"model_loaded": False, "model_path": self.caminho}
+        return {
+            "model_loaded": True,
+            "model_path": self.caminho,
+            "model_source": atual.origem,
+            "model_loaded_at": atual.carregado_em,
+            "model_load_seconds": round(atual.segundos_carga, 4),
+        }
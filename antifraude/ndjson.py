@@ -0,0 +1,69 @@
+"""
+Streaming NDJSON (uma transação JSON por linha)
+===============================================
+
+Lê o corpo da requisição aos pedaços e devolve as decisões conforme
+ficam prontas, sem nunca guardar o corpo inteiro em memória.
+
+A memória fica limitada ao tamanho de uma linha, seja o stream de
+1 mil ou de 50 milhões de registros.
+"""
+
+from typing import AsyncIterator
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+# Uma linha maior que isso é considerada corpo inválido
+MAX_BYTES_LINHA = 64 * 1024
+
+
+async def ler_linhas(partes: AsyncIterator[bytes], max_bytes_linha: int = MAX_BYTES_LINHA) -> AsyncIterator[bytes]:
+    """
+    Quebra um stream de bytes em linhas NDJSON (linhas vazias são ignoradas).
+
+    Gera ValueError se uma linha passar de max_bytes_linha, para que um
+    cliente sem "\\n" não consiga fazer o buffer crescer sem limite.
+    """
+    buffer = bytearray()
+    async for parte in partes:
+        buffer += parte
+        inicio = 0
+        while True:
+            fim = buffer.find(b"\n", inicio)
+            if fim == -1:
+                break
+            linha = bytes(buffer[inicio:fim]).strip()
+            if linha:
+                yield linha
+            inicio = fim + 1
+        del buffer[:inicio]
+        if len(buffer) > max_bytes_linha:
+            raise ValueError(f"Linha maior que {max_bytes_linha} bytes")
+
+    linha = bytes(buffer).strip()
+    if linha:
+        yield linha
+
+
+class RespostaNDJSON(StreamingResponse):
+    """
+    StreamingResponse para corpo e resposta em streaming ao mesmo tempo.
+
+    O StreamingResponse padrão fica lendo receive() em paralelo para
+    detectar desconexão, o que "rouba" pedaços do corpo que o endpoint
+    ainda está lendo. Aqui a desconexão chega pelo próprio request.stream().
+
+    Backpressure: cada linha só é lida depois que a resposta anterior
+    foi entregue ao servidor; se o cliente lê devagar, o send() espera
+    e o corpo deixa de ser consumido. O cliente precisa ler a resposta
+    enquanto envia (full duplex), como faz o curl com -T.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,130 @@
+"""
+Perfilador de CPU por Amostragem
+================================
+
+Quando a latência sobe em produção não dá para parar a API num
+breakpoint. O perfilador estatístico tira "fotos" das pilhas de TODAS
+as threads (inclusive o threadpool que roda os endpoints `def`) a cada
+intervalo_ms, durante N segundos, e conta quantas vezes cada pilha
+apareceu.
+
+- Parado, não custa nada: a thread de amostragem só existe durante
+  perfilar()
+- Saída no formato "collapsed stacks" (uma pilha por linha, frames
+  separados por ";" e a contagem no fim), aceito por flamegraph.pl,
+  speedscope.app e similares
+- Um perfil por vez (PerfilEmAndamento se já houver outro rodando)
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+from typing import Optional, Set
+
+# Folha da pilha nestes arquivos = thread esperando (fila, lock, select)
+ARQUIVOS_OCIOSOS = ("threading.py", "selectors.py", "queue.py")
+
+
+class PerfilEmAndamento(Exception):
+    """Já existe um perfil sendo coletado"""
+
+
+@dataclass(frozen=True)
+class Perfil:
+    pilhas: Counter  # "thread;frame;frame" -> amostras
+    amostras: int
+    segundos: float
+    intervalo_ms: float
+
+    def collapsed(self) -> str:
+        """Formato collapsed stacks (flamegraph.pl / speedscope)"""
+        return "".join(f"{pilha} {n}\n" for pilha, n in self.pilhas.most_common())
+
+
+def _rotulo(frame: FrameType) -> str:
+    codigo = frame.f_code
+    arquivo = Path(codigo.co_filename)
+    return f"{codigo.co_name} ({arquivo.parent.name}/{arquivo.name}:{codigo.co_firstlineno})"
+
+
+class PerfiladorAmostragem:
+    """Amostrador de pilhas de todas as threads via sys._current_frames()"""
+
+    def __init__(self, max_segundos: float = 60.0, max_profundidade: int = 128):
+        self.max_segundos = max_segundos
+        self.max_profundidade = max_profundidade
+        self._lock = threading.Lock()
+
+    def _pilha(self, frame: Optional[FrameType]) -> list:
+        frames = []
+        while frame is not None and len(frames) < self.max_profundidade:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()  # raiz primeiro
+        return frames
+
+    def _amostrar(self, ignorar: Set[int], pilhas: Counter, ociosos: bool) -> None:
+        nomes = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident in ignorar:
+                continue
+            frames = self._pilha(frame)
+            if not frames:
+                continue
+            if not ociosos and Path(frames[-1].f_code.co_filename).name in ARQUIVOS_OCIOSOS:
+                continue
+            nome = nomes.get(ident, f"thread-{ident}").replace(";", ",").replace(" ", "_")
+            pilhas[";".join([nome, *map(_rotulo, frames)])] += 1
+
+    def perfilar(self, segundos: float, intervalo_ms: float = 5.0, ociosos: bool = False) -> Perfil:
+        """
+        Coleta pilhas por `segundos` (bloqueia quem chamou até terminar).
+
+        ociosos=False descarta amostras de threads paradas esperando
+        (fila do threadpool, locks, select do event loop).
+        """
+        if not 0 < segundos <= self.max_segundos:
+            raise ValueError(f"segundos deve estar entre 0 e {self.max_segundos}")
+        if intervalo_ms <= 0:
+            raise ValueError("intervalo_ms deve ser positivo")
+        if not self._lock.acquire(blocking=False):
+            raise PerfilEmAndamento("Já existe um perfil em andamento")
+
+        try:
+            pilhas: Counter = Counter()
+            contagem = [0]
+            chamador = threading.get_ident()
+            parar = threading.Event()
+
+            def amostrador():
+                ignorar = {chamador, threading.get_ident()}
+                intervalo = intervalo_ms / 1000
+                proxima = time.perf_counter()
+                while not parar.is_set():
+                    self._amostrar(ignorar, pilhas, ociosos)
+                    contagem[0] += 1
+                    proxima += intervalo
+                    espera = proxima - time.perf_counter()
+                    if espera > 0:
+                        parar.wait(espera)
+                    else:
+                        proxima = time.perf_counter()  # atrasou: não tenta compensar
+
+            inicio = time.perf_counter()
+            thread = threading.Thread(target=amostrador, name="perfilador", daemon=True)
+            thread.start()
+            time.sleep(segundos)
+            parar.set()
+            thread.join()
+            return Perfil(
+                pilhas=pilhas,
+                amostras=contagem[0],
+                segundos=round(time.perf_counter() - inicio, 3),
+                intervalo_ms=intervalo_ms,
+            )
+        finally:
+            self._lock.release()
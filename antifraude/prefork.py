@@ -0,0 +1,359 @@
+"""
+Servidor Prefork (N workers, um socket)
+=======================================
+
+`uvicorn.run(app)` sobe um processo. Em produção queremos N workers,
+mas sem N cópias do modelo e das tabelas de regras na memória:
+
+1. O processo mestre importa o app (regras compiladas na importação) e
+   chama o hook `pre_carregar()` do módulo, se existir (ex.: carregar o
+   modelo de MODEL_PATH)
+2. gc.freeze(): os objetos já criados saem das gerações do GC, que não
+   escreve mais neles. Assim as páginas herdadas no fork continuam
+   COMPARTILHADAS (copy-on-write) em vez de serem copiadas para cada worker
+3. Abre o socket uma vez e faz fork dos workers, todos aceitando nele
+4. Worker que cai é recriado (com espera crescente se cair logo ao subir);
+   com --max-requests o worker sai após N requisições e é reciclado
+5. Imprime RSS / compartilhada / PSS de cada processo (/proc/<pid>/smaps_rollup);
+   `kill -USR1 <mestre>` imprime de novo
+
+SIGTERM/SIGINT no mestre: desligamento gracioso dos workers.
+SIGHUP no mestre: repassado aos workers (recarga de configuração).
+
+Uso (a partir da raiz do repositório):
+
+    python -m antifraude.prefork main:app \\
+        --app-dir bloco5-env-cors/bloco5-env-cors/3-com-cors --workers 4
+    python -m antifraude.prefork src.api.main:app \\
+        --app-dir bloco6-projeto/exemplos/exemplo-frete --workers 2
+
+⚠️ Só POSIX (fork). Threads criadas na importação não existem nos
+workers: inicie-as no lifespan ou use os.register_at_fork.
+"""
+
+import argparse
+import gc
+import importlib
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import uvicorn
+
+SINAIS_MESTRE = (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD, signal.SIGUSR1)
+
+
+@dataclass
+class _Worker:
+    indice: int
+    pid: int
+    iniciado_em: float
+
+
+def importar_app(alvo: str, diretorio: str, hook: Optional[str] = None):
+    """'modulo:atributo' a partir de `diretorio` (vira o cwd, como no uvicorn --app-dir)"""
+    modulo_nome, _, atributo = alvo.partition(":")
+    if not atributo:
+        raise ValueError(f"Use modulo:atributo (ex.: main:app), recebido {alvo!r}")
+    caminho = str(Path(diretorio).resolve())
+    os.chdir(caminho)  # .env, artefatos e caminhos relativos do app
+    sys.path.insert(0, caminho)
+    modulo = importlib.import_module(modulo_nome)
+    app = getattr(modulo, atributo)
+    if hook and callable(getattr(modulo, hook, None)):
+        print(f"✅ {modulo_nome}.{hook}() no processo mestre", flush=True)
+        getattr(modulo, hook)()
+    return app
+
+
+def ler_memoria(pid: int) -> Optional[Dict[str, float]]:
+    """RSS, compartilhada, privada e PSS em MB (None se o kernel não expõe)"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as arquivo:
+            kb = {}
+            for linha in arquivo:
+                partes = linha.split()
+                if len(partes) >= 3 and partes[-1] == "kB":
+                    kb[partes[0].rstrip(":")] = int(partes[1])
+    except OSError:
+        return None
+    return {
+        "rss": kb.get("Rss", 0) / 1024,
+        "compartilhada": (kb.get("Shared_Clean", 0) + kb.get("Shared_Dirty", 0)) / 1024,
+        "privada": (kb.get("Private_Clean", 0) + kb.get("Private_Dirty", 0)) / 1024,
+        "pss": kb.get("Pss", 0) / 1024,
+    }
+
+
+def relatorio_memoria(processos: List[Tuple[str, int]]) -> str:
+    linhas = [f"{'processo':<12}{'pid':>8}{'RSS MB':>10}{'compart. MB':>13}{'privada MB':>12}{'PSS MB':>10}"]
+    total_rss = total_pss = 0.0
+    for nome, pid in processos:
+        memoria = ler_memoria(pid)
+        if memoria is None:
+            return "(memória por processo indisponível: /proc/<pid>/smaps_rollup não existe)"
+        total_rss += memoria["rss"]
+        total_pss += memoria["pss"]
+        linhas.append(
+            f"{nome:<12}{pid:>8}{memoria['rss']:>10.1f}{memoria['compartilhada']:>13.1f}"
+            f"{memoria['privada']:>12.1f}{memoria['pss']:>10.1f}"
+        )
+    linhas.append(f"Σ RSS {total_rss:.1f} MB  |  Σ PSS {total_pss:.1f} MB (memória física de fato)")
+    return "\n".join(linhas)
+
+
+class _ServidorWorker(uvicorn.Server):
+    """uvicorn.Server que avisa o mestre (pipe) quando o lifespan terminou de subir"""
+
+    def __init__(self, config: uvicorn.Config, aviso_fd: int):
+        super().__init__(config)
+        self.aviso_fd = aviso_fd
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            os.write(self.aviso_fd, b"1")
+
+
+class ServidorPrefork:
+    """Mestre: pré-carrega, congela o heap, faz fork e supervisiona os workers"""
+
+    def __init__(
+        self,
+        app,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        workers: int = 2,
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: float = 30.0,
+        log_level: str = "info",
+        access_log: bool = True,
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.log_level = log_level
+        self.access_log = access_log
+        self._ativos: Dict[int, _Worker] = {}
+        self._pendentes: Dict[int, float] = {}  # índice -> quando recriar
+        self._falhas: Dict[int, int] = {}  # quedas seguidas logo ao subir
+        self._encerrando = False
+
+    def _log(self, mensagem: str) -> None:
+        print(f"[prefork {os.getpid()}] {mensagem}", flush=True)
+
+    def _criar_socket(self) -> socket.socket:
+        familia = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(familia, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _fork(self, indice: int) -> None:
+        limite = self.max_requests + random.randint(0, self.max_requests_jitter) if self.max_requests else None
+        pid = os.fork()
+        if pid:
+            self._ativos[pid] = _Worker(indice, pid, time.monotonic())
+            return
+
+        # ---- worker ----
+        codigo = 0
+        try:
+            signal.set_wakeup_fd(-1)
+            for sinal in SINAIS_MESTRE:
+                signal.signal(sinal, signal.SIG_DFL)
+            os.close(self._despertar_r)
+            os.close(self._despertar_w)
+            os.close(self._aviso_r)
+            gc.enable()
+            config = uvicorn.Config(
+                self.app,
+                log_level=self.log_level,
+                access_log=self.access_log,
+                limit_max_requests=limite,
+                timeout_graceful_shutdown=self.graceful_timeout,
+            )
+            _ServidorWorker(config, self._aviso_w).run(sockets=[self._socket])
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            codigo = 1
+        finally:
+            os._exit(codigo)
+
+    def _recolher(self) -> None:
+        """Colhe workers que saíram e agenda a recriação"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self._ativos.pop(pid, None)
+            if worker is None:
+                continue
+            codigo = os.waitstatus_to_exitcode(status)
+            if self._encerrando:
+                continue
+            viveu = time.monotonic() - worker.iniciado_em
+            if codigo == 0:
+                self._log(f"worker {worker.indice} (pid {pid}) reciclado após --max-requests")
+                self._falhas[worker.indice] = 0
+                espera = 0.0
+            else:
+                motivo = f"sinal {signal.Signals(-codigo).name}" if codigo < 0 else f"código {codigo}"
+                self._falhas[worker.indice] = self._falhas.get(worker.indice, 0) + 1 if viveu < 5 else 1
+                espera = min(0.1 * 2 ** (self._falhas[worker.indice] - 1), 10.0)
+                self._log(f"worker {worker.indice} (pid {pid}) caiu ({motivo}); recriando em {espera:.1f}s")
+            self._pendentes[worker.indice] = time.monotonic() + espera
+
+    def _sinalizar(self, sinal: int) -> None:
+        for pid in list(self._ativos):
+            try:
+                os.kill(pid, sinal)
+            except ProcessLookupError:
+                pass
+
+    def _esperar_prontos(self, quantidade: int, timeout: float = 30.0) -> int:
+        prontos = 0
+        limite = time.monotonic() + timeout
+        while prontos < quantidade and time.monotonic() < limite and self._ativos:
+            legiveis, _, _ = select.select([self._aviso_r], [], [], max(0.0, limite - time.monotonic()))
+            if legiveis:
+                prontos += len(os.read(self._aviso_r, quantidade - prontos))
+            self._recolher()  # worker que caiu ao subir não conta
+        return prontos
+
+    def _memoria(self) -> str:
+        processos = [("mestre", os.getpid())]
+        processos += [(f"worker {w.indice}", w.pid) for w in sorted(self._ativos.values(), key=lambda w: w.indice)]
+        return relatorio_memoria(processos)
+
+    def _encerrar(self) -> None:
+        self._encerrando = True
+        self._log(f"encerrando {len(self._ativos)} workers (até {self.graceful_timeout:.0f}s)")
+        self._sinalizar(signal.SIGTERM)
+        limite = time.monotonic() + self.graceful_timeout
+        while self._ativos and time.monotonic() < limite:
+            self._recolher()
+            time.sleep(0.05)
+        if self._ativos:
+            self._log(f"forçando {len(self._ativos)} workers (SIGKILL)")
+            self._sinalizar(signal.SIGKILL)
+            while self._ativos:
+                pid, _ = os.waitpid(-1, 0)
+                self._ativos.pop(pid, None)
+
+    def servir(self) -> None:
+        if not hasattr(os, "fork"):
+            raise RuntimeError("prefork exige fork (Linux/macOS); no Windows use uvicorn --workers")
+
+        self._socket = self._criar_socket()
+        self._aviso_r, self._aviso_w = os.pipe()
+        self._despertar_r, self._despertar_w = os.pipe()
+        os.set_blocking(self._despertar_w, False)
+        signal.set_wakeup_fd(self._despertar_w)
+        for sinal in SINAIS_MESTRE:
+            signal.signal(sinal, lambda *_: None)  # só acorda o select (via wakeup fd)
+
+        # ✅ Tudo o que já existe fica fora do GC: páginas compartilhadas com os workers
+        gc.collect()
+        gc.freeze()
+        gc.enable()
+        self._log(f"{gc.get_freeze_count()} objetos congelados; http://{self.host}:{self.port} com {self.workers} workers")
+
+        for indice in range(self.workers):
+            self._fork(indice)
+        prontos = self._esperar_prontos(self.workers)
+        self._log(f"{prontos}/{self.workers} workers prontos\n{self._memoria()}")
+
+        try:
+            while True:
+                agora = time.monotonic()
+                espera = min([1.0] + [quando - agora for quando in self._pendentes.values()])
+                try:
+                    legiveis, _, _ = select.select([self._despertar_r, self._aviso_r], [], [], max(0.0, espera))
+                except InterruptedError:
+                    legiveis = []
+                if self._aviso_r in legiveis:
+                    # ⚠️ Workers recriados também avisam: sem ler, o pipe enche e o
+                    # próximo worker trava no os.write do startup
+                    os.read(self._aviso_r, 4096)
+                sinais = os.read(self._despertar_r, 64) if self._despertar_r in legiveis else b""
+                if signal.SIGTERM in sinais or signal.SIGINT in sinais:
+                    break
+                if signal.SIGHUP in sinais:
+                    self._log("SIGHUP: repassando aos workers")
+                    self._sinalizar(signal.SIGHUP)
+                if signal.SIGUSR1 in sinais:
+                    self._log(f"memória\n{self._memoria()}")
+                self._recolher()
+                for indice, quando in list(self._pendentes.items()):
+                    if quando <= time.monotonic():
+                        del self._pendentes[indice]
+                        self._fork(indice)
+        finally:
+            self._encerrar()
+            self._socket.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m antifraude.prefork",
+        description="Serve um app ASGI com N workers pré-carregados (fork + copy-on-write)",
+    )
+    parser.add_argument("app", help="modulo:atributo, ex.: main:app")
+    parser.add_argument("--app-dir", default=".", help="diretório do app (vira o cwd)")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", "-w", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("MAX_REQUESTS", "0")),
+                        help="recicla o worker após N requisições (0 = nunca)")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(os.getenv("MAX_REQUESTS_JITTER", "0")),
+                        help="soma 0..J ao limite para os workers não reciclarem juntos")
+    parser.add_argument("--graceful-timeout", type=float, default=30.0)
+    parser.add_argument("--pre-carregar", default="pre_carregar",
+                        help="função do módulo chamada no mestre antes do fork (se existir)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers deve ser >= 1")
+
+    # Objetos do import ficam fora do GC desde já (o freeze acontece antes do fork)
+    gc.disable()
+    inicio = time.perf_counter()
+    app = importar_app(args.app, args.app_dir, args.pre_carregar)
+    print(f"✅ {args.app} pré-carregado em {time.perf_counter() - inicio:.2f}s", flush=True)
+
+    ServidorPrefork(
+        app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        max_requests=args.max_requests,
+        max_requests_jitter=args.max_requests_jitter,
+        graceful_timeout=args.graceful_timeout,
+        log_level=args.log_level,
+        access_log=args.access_log,
+    ).servir()
+
+
+if __name__ == "__main__":
+    main()
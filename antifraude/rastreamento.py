@@ -0,0 +1,208 @@
+"""
+Contexto de Requisição e Spans de Tempo (contextvars)
+=====================================================
+
+Um middleware ASGI abre, para cada requisição HTTP:
+- Um contexto (request_id, client_ip, início) que qualquer função lê com
+  campos_contexto(), sem receber o Request por parâmetro. Os contextvars
+  acompanham a requisição até o threadpool dos endpoints `def`.
+- Um rastro (somente nas requisições sorteadas por taxa_amostragem) onde
+  span("nome") acumula tempos. No fim da requisição o middleware emite
+  UM registro de resumo com todos os spans.
+
+Requisição fora da amostragem: span() devolve um objeto vazio
+compartilhado, e o custo é uma leitura de ContextVar.
+
+O request_id vem do header X-Request-ID (se válido) ou é gerado, e volta
+na resposta no mesmo header.
+"""
+
+import random
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Aceita só ids curtos e sem caracteres de controle (o id vai para os logs)
+_REQUEST_ID_VALIDO = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+
+@dataclass(frozen=True)
+class ContextoRequisicao:
+    request_id: str
+    client_ip: str
+    inicio: float  # time.perf_counter() na chegada
+
+
+class Rastro:
+    """Spans (nome, nanossegundos) de uma requisição rastreada"""
+
+    __slots__ = ("inicio_ns", "spans", "fim_endpoint_ns")
+
+    def __init__(self):
+        self.inicio_ns = time.perf_counter_ns()
+        self.spans: List[Tuple[str, int]] = []
+        self.fim_endpoint_ns: Optional[int] = None
+
+    def adicionar(self, nome: str, nanossegundos: int) -> None:
+        self.spans.append((nome, nanossegundos))
+
+    def resumo(self) -> Dict[str, float]:
+        """Milissegundos por span (spans com o mesmo nome são somados)"""
+        total: Dict[str, int] = {}
+        for nome, ns in self.spans:
+            total[nome] = total.get(nome, 0) + ns
+        return {nome: round(ns / 1e6, 4) for nome, ns in total.items()}
+
+
+_contexto: ContextVar[Optional[ContextoRequisicao]] = ContextVar("contexto_requisicao", default=None)
+_rastro: ContextVar[Optional[Rastro]] = ContextVar("rastro_requisicao", default=None)
+
+
+def contexto_atual() -> Optional[ContextoRequisicao]:
+    return _contexto.get()
+
+
+def rastro_atual() -> Optional[Rastro]:
+    """Rastro da requisição atual (None se fora da amostragem)"""
+    return _rastro.get()
+
+
+def campos_contexto() -> Dict[str, Any]:
+    """Campos do contexto para incluir em registros de log ({} fora de requisição)"""
+    contexto = _contexto.get()
+    if contexto is None:
+        return {}
+    return {
+        "request_id": contexto.request_id,
+        "client_ip": contexto.client_ip,
+        "elapsed_ms": round((time.perf_counter() - contexto.inicio) * 1000, 3),
+    }
+
+
+# ===================================
+# SPANS
+# ===================================
+
+class _Span:
+    __slots__ = ("rastro", "nome", "inicio")
+
+    def __init__(self, rastro: Rastro, nome: str):
+        self.rastro = rastro
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.rastro.adicionar(self.nome, time.perf_counter_ns() - self.inicio)
+        return False
+
+
+class _SpanVazio:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_SPAN_VAZIO = _SpanVazio()
+
+
+def span(nome: str):
+    """Context manager que mede o bloco (não faz nada fora da amostragem)"""
+    rastro = _rastro.get()
+    if rastro is None:
+        return _SPAN_VAZIO
+    return _Span(rastro, nome)
+
+
+def marcar_desde_inicio(nome: str) -> None:
+    """Span do início da requisição até agora (ex.: leitura + validação do body)"""
+    rastro = _rastro.get()
+    if rastro is not None:
+        rastro.adicionar(nome, time.perf_counter_ns() - rastro.inicio_ns)
+
+
+def marcar_fim_endpoint() -> None:
+    """Marca o fim do endpoint; o middleware mede daí até a resposta (serialização)"""
+    rastro = _rastro.get()
+    if rastro is not None:
+        rastro.fim_endpoint_ns = time.perf_counter_ns()
+
+
+# ===================================
+# MIDDLEWARE ASGI
+# ===================================
+
+class MiddlewareRastreamento:
+    """Abre contexto e (por amostragem) rastro para cada requisição HTTP"""
+
+    def __init__(
+        self,
+        app,
+        emitir: Callable[[Dict[str, Any]], None],
+        taxa_amostragem: float = 1.0,
+        aleatorio: Callable[[], float] = random.random,
+    ):
+        if not 0.0 <= taxa_amostragem <= 1.0:
+            raise ValueError("taxa_amostragem deve estar entre 0 e 1")
+        self.app = app
+        self.emitir = emitir  # recebe o resumo da requisição rastreada
+        self.taxa_amostragem = taxa_amostragem
+        self.aleatorio = aleatorio
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for nome, valor in scope["headers"]:
+            if nome == b"x-request-id":
+                request_id = valor.decode("latin-1")
+                break
+        if request_id is None or not _REQUEST_ID_VALIDO.match(request_id):
+            request_id = uuid.uuid4().hex
+        cliente = scope.get("client")
+
+        token_contexto = _contexto.set(ContextoRequisicao(
+            request_id=request_id,
+            client_ip=cliente[0] if cliente else "unknown",
+            inicio=time.perf_counter(),
+        ))
+        rastro = Rastro() if self.taxa_amostragem and self.aleatorio() < self.taxa_amostragem else None
+        token_rastro = _rastro.set(rastro)
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                mensagem = {
+                    **mensagem,
+                    "headers": [*mensagem.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))],
+                }
+                if rastro is not None and rastro.fim_endpoint_ns is not None:
+                    rastro.adicionar("serializacao", time.perf_counter_ns() - rastro.fim_endpoint_ns)
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            if rastro is not None:
+                self.emitir({
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duracao_ms": round((time.perf_counter_ns() - rastro.inicio_ns) / 1e6, 4),
+                    "spans_ms": rastro.resumo(),
+                })
+            _rastro.reset(token_rastro)
+            _contexto.reset(token_contexto)
@@ -0,0 +1,259 @@
+"""
+Motor de Regras Antifraude
+==========================
+
+Carrega uma tabela declarativa de regras (campo, operador, limiar,
+peso, motivo) e compila essa tabela UMA vez em funções de decisão.
+
+Dois modos de avaliação:
+- Primeira regra (RespostaFraude): a primeira regra verdadeira decide
+- Score aditivo (score_risco): soma o peso de todas as regras verdadeiras
+
+A compilação gera o mesmo encadeamento de "if" que escreveríamos à mão,
+então avaliar uma transação custa o mesmo que o código original.
+"""
+
+import json
+import math
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Operadores aceitos na tabela (nada além disso vira código)
+OPERADORES = (">", ">=", "<", "<=", "==", "!=")
+
+
+@dataclass(frozen=True)
+class Condicao:
+    """Uma comparação simples: campo <operador> limiar"""
+    campo: str
+    operador: str
+    limiar: float
+
+
+@dataclass(frozen=True)
+class Regra:
+    """Uma linha da tabela de regras"""
+    nome: str
+    condicoes: Tuple[Condicao, ...]
+    peso: float  # confiança (modo primeira regra) ou score (modo aditivo)
+    motivo: str = ""
+    evento: str = ""  # nome do evento de log quando a regra é ativada
+    qualquer: bool = False  # False: todas as condições (E) / True: qualquer uma (OU)
+
+
+def _criar_condicao(campo: str, operador: str, limiar: Any) -> Condicao:
+    if not str(campo).isidentifier():
+        raise ValueError(f"Campo inválido na tabela de regras: {campo!r}")
+    if operador not in OPERADORES:
+        raise ValueError(f"Operador inválido na tabela de regras: {operador!r}")
+    if isinstance(limiar, bool) or not isinstance(limiar, (int, float)):
+        raise ValueError(f"Limiar deve ser numérico: {limiar!r}")
+    # ⚠️ inf/nan passariam, mas viram nomes inexistentes no código compilado
+    if not math.isfinite(limiar):
+        raise ValueError(f"Limiar deve ser finito: {limiar!r}")
+    return Condicao(campo=campo, operador=operador, limiar=limiar)
+
+
+def _criar_regra(linha: Dict[str, Any]) -> Regra:
+    if "condicoes" in linha:
+        condicoes = tuple(_criar_condicao(*c) for c in linha["condicoes"])
+    else:
+        condicoes = (_criar_condicao(linha["campo"], linha["operador"], linha["limiar"]),)
+
+    if "score" in linha:
+        peso = linha["score"]
+    else:
+        peso = linha["confianca"]
+
+    return Regra(
+        nome=linha["nome"],
+        condicoes=condicoes,
+        peso=float(peso),
+        motivo=linha.get("motivo", ""),
+        evento=linha.get("evento", ""),
+        qualquer=linha.get("combinar", "e") == "ou",
+    )
+
+
+def carregar_regras(fonte: Union[str, Path, Sequence[Dict[str, Any]]]) -> List[Regra]:
+    """
+    Carrega a tabela de regras de uma lista de dicts ou de um arquivo JSON.
+
+    Cada linha tem "nome", "score" (ou "confianca"), "motivo" e:
+    - "campo", "operador" e "limiar" para uma condição simples; ou
+    - "condicoes": [[campo, operador, limiar], ...] e "combinar": "e"/"ou"
+    """
+    if isinstance(fonte, (str, Path)):
+        with open(fonte, encoding="utf-8") as arquivo:
+            fonte = json.load(arquivo)
+
+    regras = [_criar_regra(linha) for linha in fonte]
+
+    nomes = [regra.nome for regra in regras]
+    if len(nomes) != len(set(nomes)):
+        raise ValueError("Nomes de regras duplicados na tabela")
+
+    return regras
+
+
+# ========================================
+# COMPILAÇÃO - UMA TRANSAÇÃO POR VEZ
+# ========================================
+
+def _expressao(regra: Regra, variavel: str) -> str:
+    juncao = " or " if regra.qualquer else " and "
+    return juncao.join(
+        f"{variavel}.{c.campo} {c.operador} {c.limiar!r}" for c in regra.condicoes
+    )
+
+
+def _compilar(codigo: str, nome: str, ambiente: Dict[str, Any]) -> Callable:
+    exec(compile(codigo, f"<regras:{nome}>", "exec"), ambiente)
+    return ambiente[nome]
+
+
+def compilar_primeira(regras: Sequence[Regra]) -> Callable[[Any], Optional[Regra]]:
+    """
+    Compila as regras no modo "primeira regra".
+
+    A função gerada recebe a transação e devolve a primeira Regra
+    verdadeira (na ordem da tabela) ou None se nenhuma for ativada.
+    """
+    linhas = ["def avaliar(t):"]
+    for i, regra in enumerate(regras):
+        linhas.append(f"    if {_expressao(regra, 't')}:")
+        linhas.append(f"        return _r{i}")
+    linhas.append("    return None")
+
+    ambiente = {f"_r{i}": regra for i, regra in enumerate(regras)}
+    return _compilar("\n".join(linhas), "avaliar", ambiente)
+
+
+def compilar_score(regras: Sequence[Regra]) -> Callable[[Any], Tuple[float, List[str]]]:
+    """
+    Compila as regras no modo "score aditivo".
+
+    A função gerada recebe a transação e devolve (score, regras_ativadas),
+    somando os pesos na ordem da tabela.
+    """
+    linhas = [
+        "def avaliar(t):",
+        "    score = 0.0",
+        "    ativadas = []",
+    ]
+    for regra in regras:
+        linhas.append(f"    if {_expressao(regra, 't')}:")
+        linhas.append(f"        score += {regra.peso!r}")
+        linhas.append(f"        ativadas.append({regra.nome!r})")
+    linhas.append("    return score, ativadas")
+
+    return _compilar("\n".join(linhas), "avaliar", {})
+
+
+def compilar_score_cronometrado(
+    regras: Sequence[Regra],
+) -> Callable[[Any, List[Tuple[str, int]]], Tuple[float, List[str]]]:
+    """
+    Mesmo resultado de compilar_score, medindo o tempo de cada regra.
+
+    A função gerada recebe (transacao, tempos) e acrescenta em tempos um
+    par (nome_da_regra, nanossegundos) por regra avaliada. Use só nas
+    requisições rastreadas: a versão sem medição continua mais barata.
+    """
+    linhas = [
+        "def avaliar(t, tempos):",
+        "    score = 0.0",
+        "    ativadas = []",
+    ]
+    for regra in regras:
+        linhas.append("    inicio = _ns()")
+        linhas.append(f"    ativou = {_expressao(regra, 't')}")
+        linhas.append(f"    tempos.append(({regra.nome!r}, _ns() - inicio))")
+        linhas.append("    if ativou:")
+        linhas.append(f"        score += {regra.peso!r}")
+        linhas.append(f"        ativadas.append({regra.nome!r})")
+    linhas.append("    return score, ativadas")
+
+    return _compilar("\n".join(linhas), "avaliar", {"_ns": time.perf_counter_ns})
+
+
+# ========================================
+# COMPILAÇÃO - LOTES (NumPy)
+# ========================================
+
+def _mascara(regra: Regra, colunas: Dict[str, np.ndarray]) -> np.ndarray:
+    mascara = None
+    for c in regra.condicoes:
+        coluna = colunas[c.campo]
+        if c.operador == ">":
+            atual = coluna > c.limiar
+        elif c.operador == ">=":
+            atual = coluna >= c.limiar
+        elif c.operador == "<":
+            atual = coluna < c.limiar
+        elif c.operador == "<=":
+            atual = coluna <= c.limiar
+        elif c.operador == "==":
+            atual = coluna == c.limiar
+        else:
+            atual = coluna != c.limiar
+
+        if mascara is None:
+            mascara = atual
+        elif regra.qualquer:
+            mascara = mascara | atual
+        else:
+            mascara = mascara & atual
+    return mascara
+
+
+def campos_usados(regras: Sequence[Regra]) -> List[str]:
+    """Lista (sem repetição, em ordem) os campos lidos pelas regras"""
+    campos = {}
+    for regra in regras:
+        for c in regra.condicoes:
+            campos[c.campo] = None
+    return list(campos)
+
+
+def compilar_lote_primeira(regras: Sequence[Regra]) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+    """
+    Versão vetorizada do modo "primeira regra".
+
+    Recebe um dict campo -> coluna NumPy e devolve, para cada linha,
+    o índice da primeira regra verdadeira ou -1 se nenhuma for ativada.
+    """
+    def avaliar_lote(colunas: Dict[str, np.ndarray]) -> np.ndarray:
+        mascaras = [_mascara(regra, colunas) for regra in regras]
+        if not mascaras:
+            return np.full(len(next(iter(colunas.values()))), -1)
+        return np.select(mascaras, list(range(len(regras))), default=-1)
+
+    return avaliar_lote
+
+
+def compilar_lote_score(regras: Sequence[Regra]) -> Callable[[Dict[str, np.ndarray]], Tuple[np.ndarray, np.ndarray]]:
+    """
+    Versão vetorizada do modo "score aditivo".
+
+    Recebe um dict campo -> coluna NumPy e devolve (scores, ativadas),
+    onde ativadas é uma matriz booleana linhas x regras.
+    """
+    pesos = [regra.peso for regra in regras]
+
+    def avaliar_lote(colunas: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(next(iter(colunas.values())))
+        ativadas = np.zeros((n, len(regras)), dtype=bool)
+        scores = np.zeros(n, dtype=np.float64)
+        # Soma na mesma ordem do modo escalar: resultados idênticos em float
+        for j, regra in enumerate(regras):
+            mascara = _mascara(regra, colunas)
+            ativadas[:, j] = mascara
+            scores[mascara] += pesos[j]
+        return scores, ativadas
+
+    return avaliar_lote
@@ -0,0 +1,164 @@
+"""
+Liveness e Readiness com Verificações em Segundo Plano
+======================================================
+
+O orquestrador sonda cada pod a cada segundo. A sonda não pode custar
+nada nem depender do modelo ou do disco, então:
+
+- /health/live: o processo responde? (corpo fixo, nenhum trabalho)
+- /health/ready: lê o ÚLTIMO resultado das verificações (modelo
+  carregado, configuração válida, filas abaixo do limite). Quem roda as
+  verificações é uma thread, a cada `intervalo` segundos; a resposta
+  (status + corpo JSON) já fica pronta, a sonda só devolve a referência
+- Resultado velho (thread travada) também conta como não pronto
+- drenar(): fica "não pronto" na hora (desligamento em andamento) para o
+  balanceador parar de mandar tráfego antes de o processo sair
+
+drenar_no_sigterm() encadeia isso no SIGTERM do uvicorn: o pod sai do
+balanceador, espera `segundos` e só então o uvicorn começa a desligar.
+"""
+
+import asyncio
+import json
+import logging
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
+
+from fastapi import Response
+
+logger = logging.getLogger(__name__)
+
+# Uma verificação devolve ok ou (ok, detalhe)
+Verificacao = Callable[[], Union[bool, Tuple[bool, Any]]]
+
+CORPO_VIVO = b'{"status":"alive"}'
+
+
+@dataclass(frozen=True)
+class EstadoProntidao:
+    """Resultado de uma rodada de verificações (trocado por inteiro)"""
+    pronto: bool
+    verificado_em: float  # time.monotonic()
+    status_http: int
+    corpo: bytes
+
+
+class MonitorSaude:
+    """Roda as verificações numa thread e guarda a resposta de readiness pronta"""
+
+    def __init__(self, verificacoes: Mapping[str, Verificacao], intervalo: float = 1.0):
+        self.verificacoes = dict(verificacoes)
+        self.intervalo = intervalo
+        self.drenando = False
+        self._parar = threading.Event()
+        self._thread = None
+        self._estado = self._publicar({}, pronto=False, motivo="iniciando")
+
+    def _publicar(self, resultados: Dict[str, Any], pronto: bool, motivo: Optional[str] = None) -> EstadoProntidao:
+        if self.drenando:  # vence qualquer verificação que termine depois do drenar()
+            pronto, motivo = False, "draining"
+        corpo = {"status": "ready" if pronto else "not_ready", "checks": resultados}
+        if motivo:
+            corpo["reason"] = motivo
+        self._estado = EstadoProntidao(
+            pronto=pronto,
+            verificado_em=time.monotonic(),
+            status_http=200 if pronto else 503,
+            corpo=json.dumps(corpo, ensure_ascii=False, default=str).encode("utf-8"),
+        )
+        return self._estado
+
+    def verificar(self) -> EstadoProntidao:
+        """Uma rodada de verificações (a thread chama; testes também)"""
+        resultados = {}
+        pronto = True
+        for nome, verificacao in self.verificacoes.items():
+            try:
+                resultado = verificacao()
+                ok, detalhe = resultado if isinstance(resultado, tuple) else (bool(resultado), None)
+            except Exception as e:
+                ok, detalhe = False, f"{type(e).__name__}: {e}"
+            resultados[nome] = {"ok": bool(ok), **({"detail": detalhe} if detalhe is not None else {})}
+            pronto = pronto and bool(ok)
+        anterior = self._estado.pronto
+        estado = self._publicar(resultados, pronto)
+        if anterior != estado.pronto and not self.drenando:
+            falhas = [nome for nome, r in resultados.items() if not r["ok"]]
+            logger.log(
+                logging.INFO if pronto else logging.WARNING,
+                "Readiness: %s%s", "pronto" if pronto else "NÃO pronto", f" ({', '.join(falhas)})" if falhas else "",
+            )
+        return estado
+
+    def _rodar(self) -> None:
+        while not self._parar.is_set():
+            self.verificar()
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self) -> None:
+        if self._thread is not None:
+            return
+        self._parar.clear()
+        self.verificar()  # primeira resposta já real, sem esperar o intervalo
+        self._thread = threading.Thread(target=self._rodar, name="saude", daemon=True)
+        self._thread.start()
+
+    def parar(self) -> None:
+        if self._thread is None:
+            return
+        self._parar.set()
+        self._thread.join()
+        self._thread = None
+
+    def drenar(self) -> None:
+        """Não pronto a partir de agora (não volta)"""
+        if not self.drenando:
+            self.drenando = True
+            self._publicar({}, pronto=False)
+            logger.warning("Readiness: drenando (desligamento em andamento)")
+
+    def resposta_pronto(self) -> Response:
+        """Para o endpoint /health/ready: só lê o estado já calculado"""
+        estado = self._estado
+        if estado.pronto and time.monotonic() - estado.verificado_em > 3 * self.intervalo + 1:
+            return Response(b'{"status":"not_ready","reason":"stale_checks"}', 503, media_type="application/json")
+        return Response(estado.corpo, estado.status_http, media_type="application/json")
+
+    @staticmethod
+    def resposta_vivo() -> Response:
+        """Para o endpoint /health/live"""
+        return Response(CORPO_VIVO, media_type="application/json")
+
+
+def drenar_no_sigterm(monitor: MonitorSaude, segundos: float) -> bool:
+    """
+    Encadeia no handler de SIGTERM que o uvicorn instalou no event loop.
+
+    1º SIGTERM: monitor.drenar() e agenda o handler do uvicorn para daqui
+    a `segundos`. 2º SIGTERM: repassa na hora. Chame no lifespan (o
+    uvicorn já instalou os handlers). Fora da thread principal (TestClient)
+    ou sem handler do uvicorn, não faz nada e devolve False.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    loop = asyncio.get_running_loop()
+    # ⚠️ asyncio não tem API pública para ler o handler atual
+    handler_uvicorn = getattr(loop, "_signal_handlers", {}).get(signal.SIGTERM)
+    if handler_uvicorn is None:
+        return False
+
+    def repassar():
+        handler_uvicorn._run()
+
+    def ao_receber():
+        if monitor.drenando:
+            repassar()
+            return
+        monitor.drenar()
+        loop.call_later(segundos, repassar)
+
+    loop.add_signal_handler(signal.SIGTERM, ao_receber)
+    return True
@@ -0,0 +1,94 @@
+"""
+Testes da amostragem e do limite de taxa por evento de log
+"""
+
+import pytest
+
+from antifraude.amostragem import AmostragemEventos, ConfigAmostragem, ler_config
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_sem_configuracao_emite_tudo():
+    amostragem = AmostragemEventos()
+
+    assert all(amostragem.permitir("transaction_approved") for _ in range(100))
+
+
+def test_taxa_de_amostragem_por_evento():
+    sorteios = iter([0.005, 0.5, 0.9, 0.001])
+    amostragem = AmostragemEventos(
+        ConfigAmostragem(taxas={"transaction_approved": 0.01}),
+        aleatorio=lambda: next(sorteios),
+    )
+
+    resultados = [amostragem.permitir("transaction_approved") for _ in range(4)]
+
+    assert resultados == [True, False, False, True]
+    assert amostragem.permitir("fraud_detected")  # sem taxa: sempre emite
+    assert amostragem.estatisticas()["suprimidos"]["transaction_approved"]["amostrados_fora"] == 2
+
+
+def test_limite_de_taxa_reabastece_com_o_tempo():
+    relogio = Relogio()
+    amostragem = AmostragemEventos(ConfigAmostragem(limites={"transaction_received": 2}), relogio=relogio)
+
+    assert [amostragem.permitir("transaction_received") for _ in range(3)] == [True, True, False]
+
+    relogio.agora = 0.5  # meio segundo = 1 token
+    assert [amostragem.permitir("transaction_received") for _ in range(2)] == [True, False]
+    assert amostragem.estatisticas()["suprimidos"]["transaction_received"]["limitados"] == 2
+
+
+def test_limite_abaixo_de_um_por_segundo():
+    relogio = Relogio()
+    amostragem = AmostragemEventos(ConfigAmostragem(limites={"fraud_detected": 0.5}), relogio=relogio)
+
+    assert [amostragem.permitir("fraud_detected") for _ in range(2)] == [True, False]
+
+    relogio.agora = 1.0  # meio token
+    assert not amostragem.permitir("fraud_detected")
+    relogio.agora = 2.0  # um registro a cada 2 s
+    assert amostragem.permitir("fraud_detected")
+
+
+def test_configurar_em_tempo_de_execucao():
+    amostragem = AmostragemEventos(aleatorio=lambda: 0.5)
+    assert amostragem.permitir("transaction_approved")
+
+    amostragem.configurar(taxas={"transaction_approved": 0.1})
+    assert not amostragem.permitir("transaction_approved")
+
+    amostragem.configurar(taxa_padrao=0.0)  # taxas anteriores são mantidas
+    assert amostragem.config.taxas == {"transaction_approved": 0.1}
+    assert not amostragem.permitir("health_check")
+
+
+def test_configuracao_invalida_nao_troca_a_atual():
+    amostragem = AmostragemEventos(ConfigAmostragem(taxas={"a": 0.5}))
+
+    with pytest.raises(ValueError):
+        amostragem.configurar(taxas={"a": 2.0})
+    with pytest.raises(ValueError):
+        amostragem.configurar(limites={"a": 0})
+
+    assert amostragem.config.taxas == {"a": 0.5}
+
+
+def test_ler_config_do_ambiente():
+    assert ler_config("transaction_approved=0.01, fraud_detected=1") == {
+        "transaction_approved": 0.01,
+        "fraud_detected": 1.0,
+    }
+    assert ler_config("") == {}
+    assert ler_config(None) == {}
+    with pytest.raises(ValueError):
+        ler_config("transaction_approved")
+    with pytest.raises(ValueError):
+        ler_config("transaction_approved=muito")
@@ -0,0 +1,68 @@
+"""
+Testes do codec rápido: mesmas respostas e mesmo OpenAPI do caminho padrão
+"""
+
+from typing import Optional
+
+from fastapi import FastAPI, Header
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, Field
+
+from antifraude.codec import RotaCodecRapido
+
+
+class Entrada(BaseModel):
+    valor: float = Field(..., gt=0)
+    hora_do_dia: int = Field(..., ge=0, le=23)
+
+
+class Saida(BaseModel):
+    fraude: bool
+    valor_processado: float
+    chave: Optional[str] = None
+
+
+def criar_app(rapido: bool) -> FastAPI:
+    app = FastAPI()
+    if rapido:
+        app.router.route_class = RotaCodecRapido
+
+    @app.post("/analisar", response_model=Saida)
+    def analisar(entrada: Entrada, chave: Optional[str] = Header(None, alias="X-Chave")):
+        return Saida(fraude=entrada.valor > 10000, valor_processado=entrada.valor, chave=chave)
+
+    return app
+
+
+PADRAO = TestClient(criar_app(rapido=False))
+RAPIDO = TestClient(criar_app(rapido=True))
+
+
+def test_openapi_identico():
+    assert RAPIDO.app.openapi() == PADRAO.app.openapi()
+
+
+def test_resposta_identica():
+    payload = {"valor": 15000, "hora_do_dia": 3}
+
+    padrao = PADRAO.post("/analisar", json=payload, headers={"X-Chave": "abc"})
+    rapido = RAPIDO.post("/analisar", json=payload, headers={"X-Chave": "abc"})
+
+    assert rapido.status_code == padrao.status_code == 200
+    assert rapido.json() == padrao.json()
+    assert rapido.headers["content-type"] == "application/json"
+
+
+def test_restricoes_dos_campos_continuam_valendo():
+    for payload in ({"valor": 0, "hora_do_dia": 3}, {"valor": 10, "hora_do_dia": 24}, {"valor": 10}):
+        padrao = PADRAO.post("/analisar", json=payload)
+        rapido = RAPIDO.post("/analisar", json=payload)
+
+        assert rapido.status_code == padrao.status_code == 422
+        assert rapido.json() == padrao.json()
+
+
+def test_json_invalido_gera_422():
+    resposta = RAPIDO.post("/analisar", content=b"{quebrado", headers={"content-type": "application/json"})
+
+    assert resposta.status_code == 422
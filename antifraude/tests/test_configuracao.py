@@ -0,0 +1,109 @@
+"""
+Testes da configuração recarregável (.env + SIGHUP)
+"""
+
+import os
+import signal
+import time
+from dataclasses import dataclass
+
+import pytest
+
+from antifraude.configuracao import GerenciadorConfiguracao
+
+
+@dataclass(frozen=True)
+class Config:
+    threshold: float
+
+
+def ler(valores):
+    threshold = float(valores.get("THRESHOLD_TESTE", "100"))
+    if threshold <= 0:
+        raise ValueError("THRESHOLD_TESTE deve ser positivo")
+    return Config(threshold)
+
+
+def esperar(condicao, segundos=2.0):
+    limite = time.monotonic() + segundos
+    while not condicao() and time.monotonic() < limite:
+        time.sleep(0.01)
+    return condicao()
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    caminho = tmp_path / ".env"
+    caminho.write_text("THRESHOLD_TESTE=100\n")
+    return caminho
+
+
+def test_recarrega_quando_o_arquivo_muda(arquivo):
+    gerenciador = GerenciadorConfiguracao(str(arquivo), ler, intervalo=0.02)
+    gerenciador.iniciar(sighup=False)
+    try:
+        anterior = gerenciador.atual
+        arquivo.write_text("THRESHOLD_TESTE=250\n")
+
+        assert esperar(lambda: gerenciador.atual.threshold == 250)
+        assert anterior == Config(100)  # snapshot antigo não muda
+    finally:
+        gerenciador.parar()
+
+
+def test_valor_invalido_mantem_o_snapshot_atual(arquivo):
+    gerenciador = GerenciadorConfiguracao(str(arquivo), ler)
+    arquivo.write_text("THRESHOLD_TESTE=-5\n")
+
+    with pytest.raises(ValueError):
+        gerenciador.recarregar()
+
+    assert gerenciador.atual == Config(100)
+    assert gerenciador.estatisticas()["rejeitadas"] == 1
+
+
+def test_callback_que_falha_restaura_o_anterior(arquivo):
+    def falhar(anterior, novo):
+        raise RuntimeError("modelo não carregou")
+
+    gerenciador = GerenciadorConfiguracao(str(arquivo), ler, ao_mudar=[falhar])
+    arquivo.write_text("THRESHOLD_TESTE=300\n")
+
+    with pytest.raises(RuntimeError):
+        gerenciador.recarregar()
+    assert gerenciador.atual == Config(100)
+
+
+def test_recarga_informa_valores_antigos_e_novos(arquivo):
+    vistos = []
+    gerenciador = GerenciadorConfiguracao(str(arquivo), ler, ao_mudar=[lambda a, n: vistos.append((a, n))])
+    arquivo.write_text("THRESHOLD_TESTE=42\n")
+
+    assert gerenciador.recarregar() == {"threshold": {"anterior": 100, "novo": 42}}
+    assert vistos == [(Config(100), Config(42))]
+    assert gerenciador.recarregar() == {}  # nada mudou: sem callbacks
+    assert len(vistos) == 1
+
+
+def test_variavel_do_ambiente_vence_o_arquivo(arquivo, monkeypatch):
+    monkeypatch.setenv("THRESHOLD_TESTE", "999")
+    gerenciador = GerenciadorConfiguracao(str(arquivo), ler)
+    arquivo.write_text("THRESHOLD_TESTE=1\n")
+    gerenciador.recarregar()
+
+    assert gerenciador.atual == Config(999)
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="SIGHUP só existe em POSIX")
+def test_sighup_recarrega(arquivo):
+    anterior = signal.getsignal(signal.SIGHUP)
+    gerenciador = GerenciadorConfiguracao(str(arquivo), ler, intervalo=0)
+    gerenciador.iniciar()
+    try:
+        arquivo.write_text("THRESHOLD_TESTE=7\n")
+        os.kill(os.getpid(), signal.SIGHUP)
+
+        assert esperar(lambda: gerenciador.atual.threshold == 7)
+    finally:
+        gerenciador.parar()
+        signal.signal(signal.SIGHUP, anterior)
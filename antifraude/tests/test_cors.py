@@ -0,0 +1,98 @@
+"""
+Testes do CORS compilado (curingas, preflight com Max-Age, contadores)
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from antifraude.cors import CorrespondenteOrigens, EstatisticasCORS, MiddlewareCORS
+
+
+def test_origens_exatas_e_curingas():
+    correspondente = CorrespondenteOrigens(["https://site.com", "https://*.site.com", "http://*.app.local:3000"])
+
+    assert correspondente.casar("https://site.com") == "https://site.com"
+    assert correspondente.casar("https://app.site.com") == "https://*.site.com"
+    assert correspondente.casar("https://a.b.site.com") == "https://*.site.com"
+    assert correspondente.casar("http://dev.app.local:3000") == "http://*.app.local:3000"
+    assert correspondente.casar("http://dev.app.local:4000") is None
+    assert correspondente.casar("http://app.site.com") is None  # outro esquema
+    assert correspondente.casar("https://outrosite.com") is None
+    assert correspondente.casar("null") is None
+
+
+def test_curinga_invalido():
+    with pytest.raises(ValueError):
+        CorrespondenteOrigens(["https://app.*.com"])
+    with pytest.raises(ValueError):
+        CorrespondenteOrigens(["https://*.com"])  # domínio de topo inteiro
+    with pytest.raises(ValueError):
+        CorrespondenteOrigens(["site.com"])
+
+
+def criar_app(origens, estatisticas, **opcoes):
+    app = FastAPI()
+    chamadas = []
+
+    @app.post("/predict")
+    def predict():
+        chamadas.append(1)
+        return {"ok": True}
+
+    app.add_middleware(MiddlewareCORS, obter_origens=lambda: origens[0], estatisticas=estatisticas, **opcoes)
+    return TestClient(app), chamadas
+
+
+def test_preflight_respondido_sem_chegar_na_rota():
+    estatisticas = EstatisticasCORS()
+    cliente, chamadas = criar_app([("https://*.site.com",)], estatisticas, max_age=3600)
+
+    resposta = cliente.options(
+        "/predict",
+        headers={"Origin": "https://app.site.com", "Access-Control-Request-Method": "POST"},
+    )
+
+    assert resposta.status_code == 200
+    assert resposta.headers["access-control-allow-origin"] == "https://app.site.com"
+    assert resposta.headers["access-control-max-age"] == "3600"
+    assert chamadas == []
+    assert estatisticas.preflights == 1
+
+
+def test_origem_recusada():
+    estatisticas = EstatisticasCORS()
+    cliente, _ = criar_app([("https://site.com",)], estatisticas)
+
+    preflight = cliente.options(
+        "/predict",
+        headers={"Origin": "https://malicioso.com", "Access-Control-Request-Method": "POST"},
+    )
+    simples = cliente.post("/predict", headers={"Origin": "https://malicioso.com"})
+
+    assert preflight.status_code == 400
+    assert "access-control-allow-origin" not in simples.headers
+    assert estatisticas.como_dict()["preflights_recusados"] == 1
+    assert estatisticas.como_dict()["origens_recusadas"] == 1
+
+
+def test_credenciais_devolvem_a_origem_em_vez_de_asterisco():
+    estatisticas = EstatisticasCORS()
+    cliente, _ = criar_app([("*",)], estatisticas, allow_credentials=True)
+
+    resposta = cliente.post("/predict", headers={"Origin": "https://qualquer.com"})
+
+    assert resposta.headers["access-control-allow-origin"] == "https://qualquer.com"
+    assert resposta.headers["access-control-allow-credentials"] == "true"
+    assert resposta.headers["vary"] == "Origin"
+    assert estatisticas.por_origem_permitida == {"*": 1}
+
+
+def test_origens_recarregadas_sao_recompiladas():
+    origens = [("https://antigo.com",)]
+    cliente, _ = criar_app(origens, EstatisticasCORS())
+    assert cliente.post("/predict", headers={"Origin": "https://novo.com"}).headers.get("access-control-allow-origin") is None
+
+    origens[0] = ("https://novo.com",)
+
+    assert cliente.post("/predict", headers={"Origin": "https://novo.com"}).headers["access-control-allow-origin"] == "https://novo.com"
@@ -0,0 +1,141 @@
+"""
+Testes do handler de logs com fila e escritor em lotes
+"""
+
+import io
+import logging
+import threading
+
+import pytest
+
+from antifraude.fila_logs import HandlerFila
+
+
+class StreamLento(io.StringIO):
+    """Stream que só escreve quando liberado (simula coletor travado)"""
+
+    def __init__(self):
+        super().__init__()
+        self.liberado = threading.Event()
+        self.writes = 0
+
+    def write(self, texto):
+        self.liberado.wait(5)
+        self.writes += 1
+        return super().write(texto)
+
+
+def criar_logger(handler: HandlerFila) -> logging.Logger:
+    logger = logging.getLogger(f"teste-fila-{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+
+def esperar_escritor_travado(handler: HandlerFila) -> None:
+    """Espera o escritor retirar o primeiro registro e travar no write"""
+    with handler._condicao:
+        handler._condicao.wait_for(lambda: handler._escrevendo, 5)
+
+
+def test_registros_sao_escritos_em_ordem():
+    stream = io.StringIO()
+    handler = HandlerFila(stream)
+    logger = criar_logger(handler)
+
+    for i in range(100):
+        logger.info("registro %d", i)
+    handler.flush()
+
+    assert stream.getvalue().splitlines() == [f"registro {i}" for i in range(100)]
+    assert handler.estatisticas()["escritos"] == 100
+    handler.close()
+
+
+def test_escritor_agrupa_registros_em_poucos_writes():
+    stream = StreamLento()
+    handler = HandlerFila(stream)
+    logger = criar_logger(handler)
+
+    for i in range(500):
+        logger.info("registro %d", i)
+    stream.liberado.set()
+    handler.flush()
+
+    assert len(stream.getvalue().splitlines()) == 500
+    assert stream.writes < 10
+    handler.close()
+
+
+def test_drop_oldest_mantem_os_mais_recentes():
+    stream = StreamLento()
+    handler = HandlerFila(stream, max_registros=10, politica="drop-oldest")
+    logger = criar_logger(handler)
+
+    logger.info("primeiro")
+    esperar_escritor_travado(handler)
+    for i in range(30):
+        logger.info("registro %d", i)
+    stream.liberado.set()
+    handler.flush()
+
+    linhas = stream.getvalue().splitlines()
+    assert linhas == ["primeiro"] + [f"registro {i}" for i in range(20, 30)]
+    assert handler.estatisticas()["descartados"] == 20
+    handler.close()
+
+
+def test_drop_newest_mantem_os_mais_antigos():
+    stream = StreamLento()
+    handler = HandlerFila(stream, max_registros=10, politica="drop-newest")
+    logger = criar_logger(handler)
+
+    logger.info("primeiro")
+    esperar_escritor_travado(handler)
+    for i in range(30):
+        logger.info("registro %d", i)
+    stream.liberado.set()
+    handler.flush()
+
+    linhas = stream.getvalue().splitlines()
+    assert linhas == ["primeiro"] + [f"registro {i}" for i in range(10)]
+    assert handler.estatisticas()["descartados"] == 20
+    handler.close()
+
+
+def test_block_nao_descarta_nada():
+    stream = StreamLento()
+    handler = HandlerFila(stream, max_registros=5, politica="block")
+    logger = criar_logger(handler)
+
+    produtor = threading.Thread(target=lambda: [logger.info("registro %d", i) for i in range(50)])
+    produtor.start()
+    produtor.join(0.2)
+    assert produtor.is_alive()  # esperando espaço na fila
+
+    stream.liberado.set()
+    produtor.join(5)
+    handler.flush()
+
+    assert len(stream.getvalue().splitlines()) == 50
+    assert handler.estatisticas()["descartados"] == 0
+    handler.close()
+
+
+def test_close_escreve_o_que_sobrou():
+    stream = io.StringIO()
+    handler = HandlerFila(stream)
+    logger = criar_logger(handler)
+
+    for i in range(20):
+        logger.info("registro %d", i)
+    handler.close()
+
+    assert len(stream.getvalue().splitlines()) == 20
+    assert not handler._escritor.is_alive()
+
+
+def test_politica_invalida():
+    with pytest.raises(ValueError):
+        HandlerFila(io.StringIO(), politica="descartar-tudo")
@@ -0,0 +1,81 @@
+"""
+Testes do cache de Idempotency-Key
+"""
+
+import threading
+import time
+
+import pytest
+
+from antifraude.idempotencia import CacheIdempotencia, ConflitoIdempotencia
+
+
+def test_retentativa_recebe_resultado_em_cache():
+    cache = CacheIdempotencia()
+    execucoes = []
+
+    for _ in range(3):
+        resultado = cache.executar("chave", "payload", lambda: execucoes.append(1) or "decisao")
+
+    assert resultado == "decisao"
+    assert len(execucoes) == 1
+    assert cache.estatisticas()["hits"] == 2
+
+
+def test_requisicoes_simultaneas_compartilham_uma_execucao():
+    cache = CacheIdempotencia()
+    execucoes = []
+    resultados = []
+
+    def lenta():
+        execucoes.append(1)
+        time.sleep(0.1)
+        return "decisao"
+
+    threads = [
+        threading.Thread(target=lambda: resultados.append(cache.executar("chave", "payload", lenta)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert resultados == ["decisao"] * 5
+    assert len(execucoes) == 1
+    assert cache.estatisticas()["coalesced"] + cache.estatisticas()["hits"] == 4
+
+
+def test_mesma_chave_com_outro_payload_e_conflito():
+    cache = CacheIdempotencia()
+    cache.executar("chave", "payload-1", lambda: "decisao")
+
+    with pytest.raises(ConflitoIdempotencia):
+        cache.executar("chave", "payload-2", lambda: "outra")
+
+
+def test_erro_nao_fica_em_cache():
+    cache = CacheIdempotencia()
+
+    def falha():
+        raise RuntimeError("falhou")
+
+    with pytest.raises(RuntimeError):
+        cache.executar("chave", "payload", falha)
+
+    assert cache.executar("chave", "payload", lambda: "decisao") == "decisao"
+
+
+def test_ttl_e_limite_de_chaves():
+    agora = [0.0]
+    cache = CacheIdempotencia(max_chaves=2, ttl_segundos=10, relogio=lambda: agora[0])
+    execucoes = []
+
+    for chave in ("a", "b", "c"):
+        cache.executar(chave, "p", lambda: execucoes.append(chave))
+    assert cache.estatisticas()["chaves"] == 2  # "a" saiu pelo LRU
+
+    agora[0] = 11.0
+    cache.executar("b", "p", lambda: execucoes.append("b"))  # expirou: executa de novo
+
+    assert execucoes == ["a", "b", "c", "b"]
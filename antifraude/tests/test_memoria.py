@@ -0,0 +1,113 @@
+"""
+Testes do diagnóstico de memória (tracemalloc)
+"""
+
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from antifraude.memoria import MiddlewareAlocacoes, RastreadorMemoria, criar_router_memoria
+
+VAZAMENTO = []
+
+
+class Pedido(BaseModel):
+    valor: float
+
+
+def criar_app():
+    rastreador = RastreadorMemoria(rotas=["/analisar", "/temporario"])
+    app = FastAPI()
+    app.add_middleware(MiddlewareAlocacoes, rastreador=rastreador)
+    app.include_router(criar_router_memoria(rastreador, modelos=[Pedido]))
+
+    @app.post("/analisar")
+    def analisar(pedido: Pedido):
+        VAZAMENTO.append((pedido, bytearray(10_000)))  # simula um cache que nunca é limpo
+        return {"ok": True}
+
+    @app.post("/temporario")
+    def temporario(pedido: Pedido):
+        buffer = bytearray(10 * 1024 * 1024)  # alocado e liberado na mesma requisição
+        return {"tamanho": len(buffer)}
+
+    return TestClient(app), rastreador
+
+
+@pytest.fixture(autouse=True)
+def desligar_tracemalloc():
+    yield
+    tracemalloc.stop()
+    VAZAMENTO.clear()
+
+
+def test_diff_aponta_a_linha_que_vaza():
+    cliente, _ = criar_app()
+    cliente.post("/admin/memoria/iniciar")
+    primeiro = cliente.post("/admin/memoria/snapshot").json()["id"]
+
+    for i in range(200):
+        cliente.post("/analisar", json={"valor": i})
+    segundo = cliente.post("/admin/memoria/snapshot").json()["id"]
+
+    diff = cliente.get("/admin/memoria/diff", params={"de": primeiro, "para": segundo}).json()
+    assert diff["requisicoes"] == {"/analisar": 200, "/temporario": 0}
+    assert diff["media_blocos_acumulados_por_requisicao"] > 0
+    assert "test_memoria.py" in diff["linhas"][0]["local"]  # a linha do VAZAMENTO.append
+    assert diff["diferenca_kb"] > 200 * 10_000 / 1024
+
+
+def test_conta_instancias_vivas_dos_modelos():
+    cliente, _ = criar_app()
+
+    for i in range(5):
+        cliente.post("/analisar", json={"valor": i})
+
+    assert cliente.get("/admin/memoria/objetos").json() == {"Pedido": 5}
+
+
+def test_retencao_por_rota():
+    cliente, rastreador = criar_app()
+    cliente.post("/admin/memoria/iniciar")
+
+    for i in range(20):
+        cliente.post("/analisar", json={"valor": i})
+
+    por_rota = rastreador.estado()["por_rota"]["/analisar"]
+    assert por_rota["requisicoes"] == 20
+    assert por_rota["retido_liquido_bytes_medio"] >= 10_000
+    assert por_rota["alocado_pico_bytes_medio"] >= por_rota["retido_liquido_bytes_medio"]
+
+
+def test_pico_alocado_mostra_o_churn_que_a_retencao_nao_ve():
+    cliente, rastreador = criar_app()
+    cliente.post("/admin/memoria/iniciar")
+
+    for i in range(5):
+        cliente.post("/temporario", json={"valor": i})
+
+    por_rota = rastreador.estado()["por_rota"]["/temporario"]
+    assert por_rota["requisicoes"] == 5
+    assert por_rota["alocado_pico_bytes_max"] >= 10 * 1024 * 1024
+    assert por_rota["alocado_pico_bytes_medio"] >= 10 * 1024 * 1024
+    assert por_rota["retido_liquido_bytes_max"] < 1024 * 1024
+
+
+def test_desligado_nao_mede_nada():
+    cliente, rastreador = criar_app()
+
+    cliente.post("/analisar", json={"valor": 1})
+
+    assert not tracemalloc.is_tracing()
+    assert rastreador.estado()["por_rota"]["/analisar"]["requisicoes"] == 0
+    assert cliente.post("/admin/memoria/snapshot").status_code == 409
+
+
+def test_snapshot_inexistente():
+    cliente, _ = criar_app()
+    cliente.post("/admin/memoria/iniciar")
+
+    assert cliente.get("/admin/memoria/diff", params={"de": 1, "para": 99}).status_code == 404
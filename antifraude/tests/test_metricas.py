@@ -0,0 +1,103 @@
+"""
+Testes das métricas no formato Prometheus
+"""
+
+import multiprocessing
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from antifraude.metricas import MiddlewareLatencia, RegistroMetricas
+
+
+def declarar(registro: RegistroMetricas):
+    regras = registro.contador("regras_total", "Regras ativadas", rotulo="regra", valores=["valor_alto", "madrugada"])
+    latencia = registro.histograma("latencia_segundos", "Latência", buckets=[0.01, 0.1])
+    return regras, latencia
+
+
+def test_contador_por_rotulo():
+    registro = RegistroMetricas()
+    regras, _ = declarar(registro)
+
+    regras.inc("valor_alto")
+    regras.inc("valor_alto")
+    regras.inc("madrugada", quantidade=5)
+
+    texto = registro.exportar()
+    assert "# TYPE regras_total counter" in texto
+    assert 'regras_total{regra="valor_alto"} 2.0' in texto
+    assert 'regras_total{regra="madrugada"} 5.0' in texto
+
+
+def test_histograma_acumula_buckets():
+    registro = RegistroMetricas()
+    _, latencia = declarar(registro)
+
+    for segundos in (0.005, 0.01, 0.05, 3.0):
+        latencia.observar(segundos)
+
+    texto = registro.exportar()
+    assert 'latencia_segundos_bucket{le="0.01"} 2.0' in texto  # le: menor OU igual
+    assert 'latencia_segundos_bucket{le="0.1"} 3.0' in texto
+    assert 'latencia_segundos_bucket{le="+Inf"} 4.0' in texto
+    assert "latencia_segundos_count 4.0" in texto
+    assert "latencia_segundos_sum 3.065" in texto
+
+
+def test_rotulo_nao_declarado():
+    registro = RegistroMetricas()
+    regras, _ = declarar(registro)
+
+    with pytest.raises(ValueError):
+        regras.inc("regra_nova")
+
+
+def test_declarar_depois_do_primeiro_uso_falha():
+    registro = RegistroMetricas()
+    regras, _ = declarar(registro)
+    regras.inc("valor_alto")
+
+    with pytest.raises(RuntimeError):
+        registro.contador("outro_total", "Outro")
+
+
+def _worker(diretorio, quantidade):
+    registro = RegistroMetricas(diretorio)
+    regras, _ = declarar(registro)
+    regras.inc("valor_alto", quantidade=quantidade)
+
+
+def test_workers_somam_pelo_diretorio(tmp_path):
+    contexto = multiprocessing.get_context("spawn")
+    processos = [contexto.Process(target=_worker, args=(str(tmp_path), n)) for n in (1, 2, 3)]
+    for p in processos:
+        p.start()
+    for p in processos:
+        p.join()
+
+    registro = RegistroMetricas(str(tmp_path))
+    declarar(registro)
+
+    assert 'regras_total{regra="valor_alto"} 6.0' in registro.exportar()
+
+
+def test_middleware_observa_latencia_por_rota():
+    registro = RegistroMetricas()
+    latencia = registro.histograma("http_segundos", "Latência", rotulo="rota", valores=["/ok", "outros"])
+    app = FastAPI()
+    app.add_middleware(MiddlewareLatencia, histograma=latencia)
+
+    @app.get("/ok")
+    def ok():
+        return {}
+
+    cliente = TestClient(app)
+    cliente.get("/ok")
+    cliente.get("/ok")
+    cliente.get("/nao-existe")
+
+    texto = registro.exportar()
+    assert 'http_segundos_count{rota="/ok"} 2.0' in texto
+    assert 'http_segundos_count{rota="outros"} 1.0' in texto
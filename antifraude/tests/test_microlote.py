@@ -0,0 +1,83 @@
+"""
+Testes do agendador de micro-lotes
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from antifraude.microlote import AgendadorMicrolote
+
+
+def test_requisicoes_simultaneas_viram_lotes():
+    chamadas = []
+
+    def inferir(X):
+        chamadas.append(len(X))
+        return X[:, 0] / 100
+
+    async def cenario():
+        agendador = AgendadorMicrolote(inferir, max_lote=4, max_espera_ms=50)
+        agendador.iniciar()
+        resultados = await asyncio.gather(*[agendador.prever([i, 0]) for i in range(10)])
+        await agendador.parar()
+        return resultados, agendador.estatisticas()
+
+    resultados, estatisticas = asyncio.run(cenario())
+
+    assert resultados == [i / 100 for i in range(10)]  # cada um recebe o seu
+    assert chamadas == [4, 4, 2]
+    assert estatisticas["lotes"] == 3
+    assert estatisticas["requisicoes"] == 10
+
+
+def test_erro_na_inferencia_chega_a_todas_as_requisicoes():
+    def inferir(X):
+        raise RuntimeError("modelo quebrado")
+
+    async def cenario():
+        agendador = AgendadorMicrolote(inferir, max_lote=8, max_espera_ms=5)
+        agendador.iniciar()
+        resultados = await asyncio.gather(
+            *[agendador.prever([1.0]) for _ in range(3)], return_exceptions=True
+        )
+        await agendador.parar()
+        return resultados, agendador.estatisticas()
+
+    resultados, estatisticas = asyncio.run(cenario())
+
+    assert all(isinstance(r, RuntimeError) for r in resultados)
+    assert estatisticas["erros"] == 3
+
+
+def test_lote_invalido_falha_so_aquele_lote():
+    devolve_menos = [True]
+
+    def inferir(X):
+        if devolve_menos:
+            devolve_menos.pop()
+            return X[:-1, 0]  # uma probabilidade a menos
+        return X[:, 0]
+
+    async def cenario():
+        agendador = AgendadorMicrolote(inferir, max_lote=8, max_espera_ms=5)
+        agendador.iniciar()
+        # Linhas de tamanhos diferentes: np.asarray falha ao montar X
+        irregular = await asyncio.gather(agendador.prever([1.0]), agendador.prever([1.0, 2.0]), return_exceptions=True)
+        faltando = await asyncio.gather(*[agendador.prever([1.0]) for _ in range(3)], return_exceptions=True)
+        # A tarefa de fundo continua viva
+        seguinte = await asyncio.wait_for(agendador.prever([0.5]), 1)
+        await agendador.parar()
+        return irregular, faltando, seguinte
+
+    irregular, faltando, seguinte = asyncio.run(cenario())
+
+    assert all(isinstance(r, ValueError) for r in irregular)
+    assert all(isinstance(r, RuntimeError) for r in faltando)
+    assert seguinte == 0.5
+
+
+def test_parametros_invalidos():
+    with pytest.raises(ValueError):
+        AgendadorMicrolote(lambda X: np.zeros(len(X)), max_lote=0)
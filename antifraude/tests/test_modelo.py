@@ -0,0 +1,75 @@
+"""
+Testes do gerenciador de modelo
+"""
+
+import pickle
+
+import numpy as np
+import pytest
+
+from antifraude.modelo import GerenciadorModelo, ModeloThreshold
+
+
+class ModeloFixo:
+    """Modelo de teste: probabilidade constante e contador de chamadas"""
+
+    def __init__(self, probabilidade):
+        self.probabilidade = probabilidade
+        self.chamadas = 0
+
+    def predict_proba(self, X):
+        self.chamadas += 1
+        return np.tile([1 - self.probabilidade, self.probabilidade], (len(X), 1))
+
+
+def salvar(caminho, modelo):
+    with open(caminho, "wb") as arquivo:
+        pickle.dump(modelo, arquivo)
+
+
+def test_carga_preguicosa_com_aquecimento(tmp_path):
+    caminho = tmp_path / "modelo.pkl"
+    salvar(caminho, ModeloFixo(0.7))
+    gerenciador = GerenciadorModelo(str(caminho), exemplo_aquecimento=[[1, 2, 3, 4, 5]])
+    assert not gerenciador.carregado
+
+    modelo = gerenciador.obter()
+
+    assert modelo.chamadas == 1  # inferência de aquecimento
+    assert gerenciador.obter() is modelo  # nunca recarrega por chamada
+    assert gerenciador.info()["model_source"] == str(caminho)
+
+
+def test_fallback_sem_artefato(tmp_path):
+    gerenciador = GerenciadorModelo(str(tmp_path / "nao-existe.pkl"), fallback=lambda: ModeloThreshold(10000))
+
+    probabilidades = gerenciador.obter().predict_proba(np.array([[15000.0], [10000.0]]))
+
+    assert probabilidades[:, 1].tolist() == [1.0, 0.0]
+    assert gerenciador.info()["model_source"] == "fallback"
+
+
+def test_recarregar_troca_o_modelo(tmp_path):
+    caminho = tmp_path / "modelo.pkl"
+    salvar(caminho, ModeloFixo(0.1))
+    gerenciador = GerenciadorModelo(str(caminho))
+    antigo = gerenciador.obter()
+
+    salvar(caminho, ModeloFixo(0.9))
+    gerenciador.recarregar()
+
+    assert antigo.probabilidade == 0.1  # quem já pegou o antigo continua com ele
+    assert gerenciador.obter().probabilidade == 0.9
+
+
+def test_recarga_com_falha_mantem_modelo_atual(tmp_path):
+    caminho = tmp_path / "modelo.pkl"
+    salvar(caminho, ModeloFixo(0.1))
+    gerenciador = GerenciadorModelo(str(caminho))
+    atual = gerenciador.obter()
+
+    salvar(caminho, {"sem": "predict_proba"})
+    with pytest.raises(TypeError):
+        gerenciador.recarregar()
+
+    assert gerenciador.obter() is atual
@@ -0,0 +1,31 @@
+"""
+Testes da leitura de streams NDJSON
+"""
+
+import asyncio
+
+import pytest
+
+from antifraude.ndjson import ler_linhas
+
+
+async def _partes(*partes):
+    for parte in partes:
+        yield parte
+
+
+def _ler(*partes, **kwargs):
+    async def coletar():
+        return [linha async for linha in ler_linhas(_partes(*partes), **kwargs)]
+    return asyncio.run(coletar())
+
+
+def test_linhas_quebradas_entre_pedacos():
+    linhas = _ler(b'{"a": 1}\n{"a"', b': 2}\n\n', b'{"a": 3}')
+
+    assert linhas == [b'{"a": 1}', b'{"a": 2}', b'{"a": 3}']
+
+
+def test_linha_grande_demais_gera_erro():
+    with pytest.raises(ValueError):
+        _ler(b"x" * 100, max_bytes_linha=10)
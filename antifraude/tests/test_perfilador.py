@@ -0,0 +1,76 @@
+"""
+Testes do perfilador de CPU por amostragem e da autorização de admin
+"""
+
+import threading
+import time
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from antifraude.admin import exigir_admin
+from antifraude.perfilador import PerfiladorAmostragem, PerfilEmAndamento
+
+
+def funcao_ocupada(parar: threading.Event):
+    while not parar.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_perfil_encontra_a_funcao_que_gasta_cpu():
+    parar = threading.Event()
+    thread = threading.Thread(target=funcao_ocupada, args=(parar,), name="trabalho")
+    thread.start()
+    try:
+        perfil = PerfiladorAmostragem().perfilar(0.3, intervalo_ms=5)
+    finally:
+        parar.set()
+        thread.join()
+
+    assert perfil.amostras > 10
+    texto = perfil.collapsed()
+    linhas = [linha for linha in texto.splitlines() if linha.startswith("trabalho;")]
+    assert linhas
+    assert all("funcao_ocupada" in linha for linha in linhas)
+    assert all(linha.rsplit(" ", 1)[1].isdigit() for linha in texto.splitlines())
+
+
+def test_um_perfil_por_vez():
+    perfilador = PerfiladorAmostragem()
+    thread = threading.Thread(target=perfilador.perfilar, args=(0.3,))
+    thread.start()
+    time.sleep(0.05)
+
+    with pytest.raises(PerfilEmAndamento):
+        perfilador.perfilar(0.1)
+    thread.join()
+
+
+def test_duracao_limitada():
+    with pytest.raises(ValueError):
+        PerfiladorAmostragem(max_segundos=5).perfilar(10)
+
+
+def test_admin_exige_token():
+    app = FastAPI()
+
+    @app.get("/admin", dependencies=[Depends(exigir_admin("segredo"))])
+    def admin():
+        return {"ok": True}
+
+    cliente = TestClient(app)
+
+    assert cliente.get("/admin").status_code == 403
+    assert cliente.get("/admin", headers={"X-Admin-Token": "errado"}).status_code == 403
+    assert cliente.get("/admin", headers={"X-Admin-Token": "segredo"}).status_code == 200
+
+
+def test_admin_sem_token_configurado_recusa_tudo():
+    app = FastAPI()
+
+    @app.get("/admin", dependencies=[Depends(exigir_admin(None))])
+    def admin():
+        return {"ok": True}
+
+    assert TestClient(app).get("/admin", headers={"X-Admin-Token": ""}).status_code == 403
@@ -0,0 +1,94 @@
+"""
+Testes do servidor prefork (pré-carga, memória por processo, workers)
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+from antifraude.prefork import importar_app, ler_memoria, relatorio_memoria
+
+RAIZ = Path(__file__).resolve().parents[2]
+
+APP = '''
+import os
+from fastapi import FastAPI
+
+CARREGADO_EM = []
+
+def pre_carregar():
+    CARREGADO_EM.append(os.getpid())
+
+app = FastAPI()
+
+@app.get("/")
+def raiz():
+    return {"pid": os.getpid(), "carregado_em": CARREGADO_EM}
+'''
+
+
+def test_importar_app_chama_o_hook(tmp_path, monkeypatch):
+    (tmp_path / "app_prefork_hook.py").write_text(APP)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "path", list(sys.path))
+
+    app = importar_app("app_prefork_hook:app", str(tmp_path), "pre_carregar")
+
+    assert app.title == "FastAPI"
+    assert sys.modules["app_prefork_hook"].CARREGADO_EM == [os.getpid()]
+
+
+@pytest.mark.skipif(not Path("/proc/self/smaps_rollup").exists(), reason="precisa de /proc/<pid>/smaps_rollup")
+def test_relatorio_de_memoria():
+    memoria = ler_memoria(os.getpid())
+
+    assert memoria["rss"] > 0
+    assert memoria["rss"] >= memoria["compartilhada"]
+    assert "Σ PSS" in relatorio_memoria([("teste", os.getpid())])
+
+
+def porta_livre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="prefork exige fork")
+def test_workers_compartilham_a_pre_carga_e_sao_recriados(tmp_path):
+    (tmp_path / "app_prefork.py").write_text(APP)
+    porta = porta_livre()
+    mestre = subprocess.Popen(
+        [sys.executable, "-m", "antifraude.prefork", "app_prefork:app", "--app-dir", str(tmp_path),
+         "--host", "127.0.0.1", "--port", str(porta), "--workers", "2", "--no-access-log"],
+        cwd=RAIZ, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    try:
+        url = f"http://127.0.0.1:{porta}/"
+        for _ in range(100):
+            try:
+                resposta = httpx.get(url).json()
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        # Hook rodou uma vez, no mestre, e o worker herdou o resultado
+        assert resposta["carregado_em"] == [mestre.pid]
+        assert resposta["pid"] != mestre.pid
+
+        os.kill(resposta["pid"], signal.SIGKILL)
+        time.sleep(0.5)
+        pids = {httpx.get(url).json()["pid"] for _ in range(20)}
+        assert resposta["pid"] not in pids
+    finally:
+        mestre.terminate()
+        saida, _ = mestre.communicate(timeout=30)
+
+    assert mestre.returncode == 0
+    assert "2/2 workers prontos" in saida
+    assert "caiu (sinal SIGKILL)" in saida
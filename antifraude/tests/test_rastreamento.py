@@ -0,0 +1,85 @@
+"""
+Testes do contexto de requisição e dos spans de tempo
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from antifraude.rastreamento import (
+    MiddlewareRastreamento,
+    campos_contexto,
+    marcar_desde_inicio,
+    marcar_fim_endpoint,
+    rastro_atual,
+    span,
+)
+
+
+def criar_app(taxa_amostragem: float):
+    resumos = []
+    app = FastAPI()
+    app.add_middleware(MiddlewareRastreamento, emitir=resumos.append, taxa_amostragem=taxa_amostragem)
+
+    @app.get("/sync")
+    def endpoint_sync():  # roda no threadpool
+        marcar_desde_inicio("validacao")
+        with span("trabalho"):
+            campos = campos_contexto()
+        marcar_fim_endpoint()
+        return campos
+
+    @app.get("/async")
+    async def endpoint_async():
+        return {"rastreado": rastro_atual() is not None, **campos_contexto()}
+
+    return TestClient(app), resumos
+
+
+def test_contexto_chega_ao_endpoint_no_threadpool():
+    cliente, _ = criar_app(taxa_amostragem=0.0)
+
+    resposta = cliente.get("/sync", headers={"X-Request-ID": "req-42"})
+
+    assert resposta.json()["request_id"] == "req-42"
+    assert resposta.json()["client_ip"] == "testclient"
+    assert resposta.headers["x-request-id"] == "req-42"
+
+
+def test_request_id_invalido_e_substituido():
+    cliente, _ = criar_app(taxa_amostragem=0.0)
+
+    resposta = cliente.get("/async", headers={"X-Request-ID": "x" * 500})
+
+    assert len(resposta.json()["request_id"]) == 32
+    assert resposta.headers["x-request-id"] == resposta.json()["request_id"]
+
+
+def test_requisicao_rastreada_emite_um_resumo_com_spans():
+    cliente, resumos = criar_app(taxa_amostragem=1.0)
+
+    cliente.get("/sync")
+
+    assert len(resumos) == 1
+    resumo = resumos[0]
+    assert resumo["path"] == "/sync"
+    assert resumo["status"] == 200
+    assert set(resumo["spans_ms"]) == {"validacao", "trabalho", "serializacao"}
+
+
+def test_fora_da_amostragem_nao_rastreia():
+    cliente, resumos = criar_app(taxa_amostragem=0.0)
+
+    resposta = cliente.get("/async")
+
+    assert resposta.json()["rastreado"] is False
+    assert resumos == []
+
+
+def test_span_fora_de_requisicao_nao_faz_nada():
+    with span("qualquer"):
+        pass
+    marcar_desde_inicio("validacao")
+    marcar_fim_endpoint()
+
+    assert rastro_atual() is None
+    assert campos_contexto() == {}
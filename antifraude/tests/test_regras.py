@@ -0,0 +1,161 @@
+"""
+Testes do motor de regras compartilhado
+Estrutura AAA: Arrange, Act, Assert
+"""
+
+import json
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from antifraude.regras import (
+    carregar_regras,
+    compilar_lote_primeira,
+    compilar_lote_score,
+    compilar_primeira,
+    compilar_score,
+    compilar_score_cronometrado,
+)
+
+TABELA = [
+    {"nome": "valor_alto", "campo": "valor", "operador": ">", "limiar": 10000,
+     "score": 0.4, "motivo": "Valor alto"},
+    {"nome": "horario_suspeito", "condicoes": [["hora_do_dia", "<", 6], ["hora_do_dia", ">", 23]],
+     "combinar": "ou", "score": 0.3, "motivo": "Madrugada"},
+    {"nome": "distancia_grande", "campo": "distancia_ultima_compra_km", "operador": ">", "limiar": 500,
+     "score": 0.2, "motivo": "Distância"},
+    {"nome": "muitas_transacoes", "campo": "numero_transacoes_hoje", "operador": ">", "limiar": 10,
+     "score": 0.1, "motivo": "Muitas transações"},
+]
+
+
+def score_escrito_a_mao(t):
+    """Encadeamento de "if" original de bloco3-debug-logs/2-com-logs"""
+    score = 0.0
+    ativadas = []
+    if t.valor > 10000:
+        score += 0.4
+        ativadas.append("valor_alto")
+    if t.hora_do_dia < 6 or t.hora_do_dia > 23:
+        score += 0.3
+        ativadas.append("horario_suspeito")
+    if t.distancia_ultima_compra_km > 500:
+        score += 0.2
+        ativadas.append("distancia_grande")
+    if t.numero_transacoes_hoje > 10:
+        score += 0.1
+        ativadas.append("muitas_transacoes")
+    return score, ativadas
+
+
+def transacoes_aleatorias(n, semente=42):
+    aleatorio = random.Random(semente)
+    return [
+        SimpleNamespace(
+            valor=aleatorio.choice([10000, aleatorio.uniform(1, 20000)]),
+            hora_do_dia=aleatorio.randint(0, 23),
+            distancia_ultima_compra_km=aleatorio.choice([500, aleatorio.uniform(0, 1000)]),
+            numero_transacoes_hoje=aleatorio.randint(0, 15),
+        )
+        for _ in range(n)
+    ]
+
+
+def colunas_de(transacoes):
+    return {
+        campo: np.array([getattr(t, campo) for t in transacoes])
+        for campo in ("valor", "hora_do_dia", "distancia_ultima_compra_km", "numero_transacoes_hoje")
+    }
+
+
+def test_primeira_regra_respeita_ordem_da_tabela():
+    avaliar = compilar_primeira(carregar_regras(TABELA))
+    t = SimpleNamespace(valor=15000, hora_do_dia=3, distancia_ultima_compra_km=10, numero_transacoes_hoje=1)
+
+    regra = avaliar(t)
+
+    assert regra.nome == "valor_alto"
+    assert regra.peso == 0.4
+
+
+def test_primeira_regra_sem_ativacao_retorna_none():
+    avaliar = compilar_primeira(carregar_regras(TABELA))
+    t = SimpleNamespace(valor=500, hora_do_dia=14, distancia_ultima_compra_km=10, numero_transacoes_hoje=1)
+
+    assert avaliar(t) is None
+
+
+def test_score_igual_ao_codigo_escrito_a_mao():
+    avaliar = compilar_score(carregar_regras(TABELA))
+
+    for t in transacoes_aleatorias(2000):
+        assert avaliar(t) == score_escrito_a_mao(t)
+
+
+def test_score_cronometrado_igual_ao_score():
+    regras = carregar_regras(TABELA)
+    avaliar = compilar_score(regras)
+    cronometrado = compilar_score_cronometrado(regras)
+
+    for t in transacoes_aleatorias(500):
+        tempos = []
+        assert cronometrado(t, tempos) == avaliar(t)
+        assert [nome for nome, _ in tempos] == [r.nome for r in regras]
+        assert all(ns >= 0 for _, ns in tempos)
+
+
+def test_lote_primeira_igual_ao_escalar():
+    regras = carregar_regras(TABELA)
+    avaliar = compilar_primeira(regras)
+    transacoes = transacoes_aleatorias(2000)
+
+    indices = compilar_lote_primeira(regras)(colunas_de(transacoes))
+
+    esperado = [regras.index(r) if r else -1 for r in map(avaliar, transacoes)]
+    assert indices.tolist() == esperado
+
+
+def test_lote_score_igual_ao_escalar():
+    regras = carregar_regras(TABELA)
+    transacoes = transacoes_aleatorias(2000)
+
+    scores, ativadas = compilar_lote_score(regras)(colunas_de(transacoes))
+
+    for i, t in enumerate(transacoes):
+        score, nomes = score_escrito_a_mao(t)
+        assert scores[i] == score
+        assert [r.nome for r, ativa in zip(regras, ativadas[i]) if ativa] == nomes
+
+
+def test_carregar_regras_de_arquivo_json(tmp_path):
+    caminho = tmp_path / "regras.json"
+    caminho.write_text(json.dumps(TABELA), encoding="utf-8")
+
+    regras = carregar_regras(caminho)
+
+    assert [r.nome for r in regras] == [linha["nome"] for linha in TABELA]
+
+
+@pytest.mark.parametrize("linha", [
+    {"nome": "x", "campo": "valor", "operador": "=>", "limiar": 1, "score": 0.1},
+    {"nome": "x", "campo": "valor; import os", "operador": ">", "limiar": 1, "score": 0.1},
+    {"nome": "x", "campo": "valor", "operador": ">", "limiar": "1", "score": 0.1},
+    {"nome": "x", "campo": "valor", "operador": ">", "limiar": float("inf"), "score": 0.1},
+    {"nome": "x", "campo": "valor", "operador": "<", "limiar": float("-inf"), "score": 0.1},
+    {"nome": "x", "campo": "valor", "operador": ">", "limiar": float("nan"), "score": 0.1},
+    {"nome": "x", "condicoes": [["valor", ">", 1], ["hora", "<", float("inf")]], "score": 0.1},
+])
+def test_tabela_invalida_gera_erro(linha):
+    with pytest.raises(ValueError):
+        carregar_regras([linha])
+
+
+def test_limiar_infinity_no_json_rejeitado_ao_carregar(tmp_path):
+    # json.load aceita Infinity/NaN: o erro tem que sair no carregamento, não na primeira avaliação
+    caminho = tmp_path / "regras.json"
+    caminho.write_text('[{"nome": "x", "campo": "valor", "operador": ">", "limiar": Infinity, "score": 0.1}]')
+
+    with pytest.raises(ValueError, match="finito"):
+        carregar_regras(caminho)
@@ -0,0 +1,91 @@
+"""
+Testes de liveness/readiness (verificações em segundo plano + drenagem)
+"""
+
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from antifraude.saude import MonitorSaude
+
+
+def criar_app(monitor):
+    app = FastAPI()
+    app.get("/health/live")(monitor.resposta_vivo)
+    app.get("/health/ready")(monitor.resposta_pronto)
+    return TestClient(app)
+
+
+def test_pronto_so_quando_todas_as_verificacoes_passam():
+    estado = {"modelo": False}
+    monitor = MonitorSaude({"modelo": lambda: estado["modelo"], "fila": lambda: (True, {"pendentes": 0})})
+    cliente = criar_app(monitor)
+
+    monitor.verificar()
+    resposta = cliente.get("/health/ready")
+    assert resposta.status_code == 503
+    assert resposta.json()["checks"]["modelo"] == {"ok": False}
+
+    estado["modelo"] = True
+    monitor.verificar()
+    resposta = cliente.get("/health/ready")
+    assert resposta.status_code == 200
+    assert resposta.json()["checks"]["fila"] == {"ok": True, "detail": {"pendentes": 0}}
+
+
+def test_sonda_nao_executa_verificacoes():
+    chamadas = []
+    monitor = MonitorSaude({"modelo": lambda: chamadas.append(1) or True})
+    monitor.verificar()
+    cliente = criar_app(monitor)
+
+    for _ in range(10):
+        assert cliente.get("/health/ready").status_code == 200
+    assert cliente.get("/health/live").json() == {"status": "alive"}
+    assert len(chamadas) == 1
+
+
+def test_verificacao_com_erro_deixa_nao_pronto():
+    def quebrada():
+        raise OSError("disco cheio")
+
+    monitor = MonitorSaude({"disco": quebrada})
+    corpo = json.loads(monitor.verificar().corpo)
+
+    assert corpo["status"] == "not_ready"
+    assert "disco cheio" in corpo["checks"]["disco"]["detail"]
+
+
+def test_thread_atualiza_o_estado():
+    estado = {"ok": False}
+    monitor = MonitorSaude({"modelo": lambda: estado["ok"]}, intervalo=0.02)
+    monitor.iniciar()
+    try:
+        assert monitor.resposta_pronto().status_code == 503
+        estado["ok"] = True
+        time.sleep(0.2)
+        assert monitor.resposta_pronto().status_code == 200
+    finally:
+        monitor.parar()
+
+
+def test_drenar_vence_as_verificacoes():
+    monitor = MonitorSaude({"modelo": lambda: True})
+    monitor.verificar()
+
+    monitor.drenar()
+    monitor.verificar()
+
+    resposta = monitor.resposta_pronto()
+    assert resposta.status_code == 503
+    assert json.loads(resposta.body)["reason"] == "draining"
+
+
+def test_resultado_velho_nao_conta_como_pronto():
+    monitor = MonitorSaude({"modelo": lambda: True}, intervalo=0.01)
+    monitor.verificar()
+    time.sleep(1.1)  # thread parada: nenhuma verificação nova
+
+    assert monitor.resposta_pronto().status_code == 503
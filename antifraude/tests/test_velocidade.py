@@ -0,0 +1,89 @@
+"""
+Testes do armazém de velocidade por conta
+"""
+
+import math
+
+import pytest
+
+from antifraude.velocidade import RAIO_TERRA_KM, ArmazemVelocidade, haversine_km
+
+
+class Relogio:
+    """Relógio controlado pelo teste"""
+
+    def __init__(self):
+        self.agora = 1_000_000.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_contagem_na_janela_deslizante():
+    relogio = Relogio()
+    armazem = ArmazemVelocidade(janela_segundos=3600, num_baldes=4, relogio=relogio)
+
+    for _ in range(3):
+        armazem.registrar("conta")
+    relogio.agora += 1800
+    quantidade, _ = armazem.registrar("conta")
+    assert quantidade == 4
+
+    # As 3 primeiras saem da janela; a quarta ainda conta
+    relogio.agora += 2700
+    assert armazem.consultar("conta") == 1
+
+
+def test_distancia_desde_a_ultima_compra():
+    armazem = ArmazemVelocidade()
+
+    _, primeira = armazem.registrar("conta", -23.55, -46.63)  # São Paulo
+    _, segunda = armazem.registrar("conta", -22.91, -43.17)  # Rio de Janeiro
+
+    assert primeira is None  # sem compra anterior com localização
+    assert 350 < segunda < 370
+
+
+def test_distancia_sem_localizacao_atual():
+    armazem = ArmazemVelocidade()
+
+    armazem.registrar("conta", -23.55, -46.63)
+    _, distancia = armazem.registrar("conta")
+
+    assert distancia is None
+
+
+def test_ttl_remove_contas_ociosas():
+    relogio = Relogio()
+    armazem = ArmazemVelocidade(ttl_segundos=60, relogio=relogio)
+
+    armazem.registrar("ociosa")
+    relogio.agora += 120
+    armazem.registrar("ativa")
+
+    assert len(armazem) == 1
+    assert armazem.consultar("ociosa") == 0
+
+
+def test_teto_de_contas_remove_a_menos_recente():
+    armazem = ArmazemVelocidade(max_contas=2)
+
+    armazem.registrar("a")
+    armazem.registrar("b")
+    armazem.registrar("a")
+    armazem.registrar("c")
+
+    assert len(armazem) == 2
+    assert armazem.consultar("b") == 0
+    assert armazem.consultar("a") == 2
+
+
+def test_haversine_mesmo_ponto():
+    assert haversine_km(-23.55, -46.63, -23.55, -46.63) == 0.0
+
+
+def test_haversine_pontos_quase_antipodas():
+    # Com esses pontos o arredondamento deixa a = 1.0000000000000002, acima de 1
+    distancia = haversine_km(69.51232454868148, 86.5812282599507, -69.51232454868148, -93.4187717400493)
+
+    assert distancia == pytest.approx(math.pi * RAIO_TERRA_KM)
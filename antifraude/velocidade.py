@@ -0,0 +1,143 @@
+"""
+Velocidade de Transações por Conta (em memória)
+===============================================
+
+Calcula no servidor os valores que antes vinham do cliente:
+- numero_transacoes_hoje: transações da conta na janela deslizante (24h)
+- distancia_ultima_compra_km: distância até a localização da compra anterior
+
+Cada conta guarda um anel fixo de contadores por intervalo (baldes),
+então atualizar e consultar custa O(1), sem banco de dados.
+Contas ociosas expiram por TTL e o número de contas tem um teto,
+o que limita a memória total.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+RAIO_TERRA_KM = 6371.0
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distância em km entre duas coordenadas (fórmula de haversine)"""
+    fi1, fi2 = math.radians(lat1), math.radians(lat2)
+    dfi = fi2 - fi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dfi / 2) ** 2 + math.cos(fi1) * math.cos(fi2) * math.sin(dlambda / 2) ** 2
+    # ⚠️ Pontos quase antípodas: o arredondamento pode deixar a um pouco acima de 1
+    return 2 * RAIO_TERRA_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+class _Conta:
+    """Estado de uma conta: anel de baldes + última localização"""
+
+    __slots__ = ("baldes", "balde_atual", "total", "latitude", "longitude", "visto_em")
+
+    def __init__(self, num_baldes: int, balde_atual: int):
+        self.baldes = [0] * num_baldes
+        self.balde_atual = balde_atual
+        self.total = 0
+        self.latitude: Optional[float] = None
+        self.longitude: Optional[float] = None
+        self.visto_em = 0.0
+
+
+class ArmazemVelocidade:
+    """
+    Contadores de janela deslizante por conta, com TTL e teto de contas.
+
+    A janela é dividida em num_baldes intervalos; ao avançar o tempo, os
+    baldes que saíram da janela são zerados e descontados do total.
+    """
+
+    def __init__(
+        self,
+        janela_segundos: float = 24 * 3600,
+        num_baldes: int = 24,
+        ttl_segundos: float = 48 * 3600,
+        max_contas: int = 100_000,
+        relogio: Callable[[], float] = time.time,
+    ):
+        if num_baldes <= 0 or janela_segundos <= 0:
+            raise ValueError("janela_segundos e num_baldes devem ser positivos")
+        self.num_baldes = num_baldes
+        self.largura_balde = janela_segundos / num_baldes
+        self.ttl_segundos = ttl_segundos
+        self.max_contas = max_contas
+        self.relogio = relogio
+        # Ordem de acesso: a conta menos recente fica no começo
+        self._contas: "OrderedDict[str, _Conta]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._contas)
+
+    def _avancar(self, conta: _Conta, balde: int) -> None:
+        """Zera os baldes que saíram da janela (no máximo num_baldes passos)"""
+        passos = min(balde - conta.balde_atual, self.num_baldes)
+        for i in range(1, passos + 1):
+            posicao = (conta.balde_atual + i) % self.num_baldes
+            conta.total -= conta.baldes[posicao]
+            conta.baldes[posicao] = 0
+        if balde > conta.balde_atual:
+            conta.balde_atual = balde
+
+    def _expirar(self, agora: float) -> None:
+        """Remove contas ociosas (TTL) e as mais antigas acima do teto"""
+        while self._contas:
+            conta = next(iter(self._contas.values()))
+            if agora - conta.visto_em <= self.ttl_segundos and len(self._contas) <= self.max_contas:
+                break
+            self._contas.popitem(last=False)
+
+    def registrar(
+        self,
+        conta_id: str,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+    ) -> Tuple[int, Optional[float]]:
+        """
+        Registra uma transação da conta.
+
+        Retorna (transacoes_na_janela, distancia_km): a contagem já inclui
+        esta transação; a distância é None sem localização anterior ou atual.
+        """
+        agora = self.relogio()
+        balde = int(agora // self.largura_balde)
+
+        with self._lock:
+            conta = self._contas.get(conta_id)
+            if conta is None:
+                conta = _Conta(self.num_baldes, balde)
+                self._contas[conta_id] = conta
+            else:
+                self._contas.move_to_end(conta_id)
+                self._avancar(conta, balde)
+
+            conta.baldes[balde % self.num_baldes] += 1
+            conta.total += 1
+            conta.visto_em = agora
+
+            distancia = None
+            if latitude is not None and longitude is not None:
+                if conta.latitude is not None:
+                    distancia = haversine_km(conta.latitude, conta.longitude, latitude, longitude)
+                conta.latitude, conta.longitude = latitude, longitude
+
+            total = conta.total
+            self._expirar(agora)
+
+        return total, distancia
+
+    def consultar(self, conta_id: str) -> int:
+        """Transações da conta na janela atual (0 se a conta não existe)"""
+        agora = self.relogio()
+        with self._lock:
+            conta = self._contas.get(conta_id)
+            if conta is None:
+                return 0
+            self._avancar(conta, int(agora // self.largura_balde))
+            return conta.total
@@ -0,0 +1 @@
+"""Benchmarks de vazão e latência das APIs da aula (ASGI em processo)"""
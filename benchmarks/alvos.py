@@ -0,0 +1,115 @@
+"""
+Alvos do Benchmark
+==================
+
+Cada alvo é um endpoint de uma das APIs do repositório + um gerador de
+payloads realistas. Os geradores recebem um random.Random com semente
+fixa, então duas execuções enviam exatamente as mesmas requisições.
+
+Para adicionar uma API nova, basta registrar um Alvo em ALVOS.
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+# Diretórios relativos à raiz do repositório
+BLOCO5 = "bloco5-env-cors/bloco5-env-cors"
+BLOCO6 = "bloco6-projeto"
+
+
+@dataclass(frozen=True)
+class Alvo:
+    """Um endpoint a ser medido"""
+    nome: str
+    diretorio: str  # onde a API roda (cwd e sys.path, como no uvicorn)
+    modulo: str  # módulo com o objeto `app`
+    rota: str
+    gerar_payload: Callable[[random.Random], Any]
+    metodo: str = "POST"
+
+
+# ===================================
+# GERADORES DE PAYLOAD
+# ===================================
+
+def transacao(rng: random.Random) -> Dict[str, Any]:
+    """Transação de cartão: maioria legítima, ~10% com sinais de fraude"""
+    suspeita = rng.random() < 0.10
+    return {
+        "valor": round(rng.lognormvariate(5.5, 1.2) * (20 if suspeita else 1), 2),
+        "hora_do_dia": rng.choice([1, 2, 3, 4]) if suspeita else rng.randint(7, 22),
+        "distancia_ultima_compra_km": round(rng.expovariate(1 / (800 if suspeita else 15)), 1),
+        "numero_transacoes_hoje": rng.randint(8, 20) if suspeita else rng.randint(0, 5),
+        "idade_conta_dias": rng.randint(1, 60) if suspeita else rng.randint(30, 3650),
+    }
+
+
+def lote_transacoes(tamanho: int) -> Callable[[random.Random], List[Dict[str, Any]]]:
+    """Lista de transações para os endpoints de lote"""
+    def gerar(rng: random.Random) -> List[Dict[str, Any]]:
+        return [transacao(rng) for _ in range(tamanho)]
+    return gerar
+
+
+def frete(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "peso": round(rng.uniform(0.1, 30.0), 2),
+        "distancia": rng.randint(1, 3000),
+    }
+
+
+PRODUTOS = [("Mouse", 50.0), ("Teclado", 120.0), ("Monitor", 899.9), ("Cabo HDMI", 25.5), ("Webcam", 210.0)]
+
+
+def pedido(rng: random.Random) -> Dict[str, Any]:
+    itens = [
+        {"nome": nome, "quantidade": rng.randint(1, 5), "preco": preco}
+        for nome, preco in rng.sample(PRODUTOS, rng.randint(1, len(PRODUTOS)))
+    ]
+    return {"itens": itens, "cupom": "DESC10" if rng.random() < 0.3 else None}
+
+
+def cpf(rng: random.Random) -> Dict[str, Any]:
+    digitos = "".join(str(rng.randint(0, 9)) for _ in range(11))
+    if rng.random() < 0.5:
+        return {"cpf": f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"}
+    return {"cpf": digitos[: rng.choice([10, 11, 11, 11])]}
+
+
+def calculo(rng: random.Random) -> Dict[str, Any]:
+    return {"valor1": round(rng.uniform(-1000, 1000), 2), "valor2": round(rng.uniform(-1000, 1000), 2)}
+
+
+# ===================================
+# REGISTRO DE ALVOS
+# ===================================
+
+ALVOS: Dict[str, Alvo] = {
+    alvo.nome: alvo
+    for alvo in [
+        # Bloco 2 - Git
+        Alvo("bloco2-inicial", "bloco2-git/exemplo-inicial", "main", "/analisar", transacao),
+        Alvo("bloco2-inicial-lote", "bloco2-git/exemplo-inicial", "main", "/analisar/lote", lote_transacoes(100)),
+        Alvo("bloco2-rollback", "bloco2-git/exemplo-rollback", "main", "/analisar", transacao),
+        # Bloco 3 - Debug e Logs
+        Alvo("bloco3-sem-logs", "bloco3-debug-logs/1-sem-logs", "main", "/analisar", transacao),
+        Alvo("bloco3-com-logs", "bloco3-debug-logs/2-com-logs", "main", "/analisar", transacao),
+        Alvo("bloco3-bug", "bloco3-debug-logs/3-exemplo-bug", "main_bug", "/analisar", transacao),
+        Alvo("bloco3-corrigido", "bloco3-debug-logs/3-exemplo-bug", "main_corrigido", "/analisar", transacao),
+        # Bloco 4 - Testes
+        Alvo("bloco4-sem-testes", "bloco4-testes/1-sem-testes", "main", "/analisar", transacao),
+        Alvo("bloco4-com-testes", "bloco4-testes/2-com-testes", "main", "/analisar", transacao),
+        Alvo("bloco4-correto", "bloco4-testes/3-exemplo-regressao", "main_correto", "/analisar", transacao),
+        Alvo("bloco4-quebrado", "bloco4-testes/3-exemplo-regressao", "main_quebrado", "/analisar", transacao),
+        # Bloco 5 - Env e CORS
+        Alvo("bloco5-sem-env", f"{BLOCO5}/1-sem-env", "main", "/predict", transacao),
+        Alvo("bloco5-com-env", f"{BLOCO5}/2-com-env", "main", "/predict", transacao),
+        Alvo("bloco5-com-cors", f"{BLOCO5}/3-com-cors", "main", "/predict", transacao),
+        # Bloco 6 - Projeto
+        Alvo("frete", f"{BLOCO6}/exemplos/exemplo-frete", "src.api.main", "/calcular", frete),
+        Alvo("pedidos", f"{BLOCO6}/exemplos/exemplo-pedidos", "src.api.main", "/calcular", pedido),
+        Alvo("validador", f"{BLOCO6}/exemplos/exemplo-validador", "src.api.main", "/validar", cpf),
+        Alvo("template", f"{BLOCO6}/template", "src.api.main", "/calcular", calculo),
+    ]
+}
@@ -0,0 +1,292 @@
+"""
+Benchmark das APIs (ASGI em processo)
+=====================================
+
+Mede vazão (req/s) e latência (p50/p95/p99) de cada API chamando o
+objeto `app` direto pelo ASGI (httpx.ASGITransport): sem rede e sem
+uvicorn, só o custo da aplicação (validação, regras, logs, serialização).
+
+- Cada alvo roda em um processo próprio: as APIs se chamam todas `main`
+  (ou `src.api.main`) e não podem ser importadas juntas
+- O lifespan da API roda antes da medição (modelo, micro-lotes...)
+- Payloads gerados com semente fixa: mesma carga em toda execução
+- Os logs das APIs vão para /dev/null (o custo de formatar continua
+  sendo medido); use --mostrar-logs para vê-los
+- O resultado é salvo em JSON com o commit atual, para comparar commits
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench                          # todos os alvos
+    python -m benchmarks.bench frete bloco3-com-logs -n 5000 -c 32
+    python -m benchmarks.bench bloco3-com-logs --env FAST_CODEC=true
+    python -m benchmarks.bench --listar
+    python -m benchmarks.bench --comparar antes.json depois.json
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Raiz do repositório no path para importar os alvos
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+
+from benchmarks.alvos import ALVOS, Alvo  # noqa: E402
+
+DIRETORIO_RESULTADOS = RAIZ / "benchmarks" / "resultados"
+CABECALHOS = {"content-type": "application/json"}
+
+
+# ===================================
+# MEDIÇÃO (roda no processo do alvo)
+# ===================================
+
+async def _rodada(cliente, alvo: Alvo, corpos: List[bytes], concorrencia: int) -> Tuple[List[float], Counter, float]:
+    """Envia os corpos com `concorrencia` requisições em voo; retorna latências (s), status e duração"""
+    latencias: List[float] = []
+    status: Counter = Counter()
+    proximo = iter(range(len(corpos)))  # compartilhado: cada trabalhador pega o próximo índice
+
+    async def trabalhador():
+        for i in proximo:
+            inicio = time.perf_counter()
+            resposta = await cliente.request(alvo.metodo, alvo.rota, content=corpos[i], headers=CABECALHOS)
+            latencias.append(time.perf_counter() - inicio)
+            status[resposta.status_code] += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    return latencias, status, time.perf_counter() - inicio
+
+
+async def _medir(app, alvo: Alvo, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    import httpx
+    import numpy as np
+
+    rng = random.Random(parametros["semente"])
+    total = parametros["aquecimento"] + parametros["requisicoes"]
+    # Payloads serializados antes: o gerador não entra na medição
+    corpos = [json.dumps(alvo.gerar_payload(rng)).encode("utf-8") for _ in range(total)]
+    aquecimento, medidos = corpos[: parametros["aquecimento"]], corpos[parametros["aquecimento"]:]
+
+    # raise_app_exceptions=False: exceção não tratada vira 500, como no uvicorn
+    transporte = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+            if aquecimento:
+                await _rodada(cliente, alvo, aquecimento, parametros["concorrencia"])
+            latencias, status, segundos = await _rodada(cliente, alvo, medidos, parametros["concorrencia"])
+
+    ms = np.asarray(latencias) * 1000
+    return {
+        "alvo": alvo.nome,
+        "rota": f"{alvo.metodo} {alvo.rota}",
+        "requisicoes": len(medidos),
+        "segundos": round(segundos, 4),
+        "req_por_segundo": round(len(medidos) / segundos, 2),
+        "latencia_ms": {
+            "media": round(float(ms.mean()), 4),
+            "p50": round(float(np.percentile(ms, 50)), 4),
+            "p95": round(float(np.percentile(ms, 95)), 4),
+            "p99": round(float(np.percentile(ms, 99)), 4),
+            "max": round(float(ms.max()), 4),
+        },
+        "status": {str(codigo): n for codigo, n in sorted(status.items())},
+        "erros": sum(n for codigo, n in status.items() if codigo >= 400),
+    }
+
+
+def _processo_alvo(nome: str, parametros: Dict[str, Any], conexao) -> None:
+    """Ponto de entrada do processo filho: importa a API do alvo e mede"""
+    try:
+        alvo = ALVOS[nome]
+        diretorio = RAIZ / alvo.diretorio
+        os.environ.update(parametros["env"])
+        # Igual ao `uvicorn main:app` rodando dentro do diretório da API
+        os.chdir(diretorio)
+        sys.path.insert(0, str(diretorio))
+
+        if not parametros["mostrar_logs"]:
+            nulo = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(nulo, 1)
+            os.dup2(nulo, 2)
+
+        import importlib
+        app = importlib.import_module(alvo.modulo).app
+        conexao.send(("ok", asyncio.run(_medir(app, alvo, parametros))))
+    except BaseException:
+        conexao.send(("erro", traceback.format_exc()))
+    finally:
+        conexao.close()
+
+
+def medir_alvo(nome: str, parametros: Dict[str, Any]) -> Dict[str, Any]:
+    """Roda um alvo em um processo novo (spawn) e devolve o resultado"""
+    contexto = multiprocessing.get_context("spawn")
+    receber, enviar = contexto.Pipe(duplex=False)
+    processo = contexto.Process(target=_processo_alvo, args=(nome, parametros, enviar))
+    processo.start()
+    enviar.close()
+    try:
+        situacao, conteudo = receber.recv()
+    except EOFError:
+        situacao, conteudo = "erro", f"processo terminou com código {processo.exitcode}"
+    processo.join()
+    if situacao != "ok":
+        raise RuntimeError(f"Falha no alvo {nome}:\n{conteudo}")
+    return conteudo
+
+
+# ===================================
+# RESULTADOS
+# ===================================
+
+def _commit_atual() -> Optional[str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        sujo = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=RAIZ, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if sujo else commit
+
+
+def _linha(resultado: Dict[str, Any]) -> str:
+    lat = resultado["latencia_ms"]
+    return (
+        f"{resultado['alvo']:<22} {resultado['req_por_segundo']:>10.1f} "
+        f"{lat['p50']:>9.3f} {lat['p95']:>9.3f} {lat['p99']:>9.3f} {resultado['erros']:>7}"
+    )
+
+
+CABECALHO_TABELA = f"{'alvo':<22} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erros':>7}"
+
+
+def _variacao(antes: float, depois: float) -> str:
+    if not antes:
+        return "    n/a"
+    return f"{(depois - antes) / antes * 100:+6.1f}%"
+
+
+def comparar(caminho_antes: str, caminho_depois: str) -> None:
+    """Tabela com a variação de req/s e latência entre duas execuções"""
+    antes = json.loads(Path(caminho_antes).read_text(encoding="utf-8"))
+    depois = json.loads(Path(caminho_depois).read_text(encoding="utf-8"))
+    print(f"antes:  {antes.get('commit')} ({antes.get('data')})")
+    print(f"depois: {depois.get('commit')} ({depois.get('data')})")
+    if antes["parametros"] != depois["parametros"]:
+        print("⚠️  Parâmetros diferentes entre as execuções: a comparação pode não ser justa")
+
+    por_alvo = {r["alvo"]: r for r in antes["resultados"]}
+    print(f"\n{'alvo':<22} {'req/s (antes → depois)':<27} {'p50':>7} {'p95':>7} {'p99':>7}")
+    for novo in depois["resultados"]:
+        velho = por_alvo.get(novo["alvo"])
+        if velho is None:
+            print(f"{novo['alvo']:<22} (sem resultado anterior)")
+            continue
+        print(
+            f"{novo['alvo']:<22} "
+            f"{velho['req_por_segundo']:>9.0f} → {novo['req_por_segundo']:<8.0f}"
+            f"{_variacao(velho['req_por_segundo'], novo['req_por_segundo'])} "
+            + " ".join(
+                _variacao(velho["latencia_ms"][p], novo["latencia_ms"][p]) for p in ("p50", "p95", "p99")
+            )
+        )
+
+
+# ===================================
+# LINHA DE COMANDO
+# ===================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ASGI em processo das APIs da aula")
+    parser.add_argument("alvos", nargs="*", help="Alvos a medir (padrão: todos; veja --listar)")
+    parser.add_argument("-n", "--requisicoes", type=int, default=2000, help="Requisições medidas por alvo")
+    parser.add_argument("-c", "--concorrencia", type=int, default=16, help="Requisições em voo ao mesmo tempo")
+    parser.add_argument("--aquecimento", type=int, default=200, help="Requisições descartadas antes de medir")
+    parser.add_argument("--semente", type=int, default=42, help="Semente dos geradores de payload")
+    parser.add_argument("--env", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="Variável de ambiente para as APIs (ex.: FAST_CODEC=true); pode repetir")
+    parser.add_argument("--saida", help="Arquivo JSON do resultado (padrão: benchmarks/resultados/<data>-<commit>.json)")
+    parser.add_argument("--mostrar-logs", action="store_true", help="Não descartar os logs das APIs")
+    parser.add_argument("--listar", action="store_true", help="Lista os alvos disponíveis")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"), help="Compara dois resultados JSON")
+    args = parser.parse_args(argv)
+
+    if args.listar:
+        for alvo in ALVOS.values():
+            print(f"{alvo.nome:<22} {alvo.metodo} {alvo.rota:<16} {alvo.diretorio}/{alvo.modulo}")
+        return 0
+    if args.comparar:
+        comparar(*args.comparar)
+        return 0
+
+    desconhecidos = [nome for nome in args.alvos if nome not in ALVOS]
+    if desconhecidos:
+        parser.error(f"alvos desconhecidos: {desconhecidos} (veja --listar)")
+    if args.requisicoes < 1 or args.concorrencia < 1 or args.aquecimento < 0:
+        parser.error("--requisicoes e --concorrencia devem ser >= 1 e --aquecimento >= 0")
+    try:
+        env = dict(item.split("=", 1) for item in args.env)
+    except ValueError:
+        parser.error("--env espera CHAVE=VALOR")
+
+    parametros = {
+        "requisicoes": args.requisicoes,
+        "concorrencia": args.concorrencia,
+        "aquecimento": args.aquecimento,
+        "semente": args.semente,
+        "env": env,
+        "mostrar_logs": args.mostrar_logs,
+    }
+
+    print(CABECALHO_TABELA)
+    resultados = []
+    falhas = 0
+    for nome in args.alvos or list(ALVOS):
+        try:
+            resultado = medir_alvo(nome, parametros)
+        except RuntimeError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            falhas += 1
+            continue
+        resultados.append(resultado)
+        print(_linha(resultado), flush=True)
+
+    commit = _commit_atual()
+    agora = datetime.now()
+    saida = Path(args.saida) if args.saida else (
+        DIRETORIO_RESULTADOS / f"{agora:%Y%m%d-%H%M%S}-{commit or 'sem-git'}.json"
+    )
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps({
+        "commit": commit,
+        "data": agora.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": {chave: valor for chave, valor in parametros.items() if chave != "mostrar_logs"},
+        "resultados": resultados,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultado salvo em {saida}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
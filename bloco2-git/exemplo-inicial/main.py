@@ -6,9 +6,29 @@ Esta é a versão estável da API que está rodando em produção.
 Histórico Git completo disponível para rastreabilidade.
 """
 
-from fastapi import FastAPI
-from pydantic import BaseModel, Field
-from typing import Dict
+import json
+import os
+import sys
+from pathlib import Path
+
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, Field, ValidationError, model_validator
+from typing import AsyncIterator, Dict, List, Optional
+import numpy as np
+
+# Raiz do repositório no path para importar o motor de regras compartilhado
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from antifraude.admin import exigir_admin  # noqa: E402
+from antifraude.codec import RotaCodecRapido  # noqa: E402
+from antifraude.idempotencia import CacheIdempotencia, ConflitoIdempotencia  # noqa: E402
+from antifraude.memoria import MiddlewareAlocacoes, RastreadorMemoria, criar_router_memoria  # noqa: E402
+from antifraude.metricas import TIPO_CONTEUDO, MiddlewareLatencia, RegistroMetricas  # noqa: E402
+from antifraude.ndjson import RespostaNDJSON, ler_linhas  # noqa: E402
+from antifraude.regras import carregar_regras, compilar_lote_primeira, compilar_primeira  # noqa: E402
+from antifraude.velocidade import ArmazemVelocidade  # noqa: E402
 
 app = FastAPI(
     title="API Anti-Fraude",
@@ -16,14 +36,38 @@ app = FastAPI(
     description="Sistema de detecção de transações fraudulentas"
 )
 
+# Codec rápido opcional (FAST_CODEC=true): mesmo OpenAPI, menos CPU por requisição
+if os.getenv("FAST_CODEC", "false").lower() == "true":
+    app.router.route_class = RotaCodecRapido
+
 
 class Transacao(BaseModel):
-    """Modelo de entrada para análise de fraude"""
+    """
+    Modelo de entrada para análise de fraude
+    
+    Com conta_id, o servidor calcula numero_transacoes_hoje e
+    distancia_ultima_compra_km (a partir de latitude/longitude; sem
+    localização atual ou anterior vale a distância enviada, ou 0);
+    sem conta_id, esses dois campos são obrigatórios.
+    """
     valor: float = Field(..., gt=0, description="Valor da transação em reais")
     hora_do_dia: int = Field(..., ge=0, le=23, description="Hora da transação (0-23)")
-    distancia_ultima_compra_km: float = Field(..., ge=0, description="Distância da última compra em km")
-    numero_transacoes_hoje: int = Field(..., ge=0, description="Número de transações hoje")
+    distancia_ultima_compra_km: Optional[float] = Field(None, ge=0, description="Distância da última compra em km")
+    numero_transacoes_hoje: Optional[int] = Field(None, ge=0, description="Número de transações hoje")
     idade_conta_dias: int = Field(..., ge=0, description="Idade da conta em dias")
+    conta_id: Optional[str] = Field(None, min_length=1, description="Conta: ativa o cálculo de velocidade no servidor")
+    latitude: Optional[float] = Field(None, ge=-90, le=90, description="Latitude da compra")
+    longitude: Optional[float] = Field(None, ge=-180, le=180, description="Longitude da compra")
+    
+    @model_validator(mode="after")
+    def exigir_velocidade(self) -> "Transacao":
+        if self.conta_id is None and (
+            self.distancia_ultima_compra_km is None or self.numero_transacoes_hoje is None
+        ):
+            raise ValueError(
+                "Informe conta_id ou distancia_ultima_compra_km e numero_transacoes_hoje"
+            )
+        return self
 
 
 class RespostaFraude(BaseModel):
@@ -34,6 +78,89 @@ class RespostaFraude(BaseModel):
     motivo: str
 
 
+# Tamanho máximo aceito em /analisar/lote
+MAX_LOTE = 10000
+
+# Regras de negócio (a primeira regra verdadeira decide)
+REGRAS = carregar_regras([
+    {
+        "nome": "valor_alto",
+        "campo": "valor", "operador": ">", "limiar": 10000,
+        "confianca": 0.95,
+        "motivo": "Valor acima do threshold de R$ 10.000",
+    },
+    {
+        "nome": "madrugada",
+        "condicoes": [["hora_do_dia", "<", 6], ["numero_transacoes_hoje", ">", 5]],
+        "confianca": 0.85,
+        "motivo": "Múltiplas transações em horário suspeito (madrugada)",
+    },
+    {
+        "nome": "distancia_conta_recente",
+        "condicoes": [["distancia_ultima_compra_km", ">", 500], ["idade_conta_dias", "<", 30]],
+        "confianca": 0.80,
+        "motivo": "Distância suspeita com conta recente",
+    },
+])
+CONFIANCA_LEGITIMA = 0.90
+MOTIVO_LEGITIMA = "Transação dentro dos padrões normais"
+
+# Compiladas uma única vez, na importação
+avaliar_regras = compilar_primeira(REGRAS)
+avaliar_lote = compilar_lote_primeira(REGRAS)
+
+# Decisões por Idempotency-Key: retentativas recebem a mesma resposta
+cache_idempotencia = CacheIdempotencia(max_chaves=10_000, ttl_segundos=300)
+
+# Velocidade por conta (janela de 24h), calculada no próprio servidor
+velocidade = ArmazemVelocidade()
+
+# Métricas Prometheus (GET /metrics); com METRICS_DIR os workers do uvicorn são somados
+metricas = RegistroMetricas(os.getenv("METRICS_DIR"))
+ROTAS_METRICAS = ["/", "/health", "/analisar", "/analisar/lote", "/analisar/stream", "outros"]
+regras_ativadas_total = metricas.contador(
+    "fraude_regras_ativadas_total", "Regra que decidiu cada transação marcada como fraude",
+    rotulo="regra", valores=[regra.nome for regra in REGRAS]
+)
+decisoes_total = metricas.contador(
+    "fraude_decisoes_total", "Transações analisadas por decisão",
+    rotulo="decisao", valores=["fraude", "aprovada"]
+)
+erros_validacao_total = metricas.contador(
+    "fraude_erros_validacao_total", "Requisições (ou linhas NDJSON) rejeitadas na validação",
+    rotulo="rota", valores=ROTAS_METRICAS
+)
+latencia_http = metricas.histograma(
+    "fraude_http_duracao_segundos", "Latência das requisições por rota",
+    rotulo="rota", valores=ROTAS_METRICAS
+)
+app.add_middleware(MiddlewareLatencia, histograma=latencia_http)
+
+
+@app.exception_handler(RequestValidationError)
+async def contar_erro_validacao(request: Request, exc: RequestValidationError):
+    """Conta o erro de validação e responde o 422 padrão do FastAPI"""
+    rota = request.url.path if request.url.path in ROTAS_METRICAS else "outros"
+    erros_validacao_total.inc(rota)
+    return await request_validation_exception_handler(request, exc)
+
+
+def aplicar_velocidade(transacao: Transacao) -> None:
+    """Preenche os campos de velocidade a partir do histórico da conta"""
+    if transacao.conta_id is None:
+        return
+    quantidade, distancia = velocidade.registrar(
+        transacao.conta_id, transacao.latitude, transacao.longitude
+    )
+    transacao.numero_transacoes_hoje = quantidade
+    # ⚠️ Sem localização (atual ou anterior) não há distância calculada:
+    # mantém a informada pelo cliente em vez de zerar a regra de distância
+    if distancia is not None:
+        transacao.distancia_ultima_compra_km = distancia
+    elif transacao.distancia_ultima_compra_km is None:
+        transacao.distancia_ultima_compra_km = 0.0
+
+
 @app.get("/")
 async def root() -> Dict[str, str]:
     """Endpoint de boas-vindas"""
@@ -50,50 +177,173 @@ async def health_check() -> Dict[str, str]:
     return {"status": "ok", "version": "1.0.0"}
 
 
+def decidir(transacao: Transacao) -> RespostaFraude:
+    """Aplica as regras de negócio a uma transação já validada"""
+    aplicar_velocidade(transacao)
+    valor_processado = float(transacao.valor)
+    
+    # Regras de negócio (tabela REGRAS, compilada na importação)
+    regra = avaliar_regras(transacao)
+    if regra is not None:
+        regras_ativadas_total.inc(regra.nome)
+        decisoes_total.inc("fraude")
+        return RespostaFraude(
+            fraude=True,
+            confianca=regra.peso,
+            valor_processado=valor_processado,
+            motivo=regra.motivo
+        )
+    
+    # Transação legítima
+    decisoes_total.inc("aprovada")
+    return RespostaFraude(
+        fraude=False,
+        confianca=CONFIANCA_LEGITIMA,
+        valor_processado=valor_processado,
+        motivo=MOTIVO_LEGITIMA
+    )
+
+
+# ⚠️ def (não async def): roda no threadpool, onde o CacheIdempotencia (threading)
+# pode segurar a retentativa simultânea sem travar o event loop
 @app.post("/analisar", response_model=RespostaFraude)
-async def analisar_transacao(transacao: Transacao) -> RespostaFraude:
+def analisar_transacao(
+    transacao: Transacao,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+) -> RespostaFraude:
     """
     Analisa uma transação e retorna se é fraudulenta.
     
     Regra de negócio atual:
     - Transações acima de R$ 10.000 são marcadas como fraude
+    
+    Com o header Idempotency-Key, retentativas (inclusive simultâneas)
+    recebem a decisão da primeira análise.
     """
     # Validação de entrada já feita pelo Pydantic
-    valor_processado = float(transacao.valor)
+    if idempotency_key is None:
+        return decidir(transacao)
     
-    # Regra de negócio principal
-    if valor_processado > 10000:
-        return RespostaFraude(
-            fraude=True,
-            confianca=0.95,
-            valor_processado=valor_processado,
-            motivo="Valor acima do threshold de R$ 10.000"
+    try:
+        return cache_idempotencia.executar(
+            idempotency_key, transacao.model_dump_json(), lambda: decidir(transacao)
         )
+    except ConflitoIdempotencia as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.get("/idempotencia/stats")
+async def idempotencia_stats() -> Dict:
+    """Hits, misses e requisições coalescidas do cache de Idempotency-Key"""
+    return cache_idempotencia.estatisticas()
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Métricas no formato de texto do Prometheus"""
+    return Response(content=metricas.exportar(), media_type=TIPO_CONTEUDO)
+
+
+# ⚠️ def (não async def): aplicar_velocidade segura um threading.Lock e o lote
+# inteiro roda no threadpool, sem travar as outras requisições no event loop
+@app.post("/analisar/lote", response_model=List[RespostaFraude])
+def analisar_lote(
+    transacoes: List[Transacao] = Body(..., min_length=1, max_length=MAX_LOTE)
+) -> List[Dict]:
+    """
+    Analisa um lote de transações em uma única requisição.
     
-    # Análise de padrões adicionais
-    if transacao.hora_do_dia < 6 and transacao.numero_transacoes_hoje > 5:
-        return RespostaFraude(
-            fraude=True,
-            confianca=0.85,
-            valor_processado=valor_processado,
-            motivo="Múltiplas transações em horário suspeito (madrugada)"
-        )
+    As regras de /analisar são avaliadas como operações vetorizadas (NumPy)
+    sobre as colunas do lote, evitando o custo de HTTP por transação.
+    Retorna uma resposta por transação, na mesma ordem de entrada.
+    """
+    for transacao in transacoes:
+        aplicar_velocidade(transacao)
     
-    if transacao.distancia_ultima_compra_km > 500 and transacao.idade_conta_dias < 30:
-        return RespostaFraude(
-            fraude=True,
-            confianca=0.80,
-            valor_processado=valor_processado,
-            motivo="Distância suspeita com conta recente"
-        )
+    n = len(transacoes)
+    colunas = {
+        "valor": np.fromiter((t.valor for t in transacoes), dtype=np.float64, count=n),
+        "hora_do_dia": np.fromiter((t.hora_do_dia for t in transacoes), dtype=np.int64, count=n),
+        "distancia_ultima_compra_km": np.fromiter((t.distancia_ultima_compra_km for t in transacoes), dtype=np.float64, count=n),
+        "numero_transacoes_hoje": np.fromiter((t.numero_transacoes_hoje for t in transacoes), dtype=np.int64, count=n),
+        "idade_conta_dias": np.fromiter((t.idade_conta_dias for t in transacoes), dtype=np.int64, count=n),
+    }
     
-    # Transação legítima
-    return RespostaFraude(
-        fraude=False,
-        confianca=0.90,
-        valor_processado=valor_processado,
-        motivo="Transação dentro dos padrões normais"
-    )
+    # Índice da primeira regra verdadeira por linha (-1 = legítima)
+    indices = avaliar_lote(colunas)
+    
+    # Métricas: uma atualização por regra, não por transação
+    por_regra = np.bincount(indices + 1, minlength=len(REGRAS) + 1)
+    for regra, quantidade in zip(REGRAS, por_regra[1:].tolist()):
+        if quantidade:
+            regras_ativadas_total.inc(regra.nome, quantidade)
+    decisoes_total.inc("fraude", n - int(por_regra[0]))
+    decisoes_total.inc("aprovada", int(por_regra[0]))
+    
+    # Decisões possíveis: uma por regra + a decisão legítima no fim (índice -1)
+    decisoes = [(True, r.peso, r.motivo) for r in REGRAS]
+    decisoes.append((False, CONFIANCA_LEGITIMA, MOTIVO_LEGITIMA))
+    
+    return [
+        {
+            "fraude": decisoes[i][0],
+            "confianca": decisoes[i][1],
+            "valor_processado": v,
+            "motivo": decisoes[i][2],
+        }
+        for i, v in zip(indices.tolist(), colunas["valor"].tolist())
+    ]
+
+
+@app.post(
+    "/analisar/stream",
+    response_class=RespostaNDJSON,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-ndjson": {"schema": Transacao.model_json_schema()}},
+        }
+    },
+)
+async def analisar_stream(request: Request) -> RespostaNDJSON:
+    """
+    Analisa um stream NDJSON de transações (uma transação JSON por linha).
+    
+    Cada decisão é escrita na resposta (também NDJSON, na mesma ordem)
+    assim que fica pronta. Linhas inválidas geram {"linha": n, "erros": [...]}
+    e o processamento continua na linha seguinte.
+    """
+    async def respostas() -> AsyncIterator[bytes]:
+        numero = 0
+        try:
+            async for linha in ler_linhas(request.stream()):
+                numero += 1
+                try:
+                    transacao = Transacao.model_validate_json(linha)
+                except ValidationError as e:
+                    erros_validacao_total.inc("/analisar/stream")
+                    erros = e.json(include_url=False, include_context=False)
+                    yield f'{{"linha": {numero}, "erros": {erros}}}\n'.encode()
+                    continue
+                # ✅ Decisão (com o lock da velocidade) no threadpool: o event loop segue livre
+                resposta = await run_in_threadpool(decidir, transacao)
+                yield resposta.model_dump_json().encode() + b"\n"
+        except ValueError as e:
+            # Linha grande demais: não dá para sincronizar de novo com o stream
+            yield json.dumps({"linha": numero + 1, "erros": [{"msg": str(e)}]}).encode() + b"\n"
+    
+    return RespostaNDJSON(respostas())
+
+
+# Diagnóstico de memória (tracemalloc) em /admin/memoria: desligado por padrão
+if os.getenv("MEMORY_PROFILING_ENABLED", "false").lower() == "true":
+    rastreador_memoria = RastreadorMemoria(rotas=["/analisar", "/analisar/lote"])
+    app.add_middleware(MiddlewareAlocacoes, rastreador=rastreador_memoria)
+    app.include_router(criar_router_memoria(
+        rastreador_memoria,
+        modelos=[Transacao, RespostaFraude],
+        dependencias=[Depends(exigir_admin(os.getenv("ADMIN_TOKEN")))]
+    ))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,208 @@
+"""
+Testes da API Anti-Fraude (exemplo-inicial)
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+client = TestClient(app)
+
+# Conta recente (10 dias): distância > 500 km é fraude
+BASE = {"valor": 100.0, "hora_do_dia": 14, "idade_conta_dias": 10}
+
+
+def test_conta_sem_coordenadas_mantem_a_distancia_informada():
+    payload = {**BASE, "conta_id": "sem-coordenadas", "distancia_ultima_compra_km": 800}
+
+    resposta = client.post("/analisar", json=payload).json()
+
+    assert resposta["fraude"] is True
+    assert resposta["motivo"] == "Distância suspeita com conta recente"
+
+
+def test_conta_sem_localizacao_anterior_mantem_a_distancia_informada():
+    payload = {**BASE, "conta_id": "primeira-compra", "latitude": -23.55, "longitude": -46.63,
+               "distancia_ultima_compra_km": 800}
+
+    assert client.post("/analisar", json=payload).json()["fraude"] is True
+
+
+def test_conta_calcula_a_distancia_entre_compras():
+    sao_paulo = {**BASE, "conta_id": "viajante", "latitude": -23.55, "longitude": -46.63}
+    recife = {**BASE, "conta_id": "viajante", "latitude": -8.05, "longitude": -34.88}
+
+    assert client.post("/analisar", json=sao_paulo).json()["fraude"] is False
+    # ~2.100 km desde a última compra, mesmo com o cliente informando 0
+    assert client.post("/analisar", json={**recife, "distancia_ultima_compra_km": 0}).json()["fraude"] is True
+
+
+def test_conta_sem_distancia_nenhuma_aprova():
+    payload = {**BASE, "conta_id": "sem-nada"}
+
+    assert client.post("/analisar", json=payload).json()["fraude"] is False
+    assert client.post("/analisar/lote", json=[payload]).json()[0]["fraude"] is False
+
+
+def test_retentativas_simultaneas_com_a_mesma_chave_analisam_uma_vez(monkeypatch):
+    chamadas = []
+    decidir_original = main.decidir
+
+    def decidir_lento(transacao):
+        chamadas.append(transacao)
+        time.sleep(0.3)  # a análise ainda está em andamento quando as retentativas chegam
+        return decidir_original(transacao)
+
+    monkeypatch.setattr(main, "decidir", decidir_lento)
+    payload = {**BASE, "numero_transacoes_hoje": 1, "distancia_ultima_compra_km": 1}
+    coalescidas_antes = main.cache_idempotencia.coalesced
+
+    async def cenario():
+        # Um único event loop para todas as requisições (como no uvicorn)
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            async def analisar():
+                return await cliente.post("/analisar", json=payload, headers={"Idempotency-Key": "retentativa-simultanea"})
+
+            async def health():
+                await asyncio.sleep(0.05)
+                resposta = await cliente.get("/health")
+                return resposta, main.cache_idempotencia.estatisticas()["em_andamento"]
+
+            return await asyncio.gather(*[analisar() for _ in range(4)], health())
+
+    *respostas, (saude, em_andamento) = asyncio.run(cenario())
+
+    assert len(chamadas) == 1
+    assert main.cache_idempotencia.coalesced - coalescidas_antes == 3
+    assert [r.status_code for r in respostas] == [200] * 4
+    assert len({r.text for r in respostas}) == 1
+    # O event loop continuou livre: /health respondeu com a análise em andamento
+    assert saude.status_code == 200
+    assert em_andamento == 1
+
+
+def test_lote_decide_igual_a_analise_individual():
+    # Os dois lados de cada limite das regras (valor, madrugada, distância com conta recente)
+    limites = {
+        "valor": [10000.0, 10000.01],
+        "hora_do_dia": [5, 6],
+        "numero_transacoes_hoje": [5, 6],
+        "distancia_ultima_compra_km": [500.0, 500.01],
+        "idade_conta_dias": [29, 30],
+    }
+    transacoes = [dict(zip(limites, valores)) for valores in itertools.product(*limites.values())]
+    sorteio = random.Random(42)
+    transacoes += [
+        {
+            "valor": round(sorteio.uniform(0.01, 20000), 2),
+            "hora_do_dia": sorteio.randint(0, 23),
+            "numero_transacoes_hoje": sorteio.randint(0, 12),
+            "distancia_ultima_compra_km": round(sorteio.uniform(0, 1000), 2),
+            "idade_conta_dias": sorteio.randint(0, 60),
+        }
+        for _ in range(200)
+    ]
+
+    lote = client.post("/analisar/lote", json=transacoes).json()
+    individuais = [client.post("/analisar", json=t).json() for t in transacoes]
+
+    assert lote == individuais
+    # Todas as decisões aparecem no conjunto
+    assert {r["motivo"] for r in lote} == {regra.motivo for regra in main.REGRAS} | {main.MOTIVO_LEGITIMA}
+
+
+def test_lote_e_stream_nao_travam_o_event_loop(monkeypatch):
+    aplicar_original = main.aplicar_velocidade
+
+    def aplicar_lento(transacao):
+        time.sleep(0.3)  # ex.: um lote grande esperando o lock da velocidade
+        aplicar_original(transacao)
+
+    monkeypatch.setattr(main, "aplicar_velocidade", aplicar_lento)
+    payload = {**BASE, "conta_id": "lenta", "numero_transacoes_hoje": 1, "distancia_ultima_compra_km": 1}
+
+    async def cenario(rota, **kwargs):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as cliente:
+            async def analisar():
+                resposta = await cliente.post(rota, **kwargs)
+                return resposta, time.perf_counter()
+
+            async def health():
+                await asyncio.sleep(0.05)
+                resposta = await cliente.get("/health")
+                return resposta, time.perf_counter()
+
+            return await asyncio.gather(analisar(), health())
+
+    for rota, kwargs in [
+        ("/analisar/lote", {"json": [payload]}),
+        ("/analisar/stream", {"content": json.dumps(payload), "headers": {"Content-Type": "application/x-ndjson"}}),
+    ]:
+        (analise, fim_analise), (saude, fim_saude) = asyncio.run(cenario(rota, **kwargs))
+
+        assert analise.status_code == 200 and saude.status_code == 200
+        # /health respondeu enquanto a análise ainda estava em andamento
+        assert fim_saude < fim_analise, rota
+
+
+def enviar_stream(linhas, tamanho_pedaco=7):
+    """Corpo NDJSON em pedaços pequenos, que cortam as linhas no meio"""
+    corpo = "\n".join(linhas).encode()
+    pedacos = (corpo[i:i + tamanho_pedaco] for i in range(0, len(corpo), tamanho_pedaco))
+    return client.post("/analisar/stream", content=pedacos, headers={"Content-Type": "application/x-ndjson"})
+
+
+def transacao(valor):
+    return {**BASE, "valor": valor, "numero_transacoes_hoje": 1, "distancia_ultima_compra_km": 1}
+
+
+def test_stream_ndjson_uma_decisao_por_linha_na_ordem():
+    valores = [float(v) for v in range(1, 51)] + [15000.0]
+    # Última linha sem \n no fim e uma linha vazia no meio (ignorada)
+    linhas = [json.dumps(transacao(v)) for v in valores]
+    linhas.insert(10, "")
+
+    resposta = enviar_stream(linhas)
+
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+    assert resposta.text.endswith("\n")
+    decisoes = [json.loads(linha) for linha in resposta.text.splitlines()]
+    assert [d["valor_processado"] for d in decisoes] == valores
+    assert [d["fraude"] for d in decisoes] == [False] * 50 + [True]
+
+
+def test_stream_linha_invalida_no_meio_nao_interrompe():
+    linhas = [
+        json.dumps(transacao(10.0)),
+        '{"valor": 5, "hora_do_dia"',  # JSON quebrado
+        json.dumps({**transacao(20.0), "hora_do_dia": 99}),  # JSON válido, fora do schema
+        json.dumps(transacao(30.0)),
+    ]
+
+    decisoes = [json.loads(linha) for linha in enviar_stream(linhas).text.splitlines()]
+
+    assert len(decisoes) == 4
+    assert decisoes[0]["valor_processado"] == 10.0
+    assert decisoes[1]["linha"] == 2 and decisoes[1]["erros"]
+    assert decisoes[2]["linha"] == 3 and decisoes[2]["erros"][0]["loc"] == ["hora_do_dia"]
+    assert decisoes[3]["valor_processado"] == 30.0
+
+
+def test_stream_linha_grande_demais_encerra_com_erro():
+    linhas = [json.dumps(transacao(10.0)), "x" * (70 * 1024)]
+
+    decisoes = [json.loads(linha) for linha in enviar_stream(linhas, tamanho_pedaco=4096).text.splitlines()]
+
+    assert decisoes[0]["valor_processado"] == 10.0
+    assert decisoes[-1]["linha"] == 2
@@ -5,13 +5,20 @@ API de Detecção de Fraude - Versão 1.1 COM BUG CRÍTICO
 ⚠️ ATENÇÃO: Esta versão contém um bug intencional!
 Deploy desta versão quebrará a produção.
 
-Bug: linha 72 - ZeroDivisionError
+Bug: linha 99 - ZeroDivisionError
 """
 
+import sys
+from pathlib import Path
+
 from fastapi import FastAPI
 from pydantic import BaseModel, Field
 from typing import Dict
 
+# Raiz do repositório no path para importar o motor de regras compartilhado
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from antifraude.regras import carregar_regras, compilar_primeira  # noqa: E402
+
 app = FastAPI(
     title="API Anti-Fraude",
     version="1.1.0",
@@ -36,6 +43,30 @@ class RespostaFraude(BaseModel):
     motivo: str
 
 
+# Regras de negócio (a primeira regra verdadeira decide)
+REGRAS = carregar_regras([
+    {
+        "nome": "valor_alto",
+        "campo": "valor", "operador": ">", "limiar": 10000,
+        "confianca": 0.95,
+        "motivo": "Valor acima do threshold de R$ 10.000",
+    },
+    {
+        "nome": "madrugada",
+        "condicoes": [["hora_do_dia", "<", 6], ["numero_transacoes_hoje", ">", 5]],
+        "confianca": 0.85,
+        "motivo": "Múltiplas transações em horário suspeito (madrugada)",
+    },
+    {
+        "nome": "distancia_conta_recente",
+        "condicoes": [["distancia_ultima_compra_km", ">", 500], ["idade_conta_dias", "<", 30]],
+        "confianca": 0.80,
+        "motivo": "Distância suspeita com conta recente",
+    },
+])
+avaliar_regras = compilar_primeira(REGRAS)
+
+
 @app.get("/")
 async def root() -> Dict[str, str]:
     """Endpoint de boas-vindas"""
@@ -67,30 +98,14 @@ async def analisar_transacao(transacao: Transacao) -> RespostaFraude:
     # mas introduziu um bug catastrófico
     resultado_normalizacao = 1 / 0  # 💥 BOOM! Divisão por zero
     
-    # Regra de negócio principal (nunca será executada)
-    if valor_processado > 10000:
-        return RespostaFraude(
-            fraude=True,
-            confianca=0.95,
-            valor_processado=valor_processado,
-            motivo="Valor acima do threshold de R$ 10.000"
-        )
-    
-    # Análise de padrões adicionais
-    if transacao.hora_do_dia < 6 and transacao.numero_transacoes_hoje > 5:
-        return RespostaFraude(
-            fraude=True,
-            confianca=0.85,
-            valor_processado=valor_processado,
-            motivo="Múltiplas transações em horário suspeito (madrugada)"
-        )
-    
-    if transacao.distancia_ultima_compra_km > 500 and transacao.idade_conta_dias < 30:
+    # Regras de negócio (nunca serão executadas)
+    regra = avaliar_regras(transacao)
+    if regra is not None:
         return RespostaFraude(
             fraude=True,
-            confianca=0.80,
+            confianca=regra.peso,
             valor_processado=valor_processado,
-            motivo="Distância suspeita com conta recente"
+            motivo=regra.motivo
         )
     
     # Transação legítima
@@ -5,19 +5,65 @@ Este exemplo demonstra uma API que usa logging estruturado em JSON.
 
 import json
 import logging
+import os
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, Request
+from pathlib import Path
+from typing import Dict, Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field
+from dotenv import load_dotenv
 import sys
 
+# Raiz do repositório no path para importar o motor de regras compartilhado
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from antifraude.admin import exigir_admin  # noqa: E402
+from antifraude.amostragem import AmostragemEventos, ConfigAmostragem, ler_config  # noqa: E402
+from antifraude.codec import RotaCodecRapido  # noqa: E402
+from antifraude.fila_logs import HandlerFila  # noqa: E402
+from antifraude.idempotencia import CacheIdempotencia, ConflitoIdempotencia  # noqa: E402
+from antifraude.memoria import MiddlewareAlocacoes, RastreadorMemoria, criar_router_memoria  # noqa: E402
+from antifraude.metricas import TIPO_CONTEUDO, MiddlewareLatencia, RegistroMetricas  # noqa: E402
+from antifraude.perfilador import PerfiladorAmostragem, PerfilEmAndamento  # noqa: E402
+from antifraude.rastreamento import (  # noqa: E402
+    MiddlewareRastreamento,
+    campos_contexto,
+    marcar_desde_inicio,
+    marcar_fim_endpoint,
+    rastro_atual,
+    span,
+)
+from antifraude.regras import carregar_regras, compilar_score, compilar_score_cronometrado  # noqa: E402
+
+# ✅ Configurações do arquivo .env (como no bloco5), antes de qualquer os.getenv
+load_dotenv()
+
 # ✅ Configuração de logging estruturado
+# A requisição só enfileira o registro; uma thread escreve no stdout em lotes
+handler_logs = HandlerFila(
+    sys.stdout,
+    max_registros=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    politica=os.getenv("LOG_QUEUE_POLICY", "drop-oldest"),
+)
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
     format='%(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
+    handlers=[handler_logs]
 )
 logger = logging.getLogger(__name__)
 
+NIVEIS = {"ERROR": logging.ERROR, "WARNING": logging.WARNING, "INFO": logging.INFO}
+
+# Amostragem e limite por evento (ex.: LOG_SAMPLING=transaction_approved=0.01)
+# Pode ser trocada em tempo de execução via PUT /logs/amostragem
+amostragem = AmostragemEventos(ConfigAmostragem(
+    taxas=ler_config(os.getenv("LOG_SAMPLING")),
+    limites=ler_config(os.getenv("LOG_RATE_LIMIT")),
+    taxa_padrao=float(os.getenv("LOG_SAMPLING_DEFAULT", "1.0")),
+))
+
 
 def log_structured(level: str, event: str, **kwargs):
     """
@@ -27,22 +73,25 @@ def log_structured(level: str, event: str, **kwargs):
     - Indexáveis (CloudWatch, Datadog, Elastic)
     - Consultáveis (queries complexas)
     - Alertáveis (triggers automáticos)
+    
+    ✅ Nível desligado ou evento fora da amostragem: nada é montado
+    nem serializado.
+    
+    ✅ request_id e client_ip da requisição atual entram automaticamente.
     """
-    log_entry = {
-        "timestamp": datetime.utcnow().isoformat(),
-        "level": level,
-        "event": event,
-        **kwargs
-    }
+    nivel = NIVEIS.get(level, logging.DEBUG)
+    if not logger.isEnabledFor(nivel) or not amostragem.permitir(event):
+        return
     
-    if level == "ERROR":
-        logger.error(json.dumps(log_entry))
-    elif level == "WARNING":
-        logger.warning(json.dumps(log_entry))
-    elif level == "INFO":
-        logger.info(json.dumps(log_entry))
-    else:
-        logger.debug(json.dumps(log_entry))
+    with span("logs"):
+        log_entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "level": level,
+            "event": event,
+            **campos_contexto(),
+            **kwargs
+        }
+        logger.log(nivel, json.dumps(log_entry))
 
 
 app = FastAPI(
@@ -51,6 +100,17 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Codec rápido opcional (FAST_CODEC=true): mesmo OpenAPI, menos CPU por requisição
+if os.getenv("FAST_CODEC", "false").lower() == "true":
+    app.router.route_class = RotaCodecRapido
+
+# Contexto por requisição + resumo de tempos (spans) em TRACE_SAMPLE_RATE das requisições
+app.add_middleware(
+    MiddlewareRastreamento,
+    emitir=lambda resumo: log_structured("INFO", "request_trace", **resumo),
+    taxa_amostragem=float(os.getenv("TRACE_SAMPLE_RATE", "0.0")),
+)
+
 
 class TransacaoInput(BaseModel):
     valor: float = Field(..., gt=0, description="Valor da transação em reais")
@@ -67,6 +127,85 @@ class TransacaoOutput(BaseModel):
     mensagem: str
 
 
+class AmostragemInput(BaseModel):
+    """Nova configuração de amostragem (campos ausentes mantêm o valor atual)"""
+    taxas: Optional[Dict[str, float]] = Field(None, description="Taxa por evento (0 a 1)")
+    limites: Optional[Dict[str, float]] = Field(None, description="Registros/segundo por evento")
+    taxa_padrao: Optional[float] = Field(None, ge=0, le=1, description="Taxa dos eventos sem configuração")
+
+
+# Regras de negócio (modo aditivo: cada regra ativada soma seu score)
+REGRAS = carregar_regras([
+    {
+        "nome": "valor_alto", "evento": "high_value_detected",
+        "campo": "valor", "operador": ">", "limiar": 10000,
+        "score": 0.4,
+    },
+    {
+        "nome": "horario_suspeito", "evento": "suspicious_hour_detected",
+        "condicoes": [["hora_do_dia", "<", 6], ["hora_do_dia", ">", 23]],
+        "combinar": "ou",
+        "score": 0.3,
+    },
+    {
+        "nome": "distancia_grande", "evento": "large_distance_detected",
+        "campo": "distancia_ultima_compra_km", "operador": ">", "limiar": 500,
+        "score": 0.2,
+    },
+    {
+        "nome": "muitas_transacoes", "evento": "high_transaction_count",
+        "campo": "numero_transacoes_hoje", "operador": ">", "limiar": 10,
+        "score": 0.1,
+    },
+])
+REGRAS_POR_NOME = {regra.nome: regra for regra in REGRAS}
+# Campo (e se leva threshold) do log de cada regra ativada: nomes mantidos
+# porque consultas e alertas em cima dos logs dependem deles
+CAMPOS_LOG_REGRAS = {
+    "valor_alto": ("valor", True),
+    "horario_suspeito": ("hora_do_dia", False),
+    "distancia_grande": ("distancia_km", True),
+    "muitas_transacoes": ("numero_transacoes", True),
+}
+LIMIAR_FRAUDE = 0.5
+
+# Compiladas uma única vez, na importação (a cronometrada só roda em requisições rastreadas)
+avaliar_regras = compilar_score(REGRAS)
+avaliar_regras_cronometrado = compilar_score_cronometrado(REGRAS)
+
+# Decisões por Idempotency-Key: retentativas recebem a mesma resposta
+cache_idempotencia = CacheIdempotencia(max_chaves=10_000, ttl_segundos=300)
+
+# Métricas Prometheus (GET /metrics); com METRICS_DIR os workers do uvicorn são somados
+metricas = RegistroMetricas(os.getenv("METRICS_DIR"))
+ROTAS_METRICAS = ["/", "/health", "/analisar", "outros"]
+regras_ativadas_total = metricas.contador(
+    "fraude_regras_ativadas_total", "Regras antifraude ativadas",
+    rotulo="regra", valores=[regra.nome for regra in REGRAS]
+)
+decisoes_total = metricas.contador(
+    "fraude_decisoes_total", "Transações analisadas por decisão",
+    rotulo="decisao", valores=["fraude", "aprovada"]
+)
+erros_validacao_total = metricas.contador(
+    "fraude_erros_validacao_total", "Requisições rejeitadas na validação (422)",
+    rotulo="rota", valores=ROTAS_METRICAS
+)
+latencia_http = metricas.histograma(
+    "fraude_http_duracao_segundos", "Latência das requisições por rota",
+    rotulo="rota", valores=ROTAS_METRICAS
+)
+app.add_middleware(MiddlewareLatencia, histograma=latencia_http)
+
+
+@app.exception_handler(RequestValidationError)
+async def contar_erro_validacao(request: Request, exc: RequestValidationError):
+    """Conta o erro de validação e responde o 422 padrão do FastAPI"""
+    rota = request.url.path if request.url.path in ROTAS_METRICAS else "outros"
+    erros_validacao_total.inc(rota)
+    return await request_validation_exception_handler(request, exc)
+
+
 @app.get("/")
 def root():
     log_structured("INFO", "health_check", endpoint="/")
@@ -79,8 +218,7 @@ def health():
     return {"status": "healthy"}
 
 
-@app.post("/analisar", response_model=TransacaoOutput)
-def analisar_transacao(transacao: TransacaoInput, request: Request):
+def processar_transacao(transacao: TransacaoInput, request: Request) -> TransacaoOutput:
     """
     Analisa uma transação e retorna se é provável fraude.
     
@@ -112,93 +250,66 @@ def analisar_transacao(transacao: TransacaoInput, request: Request):
         # Processamento
         valor_processado = transacao.valor
         
-        # Lógica de detecção de fraude
-        score_risco = 0.0
-        regras_ativadas = []
-        
-        # Regra 1: Valor alto
-        if transacao.valor > 10000:
-            score_risco += 0.4
-            regras_ativadas.append("valor_alto")
-            # ✅ Log com contexto específico
-            log_structured(
-                "WARNING",
-                "high_value_detected",
-                valor=transacao.valor,
-                threshold=10000,
-                score_added=0.4
-            )
-        
-        # Regra 2: Horário suspeito
-        if transacao.hora_do_dia < 6 or transacao.hora_do_dia > 23:
-            score_risco += 0.3
-            regras_ativadas.append("horario_suspeito")
-            # ✅ Log com contexto específico
-            log_structured(
-                "WARNING",
-                "suspicious_hour_detected",
-                hora_do_dia=transacao.hora_do_dia,
-                score_added=0.3
-            )
+        # Lógica de detecção de fraude (tabela REGRAS)
+        rastro = rastro_atual()
+        if rastro is None:
+            score_risco, regras_ativadas = avaliar_regras(transacao)
+        else:
+            tempos = []
+            score_risco, regras_ativadas = avaliar_regras_cronometrado(transacao, tempos)
+            for nome, nanossegundos in tempos:
+                rastro.adicionar(f"regra.{nome}", nanossegundos)
         
-        # Regra 3: Distância grande
-        if transacao.distancia_ultima_compra_km > 500:
-            score_risco += 0.2
-            regras_ativadas.append("distancia_grande")
-            # ✅ Log com contexto específico
-            log_structured(
-                "WARNING",
-                "large_distance_detected",
-                distancia_km=transacao.distancia_ultima_compra_km,
-                threshold=500,
-                score_added=0.2
-            )
+        for nome in regras_ativadas:
+            regras_ativadas_total.inc(nome)
         
-        # Regra 4: Muitas transações
-        if transacao.numero_transacoes_hoje > 10:
-            score_risco += 0.1
-            regras_ativadas.append("muitas_transacoes")
-            # ✅ Log com contexto específico
+        for nome in regras_ativadas:
+            regra = REGRAS_POR_NOME[nome]
+            condicao = regra.condicoes[0]
+            campo_log, com_threshold = CAMPOS_LOG_REGRAS[nome]
+            # ✅ Log com contexto específico de cada regra ativada
             log_structured(
                 "WARNING",
-                "high_transaction_count",
-                numero_transacoes=transacao.numero_transacoes_hoje,
-                threshold=10,
-                score_added=0.1
+                regra.evento,
+                **{campo_log: getattr(transacao, condicao.campo)},
+                **({"threshold": condicao.limiar} if com_threshold else {}),
+                score_added=regra.peso
             )
         
         # Decisão
-        fraude = score_risco >= 0.5
-        
-        if fraude:
-            # ✅ Log estruturado de fraude detectada
-            log_structured(
-                "ERROR",
-                "fraud_detected",
+        with span("decisao"):
+            fraude = score_risco >= LIMIAR_FRAUDE
+            decisoes_total.inc("fraude" if fraude else "aprovada")
+            
+            if fraude:
+                # ✅ Log estruturado de fraude detectada
+                log_structured(
+                    "ERROR",
+                    "fraud_detected",
+                    score_risco=round(score_risco, 2),
+                    regras_ativadas=regras_ativadas,
+                    valor=transacao.valor,
+                    action="blocked"
+                )
+                mensagem = "Transação bloqueada por suspeita de fraude"
+            else:
+                # ✅ Log estruturado de transação aprovada
+                log_structured(
+                    "INFO",
+                    "transaction_approved",
+                    score_risco=round(score_risco, 2),
+                    regras_ativadas=regras_ativadas,
+                    valor=transacao.valor,
+                    action="approved"
+                )
+                mensagem = "Transação aprovada"
+            
+            return TransacaoOutput(
+                fraude=fraude,
                 score_risco=round(score_risco, 2),
-                regras_ativadas=regras_ativadas,
-                valor=transacao.valor,
-                action="blocked"
+                valor_processado=valor_processado,
+                mensagem=mensagem
             )
-            mensagem = "Transação bloqueada por suspeita de fraude"
-        else:
-            # ✅ Log estruturado de transação aprovada
-            log_structured(
-                "INFO",
-                "transaction_approved",
-                score_risco=round(score_risco, 2),
-                regras_ativadas=regras_ativadas,
-                valor=transacao.valor,
-                action="approved"
-            )
-            mensagem = "Transação aprovada"
-        
-        return TransacaoOutput(
-            fraude=fraude,
-            score_risco=round(score_risco, 2),
-            valor_processado=valor_processado,
-            mensagem=mensagem
-        )
     
     except ValueError as e:
         # ✅ Log estruturado de erro de validação
@@ -223,6 +334,132 @@ def analisar_transacao(transacao: TransacaoInput, request: Request):
         raise HTTPException(status_code=500, detail="Erro interno do servidor")
 
 
+@app.post("/analisar", response_model=TransacaoOutput)
+def analisar_transacao(
+    transacao: TransacaoInput,
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """
+    Analisa uma transação e retorna se é provável fraude.
+    
+    ✅ Com o header Idempotency-Key, retentativas (inclusive simultâneas)
+    recebem a decisão da primeira análise, sem analisar de novo.
+    """
+    # Leitura do body + validação Pydantic terminam aqui
+    marcar_desde_inicio("validacao")
+    
+    if idempotency_key is None:
+        resultado = processar_transacao(transacao, request)
+        marcar_fim_endpoint()
+        return resultado
+    
+    try:
+        resultado = cache_idempotencia.executar(
+            idempotency_key,
+            transacao.model_dump_json(),
+            lambda: processar_transacao(transacao, request)
+        )
+        marcar_fim_endpoint()
+        return resultado
+    except ConflitoIdempotencia as e:
+        # ✅ Log estruturado de chave reutilizada com outro payload
+        log_structured(
+            "WARNING",
+            "idempotency_conflict",
+            idempotency_key=idempotency_key,
+            error_message=str(e)
+        )
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.get("/idempotencia/stats")
+def idempotencia_stats():
+    """Hits, misses e requisições coalescidas do cache de Idempotency-Key"""
+    return cache_idempotencia.estatisticas()
+
+
+@app.get("/logs/stats")
+def logs_stats():
+    """Fila de logs: pendentes, escritos e descartados (coletor lento)"""
+    return handler_logs.estatisticas()
+
+
+@app.get("/metrics")
+def metrics():
+    """Métricas no formato de texto do Prometheus"""
+    return Response(content=metricas.exportar(), media_type=TIPO_CONTEUDO)
+
+
+@app.get("/logs/amostragem")
+def obter_amostragem():
+    """Configuração de amostragem atual e registros suprimidos por evento"""
+    return amostragem.estatisticas()
+
+
+# ✅ Mudar a amostragem pode silenciar a trilha de auditoria: só admin
+apenas_admin = Depends(exigir_admin(os.getenv("ADMIN_TOKEN")))
+
+
+@app.put("/logs/amostragem", dependencies=[apenas_admin])
+def alterar_amostragem(config: AmostragemInput):
+    """Troca taxas e limites por evento sem reiniciar a API"""
+    try:
+        amostragem.configurar(config.taxas, config.limites, config.taxa_padrao)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # Sempre registrado: mudança de configuração é auditável
+    logger.warning(json.dumps({
+        "timestamp": datetime.utcnow().isoformat(),
+        "level": "WARNING",
+        "event": "log_sampling_changed",
+        **config.model_dump(exclude_none=True)
+    }))
+    return amostragem.estatisticas()
+
+
+# ===================================
+# ADMINISTRAÇÃO (desligada por padrão)
+# ===================================
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+MEMORY_PROFILING_ENABLED = os.getenv("MEMORY_PROFILING_ENABLED", "false").lower() == "true"
+
+if MEMORY_PROFILING_ENABLED:
+    # ✅ Snapshots do tracemalloc e memória retida por requisição em /analisar
+    rastreador_memoria = RastreadorMemoria(rotas=["/analisar"])
+    app.add_middleware(MiddlewareAlocacoes, rastreador=rastreador_memoria)
+    app.include_router(criar_router_memoria(
+        rastreador_memoria,
+        modelos=[TransacaoInput, TransacaoOutput],
+        dependencias=[apenas_admin]
+    ))
+
+if PROFILER_ENABLED:
+    perfilador = PerfiladorAmostragem(max_segundos=60)
+
+    @app.get("/admin/profile", response_class=PlainTextResponse, dependencies=[apenas_admin])
+    def perfil_cpu(
+        segundos: float = Query(10, gt=0, le=60),
+        intervalo_ms: float = Query(5, ge=1, le=1000),
+        ociosos: bool = False
+    ):
+        """
+        Amostra as pilhas de todas as threads por N segundos.
+        
+        ✅ Resposta em "collapsed stacks": salve em perfil.txt e abra no
+        speedscope.app ou gere o SVG com flamegraph.pl.
+        """
+        try:
+            perfil = perfilador.perfilar(segundos, intervalo_ms, ociosos)
+        except PerfilEmAndamento as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        log_structured("WARNING", "cpu_profile_collected", amostras=perfil.amostras, segundos=perfil.segundos)
+        return PlainTextResponse(
+            perfil.collapsed(),
+            headers={"X-Profile-Samples": str(perfil.amostras), "X-Profile-Seconds": str(perfil.segundos)}
+        )
+
+
 if __name__ == "__main__":
     import uvicorn
     # ✅ Log estruturado de inicialização
@@ -0,0 +1,153 @@
+"""
+Reprocessamento em Lote - Linha de Comando
+==========================================
+
+Reavalia um dump CSV histórico de transações com as MESMAS regras da API
+(tabela REGRAS de main.py), sem passar pelo HTTP.
+
+- O arquivo de entrada é mapeado em memória (mmap), não lido inteiro
+- O arquivo é dividido em blocos que terminam em fim de linha
+- Cada bloco é avaliado (NumPy) em um processo do pool
+- A saída mantém a ordem das linhas de entrada
+
+Uso:
+    python reprocessar.py transacoes.csv decisoes.csv --processos 8
+
+A entrada precisa de um cabeçalho com as colunas usadas pelas regras
+(valor, hora_do_dia, distancia_ultima_compra_km, numero_transacoes_hoje);
+colunas extras são ignoradas. A saída tem uma linha por transação:
+fraude,score_risco,regras_ativadas (regras separadas por "|").
+"""
+
+import argparse
+import mmap
+import os
+import time
+from multiprocessing import Pool
+from typing import List, Tuple
+
+import numpy as np
+
+from main import LIMIAR_FRAUDE, REGRAS, log_structured
+from antifraude.regras import campos_usados, compilar_lote_score
+
+CAMPOS = campos_usados(REGRAS)
+avaliar_lote = compilar_lote_score(REGRAS)
+
+# Texto de regras_ativadas para cada combinação de regras (bit j = regra j)
+COMBINACOES = [
+    "|".join(r.nome for j, r in enumerate(REGRAS) if codigo & (1 << j))
+    for codigo in range(1 << len(REGRAS))
+]
+BITS = np.array([1 << j for j in range(len(REGRAS))], dtype=np.int64)
+
+TAMANHO_BLOCO_PADRAO = 8 * 1024 * 1024  # 8 MB
+
+
+def ler_cabecalho(caminho: str) -> Tuple[List[int], int]:
+    """Retorna os índices das colunas usadas pelas regras e onde os dados começam"""
+    with open(caminho, "rb") as arquivo:
+        cabecalho = arquivo.readline()
+    colunas = [c.strip() for c in cabecalho.decode("utf-8").split(",")]
+
+    faltando = [campo for campo in CAMPOS if campo not in colunas]
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes no CSV: {faltando}")
+
+    return [colunas.index(campo) for campo in CAMPOS], len(cabecalho)
+
+
+def dividir_blocos(caminho: str, inicio: int, tamanho_bloco: int) -> List[Tuple[int, int]]:
+    """Divide o arquivo em intervalos [inicio, fim) que terminam em fim de linha"""
+    blocos = []
+    with open(caminho, "rb") as arquivo:
+        if os.fstat(arquivo.fileno()).st_size == 0:
+            return blocos
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+            total = len(dados)
+            while inicio < total:
+                fim = dados.find(b"\n", min(inicio + tamanho_bloco, total) - 1)
+                fim = total if fim == -1 else fim + 1
+                blocos.append((inicio, fim))
+                inicio = fim
+    return blocos
+
+
+def processar_bloco(tarefa: Tuple[str, int, int, List[int]]) -> Tuple[bytes, int]:
+    """Avalia um bloco do CSV (roda em um processo do pool)"""
+    caminho, inicio, fim, indices = tarefa
+
+    with open(caminho, "rb") as arquivo:
+        with mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) as dados:
+            linhas = dados[inicio:fim].decode("utf-8").splitlines()
+
+    linhas = [linha for linha in linhas if linha.strip()]
+    if not linhas:
+        return b"", 0
+
+    matriz = np.loadtxt(linhas, delimiter=",", usecols=indices, ndmin=2, dtype=np.float64)
+    colunas = {campo: matriz[:, j] for j, campo in enumerate(CAMPOS)}
+
+    scores, ativadas = avaliar_lote(colunas)
+    fraudes = scores >= LIMIAR_FRAUDE
+    codigos = ativadas.astype(np.int64) @ BITS
+
+    saida = "".join(
+        f"{'true' if fraude else 'false'},{score},{COMBINACOES[codigo]}\n"
+        for fraude, score, codigo in zip(fraudes.tolist(), np.round(scores, 2).tolist(), codigos.tolist())
+    )
+    return saida.encode("utf-8"), len(linhas)
+
+
+def reprocessar(entrada: str, saida: str, processos: int, tamanho_bloco: int = TAMANHO_BLOCO_PADRAO) -> int:
+    """Reavalia o CSV de entrada e grava as decisões em ordem; retorna o número de linhas"""
+    indices, inicio_dados = ler_cabecalho(entrada)
+    tarefas = [
+        (entrada, inicio, fim, indices)
+        for inicio, fim in dividir_blocos(entrada, inicio_dados, tamanho_bloco)
+    ]
+
+    total = 0
+    with open(saida, "wb") as arquivo, Pool(processes=processos) as pool:
+        arquivo.write(b"fraude,score_risco,regras_ativadas\n")
+        # imap mantém a ordem dos blocos sem esperar todos terminarem
+        for dados, linhas in pool.imap(processar_bloco, tarefas):
+            arquivo.write(dados)
+            total += linhas
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reprocessa um CSV de transações com as regras da API")
+    parser.add_argument("entrada", help="CSV de transações (com cabeçalho)")
+    parser.add_argument("saida", help="CSV de decisões a ser gerado")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1,
+                        help="Número de processos (padrão: número de CPUs)")
+    parser.add_argument("--tamanho-bloco-mb", type=float, default=TAMANHO_BLOCO_PADRAO / 1024 / 1024,
+                        help="Tamanho de cada bloco do arquivo em MB (padrão: 8)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    linhas = reprocessar(
+        args.entrada,
+        args.saida,
+        processos=args.processos,
+        tamanho_bloco=max(1, int(args.tamanho_bloco_mb * 1024 * 1024)),
+    )
+    segundos = time.perf_counter() - inicio
+
+    # ✅ Resumo estruturado, no mesmo formato dos logs da API
+    log_structured(
+        "INFO",
+        "bulk_rescore_finished",
+        entrada=args.entrada,
+        saida=args.saida,
+        linhas=linhas,
+        processos=args.processos,
+        segundos=round(segundos, 3),
+        linhas_por_segundo=round(linhas / segundos) if segundos > 0 else None
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Testes da API Anti-Fraude com logs estruturados
+"""
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+client = TestClient(app)
+
+SILENCIAR_AUDITORIA = {"taxas": {"fraud_detected": 0.0}, "limites": {"fraud_detected": 0.001}}
+
+
+def test_alterar_amostragem_sem_token_recusa_e_mantem_a_config():
+    antes = main.amostragem.estatisticas()
+
+    resposta = client.put("/logs/amostragem", json=SILENCIAR_AUDITORIA)
+
+    assert resposta.status_code == 403
+    assert main.amostragem.estatisticas() == antes
+    assert client.get("/logs/amostragem").json() == antes
+
+
+def test_alterar_amostragem_com_token_invalido_recusa():
+    antes = main.amostragem.estatisticas()
+
+    resposta = client.put("/logs/amostragem", json=SILENCIAR_AUDITORIA, headers={"X-Admin-Token": "chute"})
+
+    assert resposta.status_code == 403
+    assert main.amostragem.estatisticas() == antes
+
+
+def test_alterar_amostragem_como_admin():
+    antes = main.amostragem.estatisticas()
+    app.dependency_overrides[main.apenas_admin.dependency] = lambda: None
+    try:
+        resposta = client.put("/logs/amostragem", json={"taxas": {"transaction_approved": 0.5}})
+
+        assert resposta.status_code == 200
+        assert resposta.json()["taxas"] == {"transaction_approved": 0.5}
+    finally:
+        app.dependency_overrides.clear()
+        main.amostragem.configurar(antes["taxas"], antes["limites"], antes["taxa_padrao"])
@@ -0,0 +1,81 @@
+"""
+Testes do reprocessamento em lote (mmap + Pool.imap)
+"""
+
+import random
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from main import LIMIAR_FRAUDE, avaliar_regras
+from reprocessar import dividir_blocos, ler_cabecalho, reprocessar
+
+PASTA = Path(__file__).resolve().parent
+CABECALHO = "id,valor,hora_do_dia,distancia_ultima_compra_km,numero_transacoes_hoje,idade_conta_dias"
+
+
+def gerar_linhas(quantidade, semente=7):
+    sorteio = random.Random(semente)
+    return [
+        (i, round(sorteio.uniform(1, 20000), 2), sorteio.randint(0, 23),
+         round(sorteio.uniform(0, 1000), 1), sorteio.randint(0, 15), sorteio.randint(0, 400))
+        for i in range(quantidade)
+    ]
+
+
+def escrever_csv(caminho, linhas, fim_de_linha="\n", newline_no_fim=True):
+    texto = fim_de_linha.join([CABECALHO] + [",".join(map(str, linha)) for linha in linhas])
+    caminho.write_bytes((texto + (fim_de_linha if newline_no_fim else "")).encode())
+
+
+def decisao_esperada(linha):
+    """A mesma decisão da API (regras compiladas de main.py), no formato da saída"""
+    _, valor, hora, distancia, numero, _ = linha
+    score, regras = avaliar_regras(SimpleNamespace(
+        valor=valor, hora_do_dia=hora, distancia_ultima_compra_km=distancia, numero_transacoes_hoje=numero,
+    ))
+    return f"{'true' if score >= LIMIAR_FRAUDE else 'false'},{round(score, 2)},{'|'.join(regras)}"
+
+
+def test_crlf_ultima_linha_sem_newline_e_ordem(tmp_path):
+    linhas = gerar_linhas(300)
+    entrada, saida = tmp_path / "transacoes.csv", tmp_path / "decisoes.csv"
+    escrever_csv(entrada, linhas, fim_de_linha="\r\n", newline_no_fim=False)
+
+    # Blocos pequenos: dezenas de blocos em 3 processos, terminando fora de ordem
+    total = reprocessar(str(entrada), str(saida), processos=3, tamanho_bloco=512)
+
+    resultado = saida.read_text().splitlines()
+    assert total == len(linhas)
+    assert resultado[0] == "fraude,score_risco,regras_ativadas"
+    assert resultado[1:] == [decisao_esperada(linha) for linha in linhas]
+
+
+def test_blocos_terminam_em_fim_de_linha(tmp_path):
+    entrada = tmp_path / "transacoes.csv"
+    escrever_csv(entrada, gerar_linhas(100), newline_no_fim=False)
+    dados = entrada.read_bytes()
+    _, inicio = ler_cabecalho(str(entrada))
+
+    blocos = dividir_blocos(str(entrada), inicio, 100)
+
+    assert len(blocos) > 1
+    assert blocos[0][0] == inicio and blocos[-1][1] == len(dados)
+    assert all(fim == proximo for (_, fim), (proximo, _) in zip(blocos, blocos[1:]))
+    assert all(dados[fim - 1:fim] == b"\n" for _, fim in blocos[:-1])
+
+
+def test_linha_de_comando(tmp_path):
+    linhas = gerar_linhas(50)
+    entrada, saida = tmp_path / "transacoes.csv", tmp_path / "decisoes.csv"
+    escrever_csv(entrada, linhas)
+
+    processo = subprocess.run(
+        [sys.executable, "reprocessar.py", str(entrada), str(saida), "--processos", "2", "--tamanho-bloco-mb", "0.001"],
+        cwd=PASTA, capture_output=True, text=True,
+    )
+
+    assert processo.returncode == 0, processo.stderr
+    assert '"bulk_rescore_finished"' in processo.stdout and '"linhas": 50' in processo.stdout
+    assert saida.read_text().splitlines()[1:] == [decisao_esperada(linha) for linha in linhas]
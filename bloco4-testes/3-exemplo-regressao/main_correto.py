@@ -3,9 +3,16 @@ API de Detecção de Fraude - VERSÃO CORRETA
 Regra de negócio: Transações > R$ 10.000 são fraude
 """
 
+import sys
+from pathlib import Path
+
 from fastapi import FastAPI
 from pydantic import BaseModel
 
+# Raiz do repositório no path para importar o motor de regras compartilhado
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from antifraude.regras import carregar_regras, compilar_primeira  # noqa: E402
+
 app = FastAPI(title="API Fraude - Versão Correta")
 
 
@@ -23,6 +30,32 @@ class ResultadoAnalise(BaseModel):
     motivo: str
 
 
+# Regras de negócio (a primeira regra verdadeira decide)
+REGRAS = carregar_regras([
+    # ✅ REGRA CORRETA: threshold em R$ 10.000
+    {
+        "nome": "valor_alto",
+        "campo": "valor", "operador": ">", "limiar": 10000,
+        "confianca": 0.95,
+        "motivo": "Valor acima do threshold de R$ 10.000",
+    },
+    {
+        "nome": "horario_suspeito",
+        "condicoes": [["hora_do_dia", "<", 6], ["hora_do_dia", ">", 23]],
+        "combinar": "ou",
+        "confianca": 0.85,
+        "motivo": "Transação em horário suspeito",
+    },
+    {
+        "nome": "distancia_grande",
+        "campo": "distancia_ultima_compra_km", "operador": ">", "limiar": 500,
+        "confianca": 0.80,
+        "motivo": "Distância muito grande da última compra",
+    },
+])
+avaliar_regras = compilar_primeira(REGRAS)
+
+
 @app.get("/")
 def root():
     return {"status": "API rodando", "versao": "1.0-correto"}
@@ -40,30 +73,16 @@ def analisar_transacao(transacao: Transacao):
     
     Regra de negócio CORRETA: Transações > R$ 10.000 são consideradas fraude
     """
-    valor_processado = float(transacao.valor)
-    
-    # ✅ REGRA CORRETA: threshold em R$ 10.000
-    if valor_processado > 10000:
-        return ResultadoAnalise(
-            fraude=True,
-            confianca=0.95,
-            motivo="Valor acima do threshold de R$ 10.000"
-        )
-    
-    if transacao.hora_do_dia < 6 or transacao.hora_do_dia > 23:
-        return ResultadoAnalise(
-            fraude=True,
-            confianca=0.85,
-            motivo="Transação em horário suspeito"
-        )
-    
-    if transacao.distancia_ultima_compra_km > 500:
+    # Regras de negócio (tabela REGRAS, compilada na importação)
+    regra = avaliar_regras(transacao)
+    if regra is not None:
         return ResultadoAnalise(
             fraude=True,
-            confianca=0.80,
-            motivo="Distância muito grande da última compra"
+            confianca=regra.peso,
+            motivo=regra.motivo
         )
     
+    # Transação legítima
     return ResultadoAnalise(
         fraude=False,
         confianca=0.90,
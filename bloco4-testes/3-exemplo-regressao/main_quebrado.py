@@ -4,9 +4,16 @@ Um gerente pediu para aumentar o threshold de R$ 10k para R$ 15k
 Isso VIOLA a especificação original e quebra os testes!
 """
 
+import sys
+from pathlib import Path
+
 from fastapi import FastAPI
 from pydantic import BaseModel
 
+# Raiz do repositório no path para importar o motor de regras compartilhado
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from antifraude.regras import carregar_regras, compilar_primeira  # noqa: E402
+
 app = FastAPI(title="API Fraude - Versão Quebrada")
 
 
@@ -24,6 +31,33 @@ class ResultadoAnalise(BaseModel):
     motivo: str
 
 
+# Regras de negócio (a primeira regra verdadeira decide)
+REGRAS = carregar_regras([
+    # ❌ REGRESSÃO: threshold mudou de R$ 10.000 para R$ 15.000
+    # Isso quebra a especificação e os testes vão falhar!
+    {
+        "nome": "valor_alto",
+        "campo": "valor", "operador": ">", "limiar": 15000,  # Era 10000 antes!
+        "confianca": 0.95,
+        "motivo": "Valor acima do threshold de R$ 15.000",
+    },
+    {
+        "nome": "horario_suspeito",
+        "condicoes": [["hora_do_dia", "<", 6], ["hora_do_dia", ">", 23]],
+        "combinar": "ou",
+        "confianca": 0.85,
+        "motivo": "Transação em horário suspeito",
+    },
+    {
+        "nome": "distancia_grande",
+        "campo": "distancia_ultima_compra_km", "operador": ">", "limiar": 500,
+        "confianca": 0.80,
+        "motivo": "Distância muito grande da última compra",
+    },
+])
+avaliar_regras = compilar_primeira(REGRAS)
+
+
 @app.get("/")
 def root():
     return {"status": "API rodando", "versao": "1.1-quebrado"}
@@ -42,31 +76,16 @@ def analisar_transacao(transacao: Transacao):
     ❌ REGRESSÃO: Gerente pediu para aumentar threshold para R$ 15.000
     Isso viola a regra de negócio original!
     """
-    valor_processado = float(transacao.valor)
-    
-    # ❌ REGRESSÃO: threshold mudou de R$ 10.000 para R$ 15.000
-    # Isso quebra a especificação e os testes vão falhar!
-    if valor_processado > 15000:  # Era 10000 antes!
-        return ResultadoAnalise(
-            fraude=True,
-            confianca=0.95,
-            motivo="Valor acima do threshold de R$ 15.000"
-        )
-    
-    if transacao.hora_do_dia < 6 or transacao.hora_do_dia > 23:
-        return ResultadoAnalise(
-            fraude=True,
-            confianca=0.85,
-            motivo="Transação em horário suspeito"
-        )
-    
-    if transacao.distancia_ultima_compra_km > 500:
+    # Regras de negócio (tabela REGRAS, compilada na importação)
+    regra = avaliar_regras(transacao)
+    if regra is not None:
         return ResultadoAnalise(
             fraude=True,
-            confianca=0.80,
-            motivo="Distância muito grande da última compra"
+            confianca=regra.peso,
+            motivo=regra.motivo
         )
     
+    # Transação legítima
     return ResultadoAnalise(
         fraude=False,
         confianca=0.90,
@@ -3,12 +3,27 @@ API Simples de Detecção de Fraude - COM Variáveis de Ambiente
 ✅ SOLUÇÃO: Configurações externas via .env
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
 from datetime import datetime
+from pathlib import Path
 import os
+import sys
+import numpy as np
 from dotenv import load_dotenv
 
+# Raiz do repositório no path para importar o pacote compartilhado
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from antifraude.admin import exigir_admin  # noqa: E402
+from antifraude.memoria import MiddlewareAlocacoes, RastreadorMemoria, criar_router_memoria  # noqa: E402
+from antifraude.metricas import TIPO_CONTEUDO, MiddlewareLatencia, RegistroMetricas  # noqa: E402
+from antifraude.microlote import AgendadorMicrolote  # noqa: E402
+from antifraude.modelo import GerenciadorModelo, ModeloThreshold  # noqa: E402
+from antifraude.saude import MonitorSaude, drenar_no_sigterm  # noqa: E402
+
 # ✅ SOLUÇÃO: Carregar variáveis do arquivo .env
 load_dotenv()
 
@@ -19,11 +34,121 @@ ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 MODEL_PATH = os.getenv("MODEL_PATH", "artifacts/models/fraud_detection_model.pkl")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 FRAUD_THRESHOLD = float(os.getenv("FRAUD_THRESHOLD", "10000"))
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "true").lower() == "true"
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "true").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+MEMORY_PROFILING_ENABLED = os.getenv("MEMORY_PROFILING_ENABLED", "false").lower() == "true"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # segredo: só no .env
+# Readiness: verificações a cada N segundos, fila máxima e tempo de drenagem no SIGTERM
+READY_CHECK_INTERVAL = float(os.getenv("READY_CHECK_INTERVAL", "1"))
+READY_MAX_QUEUE = int(os.getenv("READY_MAX_QUEUE", "1000"))
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "5"))
+
+# Ordem das features esperada pelo modelo
+FEATURES = [
+    "valor",
+    "hora_do_dia",
+    "distancia_ultima_compra_km",
+    "numero_transacoes_hoje",
+    "idade_conta_dias",
+]
+
+# ✅ Modelo carregado UMA vez e reutilizado por todas as requisições
+# Sem artefato em MODEL_PATH, usa a regra de threshold como modelo
+gerenciador_modelo = GerenciadorModelo(
+    MODEL_PATH,
+    fallback=lambda: ModeloThreshold(FRAUD_THRESHOLD),
+    exemplo_aquecimento=[[500.0, 14, 10.0, 2, 100]],
+)
+
+
+def pre_carregar():
+    """Chamado pelo antifraude.prefork no processo mestre, antes do fork:
+    os workers herdam o modelo já carregado e aquecido (copy-on-write)"""
+    gerenciador_modelo.carregar()
+
+
+def inferir_lote(X: np.ndarray) -> np.ndarray:
+    """Probabilidade de fraude para cada linha de X (uma chamada ao modelo)"""
+    return gerenciador_modelo.obter().predict_proba(X)[:, 1]
+
+
+# ✅ Requisições simultâneas de /predict viram uma única inferência
+agendador = AgendadorMicrolote(
+    inferir_lote,
+    max_lote=MICROBATCH_MAX_SIZE,
+    max_espera_ms=MICROBATCH_MAX_WAIT_MS,
+) if MICROBATCH_ENABLED else None
+
+
+# ✅ Readiness calculado em segundo plano: a sonda só lê o último resultado
+def verificar_modelo():
+    """Modelo carregado (com MODEL_PRELOAD=false ele carrega no primeiro uso)"""
+    return gerenciador_modelo.carregado or not MODEL_PRELOAD, gerenciador_modelo.info().get("model_source")
+
+
+def verificar_fila():
+    """Predições esperando o próximo micro-lote abaixo do limite"""
+    pendentes = agendador.pendentes if agendador is not None else 0
+    return pendentes < READY_MAX_QUEUE, {"pendentes": pendentes, "limite": READY_MAX_QUEUE}
+
+
+monitor_saude = MonitorSaude({
+    "modelo": verificar_modelo,
+    "fila": verificar_fila,
+}, intervalo=READY_CHECK_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # MODEL_PRELOAD=true: carrega e aquece na inicialização
+    # MODEL_PRELOAD=false: carrega na primeira predição
+    if MODEL_PRELOAD:
+        gerenciador_modelo.carregar()
+    if agendador is not None:
+        agendador.iniciar()
+    monitor_saude.iniciar()
+    # SIGTERM: sai do balanceador (not ready), espera e só então desliga
+    drenar_no_sigterm(monitor_saude, SHUTDOWN_DRAIN_SECONDS)
+    yield
+    monitor_saude.drenar()
+    monitor_saude.parar()
+    if agendador is not None:
+        await agendador.parar()
+
 
 app = FastAPI(
     title=APP_NAME,
-    version=VERSION
+    version=VERSION,
+    lifespan=lifespan
+)
+
+
+# Métricas Prometheus (GET /metrics); com METRICS_DIR os workers do uvicorn são somados
+metricas = RegistroMetricas(os.getenv("METRICS_DIR"))
+ROTAS_METRICAS = ["/", "/health", "/health/live", "/health/ready", "/predict", "outros"]
+decisoes_total = metricas.contador(
+    "fraude_decisoes_total", "Predições de /predict por decisão",
+    rotulo="decisao", valores=["fraude", "aprovada"]
+)
+erros_validacao_total = metricas.contador(
+    "fraude_erros_validacao_total", "Requisições rejeitadas na validação (422)",
+    rotulo="rota", valores=ROTAS_METRICAS
+)
+latencia_http = metricas.histograma(
+    "fraude_http_duracao_segundos", "Latência das requisições por rota",
+    rotulo="rota", valores=ROTAS_METRICAS
 )
+app.add_middleware(MiddlewareLatencia, histograma=latencia_http)
+
+
+@app.exception_handler(RequestValidationError)
+async def contar_erro_validacao(request: Request, exc: RequestValidationError):
+    """Conta o erro de validação e responde o 422 padrão do FastAPI"""
+    rota = request.url.path if request.url.path in ROTAS_METRICAS else "outros"
+    erros_validacao_total.inc(rota)
+    return await request_validation_exception_handler(request, exc)
 
 
 class Transaction(BaseModel):
@@ -69,6 +194,23 @@ async def health_check():
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness para o orquestrador: o processo responde (nada é verificado)"""
+    return monitor_saude.resposta_vivo()
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness para o orquestrador: 200 pronto / 503 não pronto
+    
+    Só devolve o último resultado das verificações (modelo, fila), feitas
+    em segundo plano; nunca toca no modelo nem no disco.
+    """
+    return monitor_saude.resposta_pronto()
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_fraud(transaction: Transaction):
     """
@@ -78,11 +220,16 @@ async def predict_fraud(transaction: Transaction):
     Para mudar, basta editar o .env e reiniciar!
     """
     
-    # Lógica simples baseada em regras
-    is_fraud = transaction.valor > FRAUD_THRESHOLD
+    features = [getattr(transaction, f) for f in FEATURES]
     
-    # Simular probabilidade
-    probability = min(transaction.valor / FRAUD_THRESHOLD, 1.0) if is_fraud else 0.0
+    if agendador is not None:
+        # ✅ Entra no próximo micro-lote e espera só a sua probabilidade
+        probability = await agendador.prever(features)
+    else:
+        # ✅ Modelo já carregado (nunca recarrega por requisição)
+        probability = float(inferir_lote(np.array([features], dtype=np.float64))[0])
+    is_fraud = probability >= 0.5
+    decisoes_total.inc("fraude" if is_fraud else "aprovada")
     
     return PredictionResponse(
         prediction=1 if is_fraud else 0,
@@ -95,6 +242,25 @@ async def predict_fraud(transaction: Transaction):
     )
 
 
+@app.get("/predict/stats")
+async def predict_stats():
+    """
+    Vazão e latência do agendador de micro-lotes
+    
+    Compare requisicoes_por_segundo e latencia_ms.p99 variando
+    MICROBATCH_MAX_SIZE e MICROBATCH_MAX_WAIT_MS.
+    """
+    if agendador is None:
+        return {"microbatch_enabled": False}
+    return {"microbatch_enabled": True, **agendador.estatisticas()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato de texto do Prometheus"""
+    return Response(content=metricas.exportar(), media_type=TIPO_CONTEUDO)
+
+
 @app.get("/config")
 async def get_config():
     """
@@ -110,10 +276,39 @@ async def get_config():
         "model_path": MODEL_PATH,
         "log_level": LOG_LEVEL,
         "fraud_threshold": FRAUD_THRESHOLD,
+        "model": gerenciador_modelo.info(),
         "message": "✅ Todas essas configs vêm do arquivo .env!"
     }
 
 
+@app.post("/model/reload", dependencies=[Depends(exigir_admin(ADMIN_TOKEN))])
+def reload_model():
+    """
+    Troca o modelo pelo artefato atual de MODEL_PATH, sem reiniciar
+    
+    O novo modelo é carregado e aquecido antes da troca; requisições
+    em andamento terminam com o modelo anterior. Exige X-Admin-Token.
+    """
+    try:
+        return gerenciador_modelo.recarregar()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Falha ao recarregar o modelo: {e}")
+
+
+# ========================================
+# ADMINISTRAÇÃO (desligada por padrão)
+# ========================================
+if MEMORY_PROFILING_ENABLED:
+    # ✅ Snapshots do tracemalloc e memória retida por requisição em /predict
+    rastreador_memoria = RastreadorMemoria(rotas=["/predict"])
+    app.add_middleware(MiddlewareAlocacoes, rastreador=rastreador_memoria)
+    app.include_router(criar_router_memoria(
+        rastreador_memoria,
+        modelos=[Transaction, PredictionResponse],
+        dependencias=[Depends(exigir_admin(ADMIN_TOKEN))],
+    ))
+
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -0,0 +1,59 @@
+"""
+Testes das métricas Prometheus de /predict
+"""
+
+import re
+
+from fastapi.testclient import TestClient
+
+from main import app
+
+TRANSACAO = {
+    "valor": 100.0,
+    "hora_do_dia": 14,
+    "distancia_ultima_compra_km": 10.0,
+    "numero_transacoes_hoje": 2,
+    "idade_conta_dias": 100,
+}
+
+
+def ler_metrica(texto, linha):
+    """Valor da série exportada (ex.: 'fraude_decisoes_total{decisao="fraude"}')"""
+    encontrado = re.search(rf"^{re.escape(linha)} (\S+)$", texto, re.MULTILINE)
+    assert encontrado, f"série ausente: {linha}"
+    return float(encontrado.group(1))
+
+
+def test_metrics_conta_decisoes_de_predict():
+    with TestClient(app) as client:
+        antes = client.get("/metrics").text
+
+        # Sem artefato em MODEL_PATH vale o threshold (10.000): uma fraude e duas aprovadas
+        for valor in (15000.0, 100.0, 200.0):
+            assert client.post("/predict", json={**TRANSACAO, "valor": valor}).status_code == 200
+
+        resposta = client.get("/metrics")
+
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/plain; version=0.0.4")
+    depois = resposta.text
+    for decisao, esperado in (("fraude", 1), ("aprovada", 2)):
+        serie = f'fraude_decisoes_total{{decisao="{decisao}"}}'
+        assert ler_metrica(depois, serie) - ler_metrica(antes, serie) == esperado
+    serie = 'fraude_http_duracao_segundos_count{rota="/predict"}'
+    assert ler_metrica(depois, serie) - ler_metrica(antes, serie) == 3
+
+
+def test_metrics_conta_erros_de_validacao():
+    with TestClient(app) as client:
+        antes = client.get("/metrics").text
+
+        assert client.post("/predict", json={**TRANSACAO, "hora_do_dia": 99}).status_code == 422
+        assert client.post("/predict", json={"valor": -1}).status_code == 422
+
+        depois = client.get("/metrics").text
+
+    serie = 'fraude_erros_validacao_total{rota="/predict"}'
+    assert ler_metrica(depois, serie) - ler_metrica(antes, serie) == 2
+    serie = 'fraude_decisoes_total{decisao="fraude"}'
+    assert ler_metrica(depois, serie) == ler_metrica(antes, serie)
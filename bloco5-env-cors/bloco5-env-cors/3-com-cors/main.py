@@ -3,42 +3,225 @@ API Simples de Detecção de Fraude - COM CORS
 ✅ SOLUÇÃO: Frontend pode consumir a API
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.exception_handlers import request_validation_exception_handler
+from fastapi.exceptions import RequestValidationError
 from pydantic import BaseModel, Field
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
+from typing import Mapping, Tuple
+import logging
 import os
+import sys
+import numpy as np
 from dotenv import load_dotenv
 
+# Raiz do repositório no path para importar o pacote compartilhado
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+from antifraude.admin import exigir_admin  # noqa: E402
+from antifraude.configuracao import GerenciadorConfiguracao  # noqa: E402
+from antifraude.cors import CorrespondenteOrigens, EstatisticasCORS, MiddlewareCORS  # noqa: E402
+from antifraude.memoria import MiddlewareAlocacoes, RastreadorMemoria, criar_router_memoria  # noqa: E402
+from antifraude.metricas import TIPO_CONTEUDO, MiddlewareLatencia, RegistroMetricas  # noqa: E402
+from antifraude.microlote import AgendadorMicrolote  # noqa: E402
+from antifraude.modelo import GerenciadorModelo, ModeloThreshold  # noqa: E402
+from antifraude.saude import MonitorSaude, drenar_no_sigterm  # noqa: E402
+
 # Carregar variáveis do arquivo .env
-load_dotenv()
+ARQUIVO_ENV = Path(__file__).with_name(".env")
+load_dotenv(ARQUIVO_ENV)
+
+
+# ✅ Configurações recarregáveis: editar o .env (ou `kill -HUP <pid>`)
+# troca o snapshot inteiro, sem reiniciar o processo
+@dataclass(frozen=True)
+class Configuracao:
+    app_name: str
+    version: str
+    environment: str
+    model_path: str
+    log_level: str
+    fraud_threshold: float
+    cors_origins: Tuple[str, ...]
+
+
+def ler_configuracao(valores: Mapping[str, str]) -> Configuracao:
+    """Monta e valida o snapshot (ValueError = recarga rejeitada)"""
+    fraud_threshold = float(valores.get("FRAUD_THRESHOLD", "10000"))
+    if fraud_threshold <= 0:
+        raise ValueError(f"FRAUD_THRESHOLD deve ser positivo: {fraud_threshold}")
+    log_level = valores.get("LOG_LEVEL", "INFO").upper()
+    if not isinstance(logging.getLevelName(log_level), int):
+        raise ValueError(f"LOG_LEVEL inválido: {log_level}")
+    cors_origins = tuple(o.strip() for o in valores.get("CORS_ORIGINS", "*").split(",") if o.strip())
+    if not cors_origins:
+        raise ValueError("CORS_ORIGINS vazio")
+    CorrespondenteOrigens(cors_origins)  # curinga mal escrito = ValueError
+    return Configuracao(
+        app_name=valores.get("APP_NAME", "Fraud Detection API"),
+        version=valores.get("VERSION", "1.0.0"),
+        environment=valores.get("ENVIRONMENT", "development"),
+        model_path=valores.get("MODEL_PATH", "artifacts/models/fraud_detection_model.pkl"),
+        log_level=log_level,
+        fraud_threshold=fraud_threshold,
+        cors_origins=cors_origins,
+    )
+
+
+def aplicar_configuracao(anterior: Configuracao, nova: Configuracao) -> None:
+    """Efeitos de uma recarga (se falhar, o snapshot anterior volta)"""
+    # MODEL_PATH novo, ou threshold novo com o modelo de regra: troca o modelo
+    usa_regra = gerenciador_modelo.info().get("model_source") == "fallback"
+    if nova.model_path != anterior.model_path or (usa_regra and nova.fraud_threshold != anterior.fraud_threshold):
+        gerenciador_modelo.recarregar(nova.model_path)
+    logging.getLogger().setLevel(nova.log_level)
+
+
+configuracao = GerenciadorConfiguracao(
+    str(ARQUIVO_ENV),
+    ler_configuracao,
+    ao_mudar=[aplicar_configuracao],
+    intervalo=float(os.getenv("CONFIG_WATCH_INTERVAL", "2")),
+)
+
+logging.basicConfig(
+    level=configuracao.atual.log_level,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+
+# Lidas uma vez (mudar exige reinício)
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "true").lower() == "true"
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "true").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+MEMORY_PROFILING_ENABLED = os.getenv("MEMORY_PROFILING_ENABLED", "false").lower() == "true"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")  # segredo: só no .env
+# Readiness: verificações a cada N segundos, fila máxima e tempo de drenagem no SIGTERM
+READY_CHECK_INTERVAL = float(os.getenv("READY_CHECK_INTERVAL", "1"))
+READY_MAX_QUEUE = int(os.getenv("READY_MAX_QUEUE", "1000"))
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "5"))
+# Por quantos segundos o navegador reaproveita a resposta do preflight
+CORS_MAX_AGE = int(os.getenv("CORS_MAX_AGE", "600"))
+
+# Ordem das features esperada pelo modelo
+FEATURES = [
+    "valor",
+    "hora_do_dia",
+    "distancia_ultima_compra_km",
+    "numero_transacoes_hoje",
+    "idade_conta_dias",
+]
+
+# ✅ Modelo carregado UMA vez e reutilizado por todas as requisições
+# Sem artefato em MODEL_PATH, usa a regra de threshold como modelo
+gerenciador_modelo = GerenciadorModelo(
+    configuracao.atual.model_path,
+    fallback=lambda: ModeloThreshold(configuracao.atual.fraud_threshold),
+    exemplo_aquecimento=[[500.0, 14, 10.0, 2, 100]],
+)
+
+
+def pre_carregar():
+    """Chamado pelo antifraude.prefork no processo mestre, antes do fork:
+    os workers herdam o modelo já carregado e aquecido (copy-on-write)"""
+    gerenciador_modelo.carregar()
+
+
+def inferir_lote(X: np.ndarray) -> np.ndarray:
+    """Probabilidade de fraude para cada linha de X (uma chamada ao modelo)"""
+    return gerenciador_modelo.obter().predict_proba(X)[:, 1]
+
 
-# Configurações
-APP_NAME = os.getenv("APP_NAME", "Fraud Detection API")
-VERSION = os.getenv("VERSION", "1.0.0")
-ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
-MODEL_PATH = os.getenv("MODEL_PATH", "artifacts/models/fraud_detection_model.pkl")
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
-FRAUD_THRESHOLD = float(os.getenv("FRAUD_THRESHOLD", "10000"))
+# ✅ Requisições simultâneas de /predict viram uma única inferência
+agendador = AgendadorMicrolote(
+    inferir_lote,
+    max_lote=MICROBATCH_MAX_SIZE,
+    max_espera_ms=MICROBATCH_MAX_WAIT_MS,
+) if MICROBATCH_ENABLED else None
+
+
+# ✅ Readiness calculado em segundo plano: a sonda só lê o último resultado
+def verificar_modelo():
+    """Modelo carregado (com MODEL_PRELOAD=false ele carrega no primeiro uso)"""
+    return gerenciador_modelo.carregado or not MODEL_PRELOAD, gerenciador_modelo.info().get("model_source")
+
+
+def verificar_fila():
+    """Predições esperando o próximo micro-lote abaixo do limite"""
+    pendentes = agendador.pendentes if agendador is not None else 0
+    return pendentes < READY_MAX_QUEUE, {"pendentes": pendentes, "limite": READY_MAX_QUEUE}
+
+
+def verificar_configuracao():
+    """
+    Última recarga do .env rejeitada aparece no detalhe, mas não tira o pod
+    do ar: ele segue com a última configuração válida (o mesmo .env ruim
+    em todas as instâncias derrubaria a frota inteira)
+    """
+    erro = configuracao.estatisticas()["ultimo_erro"]
+    return True, {"ultimo_erro": erro} if erro else None
+
+
+monitor_saude = MonitorSaude({
+    "modelo": verificar_modelo,
+    "configuracao": verificar_configuracao,
+    "fila": verificar_fila,
+}, intervalo=READY_CHECK_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # MODEL_PRELOAD=true: carrega e aquece na inicialização
+    # MODEL_PRELOAD=false: carrega na primeira predição
+    if MODEL_PRELOAD:
+        gerenciador_modelo.carregar()
+    if agendador is not None:
+        agendador.iniciar()
+    configuracao.iniciar()  # observa o .env + SIGHUP
+    monitor_saude.iniciar()
+    # SIGTERM: sai do balanceador (not ready), espera e só então desliga
+    drenar_no_sigterm(monitor_saude, SHUTDOWN_DRAIN_SECONDS)
+    yield
+    monitor_saude.drenar()
+    monitor_saude.parar()
+    configuracao.parar()
+    if agendador is not None:
+        await agendador.parar()
 
-# ✅ CORS: Ler origens permitidas do .env
-CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*").split(",")
 
 app = FastAPI(
-    title=APP_NAME,
-    version=VERSION
+    title=configuracao.atual.app_name,
+    version=configuracao.atual.version,
+    lifespan=lifespan
 )
 
-# ========================================
-# ✅ CONFIGURAR CORS
-# ========================================
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=CORS_ORIGINS,  # Origens permitidas
-    allow_credentials=True,       # Permite cookies/auth
-    allow_methods=["*"],          # Permite GET, POST, PUT, DELETE, etc
-    allow_headers=["*"],          # Permite qualquer header
+
+# Métricas Prometheus (GET /metrics); com METRICS_DIR os workers do uvicorn são somados
+metricas = RegistroMetricas(os.getenv("METRICS_DIR"))
+ROTAS_METRICAS = ["/", "/health", "/health/live", "/health/ready", "/predict", "outros"]
+decisoes_total = metricas.contador(
+    "fraude_decisoes_total", "Predições de /predict por decisão",
+    rotulo="decisao", valores=["fraude", "aprovada"]
+)
+erros_validacao_total = metricas.contador(
+    "fraude_erros_validacao_total", "Requisições rejeitadas na validação (422)",
+    rotulo="rota", valores=ROTAS_METRICAS
+)
+latencia_http = metricas.histograma(
+    "fraude_http_duracao_segundos", "Latência das requisições por rota",
+    rotulo="rota", valores=ROTAS_METRICAS
 )
+app.add_middleware(MiddlewareLatencia, histograma=latencia_http)
+
+
+@app.exception_handler(RequestValidationError)
+async def contar_erro_validacao(request: Request, exc: RequestValidationError):
+    """Conta o erro de validação e responde o 422 padrão do FastAPI"""
+    rota = request.url.path if request.url.path in ROTAS_METRICAS else "outros"
+    erros_validacao_total.inc(rota)
+    return await request_validation_exception_handler(request, exc)
 
 
 class Transaction(BaseModel):
@@ -65,12 +248,13 @@ class PredictionResponse(BaseModel):
 @app.get("/")
 async def root():
     """Endpoint raiz"""
+    cfg = configuracao.atual
     return {
-        "message": f"Bem-vindo à {APP_NAME}",
-        "version": VERSION,
-        "environment": ENVIRONMENT,
+        "message": f"Bem-vindo à {cfg.app_name}",
+        "version": cfg.version,
+        "environment": cfg.environment,
         "cors_enabled": True,
-        "cors_origins": CORS_ORIGINS,
+        "cors_origins": cfg.cors_origins,
         "status": "online"
     }
 
@@ -78,16 +262,34 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check"""
+    cfg = configuracao.atual
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "app_name": APP_NAME,
-        "version": VERSION,
-        "environment": ENVIRONMENT,
+        "app_name": cfg.app_name,
+        "version": cfg.version,
+        "environment": cfg.environment,
         "cors_enabled": True
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness para o orquestrador: o processo responde (nada é verificado)"""
+    return monitor_saude.resposta_vivo()
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness para o orquestrador: 200 pronto / 503 não pronto
+    
+    Só devolve o último resultado das verificações (modelo, configuração,
+    fila), feitas em segundo plano; nunca toca no modelo nem no disco.
+    """
+    return monitor_saude.resposta_pronto()
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_fraud(transaction: Transaction):
     """
@@ -95,55 +297,152 @@ async def predict_fraud(transaction: Transaction):
     
     ✅ Agora pode ser chamado de qualquer frontend!
     """
+    cfg = configuracao.atual  # um snapshot por requisição, sem lock
+    features = [getattr(transaction, f) for f in FEATURES]
     
-    # Lógica simples baseada em regras
-    is_fraud = transaction.valor > FRAUD_THRESHOLD
-    
-    # Simular probabilidade
-    probability = min(transaction.valor / FRAUD_THRESHOLD, 1.0) if is_fraud else 0.0
+    if agendador is not None:
+        # ✅ Entra no próximo micro-lote e espera só a sua probabilidade
+        probability = await agendador.prever(features)
+    else:
+        # ✅ Modelo já carregado (nunca recarrega por requisição)
+        probability = float(inferir_lote(np.array([features], dtype=np.float64))[0])
+    is_fraud = probability >= 0.5
+    decisoes_total.inc("fraude" if is_fraud else "aprovada")
     
     return PredictionResponse(
         prediction=1 if is_fraud else 0,
         probability=round(probability, 4),
         label="FRAUDE" if is_fraud else "LEGÍTIMA",
         valor_analisado=transaction.valor,
-        threshold=FRAUD_THRESHOLD,
-        environment=ENVIRONMENT,
+        threshold=cfg.fraud_threshold,
+        environment=cfg.environment,
         cors_enabled=True,
         timestamp=datetime.now().isoformat()
     )
 
 
+@app.get("/predict/stats")
+async def predict_stats():
+    """
+    Vazão e latência do agendador de micro-lotes
+    
+    Compare requisicoes_por_segundo e latencia_ms.p99 variando
+    MICROBATCH_MAX_SIZE e MICROBATCH_MAX_WAIT_MS.
+    """
+    if agendador is None:
+        return {"microbatch_enabled": False}
+    return {"microbatch_enabled": True, **agendador.estatisticas()}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas no formato de texto do Prometheus"""
+    return Response(content=metricas.exportar(), media_type=TIPO_CONTEUDO)
+
+
 @app.get("/config")
 async def get_config():
     """Mostra configurações atuais"""
+    cfg = configuracao.atual
     return {
-        "app_name": APP_NAME,
-        "version": VERSION,
-        "environment": ENVIRONMENT,
-        "model_path": MODEL_PATH,
-        "log_level": LOG_LEVEL,
-        "fraud_threshold": FRAUD_THRESHOLD,
+        "app_name": cfg.app_name,
+        "version": cfg.version,
+        "environment": cfg.environment,
+        "model_path": cfg.model_path,
+        "log_level": cfg.log_level,
+        "fraud_threshold": cfg.fraud_threshold,
+        "model": gerenciador_modelo.info(),
         "cors_enabled": True,
-        "cors_origins": CORS_ORIGINS,
+        "cors_origins": cfg.cors_origins,
+        "reload": configuracao.estatisticas(),
         "message": "✅ Configurações do .env + CORS habilitado!"
     }
 
 
+@app.post("/config/reload", dependencies=[Depends(exigir_admin(ADMIN_TOKEN))])
+def reload_config():
+    """
+    Relê o .env agora (o mesmo que salvar o arquivo ou mandar SIGHUP)
+    
+    Valores inválidos são rejeitados e a configuração atual continua.
+    Exige X-Admin-Token.
+    """
+    try:
+        return {"changes": configuracao.recarregar("POST /config/reload")}
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Configuração rejeitada: {e}")
+
+
+@app.post("/model/reload", dependencies=[Depends(exigir_admin(ADMIN_TOKEN))])
+def reload_model():
+    """
+    Troca o modelo pelo artefato atual de MODEL_PATH, sem reiniciar
+    
+    O novo modelo é carregado e aquecido antes da troca; requisições
+    em andamento terminam com o modelo anterior. Exige X-Admin-Token.
+    """
+    try:
+        return gerenciador_modelo.recarregar()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Falha ao recarregar o modelo: {e}")
+
+
+# ========================================
+# ADMINISTRAÇÃO (desligada por padrão)
+# ========================================
+if MEMORY_PROFILING_ENABLED:
+    # ✅ Snapshots do tracemalloc e memória retida por requisição em /predict
+    rastreador_memoria = RastreadorMemoria(rotas=["/predict"])
+    app.add_middleware(MiddlewareAlocacoes, rastreador=rastreador_memoria)
+    app.include_router(criar_router_memoria(
+        rastreador_memoria,
+        modelos=[Transaction, PredictionResponse],
+        dependencias=[Depends(exigir_admin(ADMIN_TOKEN))],
+    ))
+
+
+# ========================================
+# ✅ CONFIGURAR CORS
+# ========================================
+# Registrado por último = middleware mais externo: o preflight (OPTIONS)
+# é respondido aqui, antes de qualquer outro middleware ou rota
+estatisticas_cors = EstatisticasCORS()
+app.add_middleware(
+    MiddlewareCORS,
+    obter_origens=lambda: configuracao.atual.cors_origins,  # Origens do .env (recarregáveis)
+    allow_credentials=True,       # Permite cookies/auth
+    allow_methods=["*"],          # Permite GET, POST, PUT, DELETE, etc
+    allow_headers=["*"],          # Permite qualquer header
+    max_age=CORS_MAX_AGE,         # Navegador guarda o preflight
+    estatisticas=estatisticas_cors,
+)
+
+
+@app.get("/cors/stats")
+async def cors_stats():
+    """Preflights respondidos e requisições por origem permitida/recusada"""
+    return {
+        "cors_origins": configuracao.atual.cors_origins,
+        "max_age_s": CORS_MAX_AGE,
+        **estatisticas_cors.como_dict(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     
     HOST = os.getenv("API_HOST", "0.0.0.0")
     PORT = int(os.getenv("API_PORT", "8000"))
     
+    cfg = configuracao.atual
     print(f"✅ Configurações carregadas:")
-    print(f"   - APP_NAME: {APP_NAME}")
-    print(f"   - ENVIRONMENT: {ENVIRONMENT}")
-    print(f"   - FRAUD_THRESHOLD: {FRAUD_THRESHOLD}")
+    print(f"   - APP_NAME: {cfg.app_name}")
+    print(f"   - ENVIRONMENT: {cfg.environment}")
+    print(f"   - FRAUD_THRESHOLD: {cfg.fraud_threshold}")
     print(f"   - HOST: {HOST}")
     print(f"   - PORT: {PORT}")
     print(f"\n✅ CORS habilitado!")
-    print(f"   - Origens permitidas: {CORS_ORIGINS}")
+    print(f"   - Origens permitidas: {cfg.cors_origins}")
     print(f"\n🌐 Frontend pode consumir esta API!\n")
     
     uvicorn.run(app, host=HOST, port=PORT)
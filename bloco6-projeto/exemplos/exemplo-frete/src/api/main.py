@@ -1,11 +1,91 @@
-from fastapi import FastAPI
-from src.models.schemas import FreteRequest, FreteResponse
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from src.models.schemas import (
+    CotacaoAgregadaResponse, CotacaoTransportadora, FreteLoteRequest, FreteLoteResponse, FreteRequest, FreteResponse,
+)
+from src.services.frete import ForaDaTabela, carregar_tabela, tabela_padrao
+from src.services.geo import LocalDesconhecido, arredondar_km, carregar_localidades
+from src.services.transportadoras import AgregadorCotacoes, ler_transportadoras
+from pathlib import Path
+from typing import Optional
 import logging
+import math
+import os
+import time
+
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)  # uma linha por chamada às transportadoras
+
+# Tabela de faixas carregada uma vez, na inicialização
+# Sem FRETE_TABELA: regra padrão (R$ 10 por kg + R$ 0,50 por km)
+FRETE_TABELA = os.getenv("FRETE_TABELA")
+FRETE_REGIOES = os.getenv("FRETE_REGIOES")
+FRETE_CACHE = int(os.getenv("FRETE_CACHE", "10000"))
+
+if FRETE_TABELA:
+    tabela = carregar_tabela(FRETE_TABELA, FRETE_REGIOES, tamanho_cache=FRETE_CACHE)
+    logger.info("Tabela de frete carregada de %s: %d faixas", FRETE_TABELA, tabela.faixas)
+else:
+    tabela = tabela_padrao(tamanho_cache=FRETE_CACHE)
+
+# Grade padrão da matriz de preços (GET /tabela/matriz)
+FRETE_MATRIZ_PESOS = os.getenv("FRETE_MATRIZ_PESOS", "0.5,1,2,5,10,20,30")
+FRETE_MATRIZ_DISTANCIAS = os.getenv("FRETE_MATRIZ_DISTANCIAS", "10,50,100,200,500,1000,2000")
+FRETE_MATRIZ_MAX_AGE = int(os.getenv("FRETE_MATRIZ_MAX_AGE", "300"))
+MAX_CELULAS_MATRIZ = 10_000
+
+# Localidades de referência para calcular a distância de origem/destino
+FRETE_LOCALIDADES = os.getenv(
+    "FRETE_LOCALIDADES", str(Path(__file__).resolve().parents[2] / "data" / "localidades_exemplo.csv")
+)
+FRETE_CACHE_DISTANCIAS = int(os.getenv("FRETE_CACHE_DISTANCIAS", "100000"))
+
+localidades = carregar_localidades(FRETE_LOCALIDADES, tamanho_cache=FRETE_CACHE_DISTANCIAS)
+logger.info("Localidades carregadas de %s: %d", FRETE_LOCALIDADES, len(localidades))
+
+def resolver_distancia(dados: FreteRequest) -> int:
+    """Distância informada ou calculada de origem/destino (CEP ou lat/lon)"""
+    if dados.distancia is not None:
+        return dados.distancia
+    origem = localidades.resolver(**dados.origem.model_dump())
+    destino = localidades.resolver(**dados.destino.model_dump())
+    return arredondar_km(localidades.distancia_km(origem, destino))
+
+# Transportadoras consultadas em paralelo por /cotar/transportadoras
+# Sem FRETE_TRANSPORTADORAS: só a fórmula local
+FRETE_TRANSPORTADORAS = os.getenv("FRETE_TRANSPORTADORAS")
+FRETE_PRAZO_TRANSPORTADORAS_MS = int(os.getenv("FRETE_PRAZO_TRANSPORTADORAS_MS", "800"))
 
-app = FastAPI(title="Calculadora de Frete")
+agregador = AgregadorCotacoes(
+    ler_transportadoras(FRETE_TRANSPORTADORAS),
+    cotar_local=tabela.cotar,
+    prazo=FRETE_PRAZO_TRANSPORTADORAS_MS / 1000,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    agregador.iniciar()
+    yield
+    await agregador.fechar()
+
+app = FastAPI(title="Calculadora de Frete", lifespan=lifespan)
+
+@app.exception_handler(RequestValidationError)
+async def erro_validacao(request: Request, exc: RequestValidationError):
+    """422 padrão; Infinity/NaN recusados voltam como texto (não existem em JSON)"""
+    erros = [
+        {**erro, "input": str(erro["input"])}
+        if isinstance(erro.get("input"), float) and not math.isfinite(erro["input"]) else erro
+        for erro in exc.errors()
+    ]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(erros)})
 
 @app.get("/")
 def health_check():
@@ -14,11 +94,134 @@ def health_check():
 @app.post("/calcular", response_model=FreteResponse)
 def calcular_frete(dados: FreteRequest):
     """
-    Calcula frete baseado em peso e distância
-    Regra: R$ 10 por kg + R$ 0,50 por km
+    Calcula frete baseado em peso, distância e região
+    Regra padrão: R$ 10 por kg + R$ 0,50 por km (ou a tabela de FRETE_TABELA)
+    Sem distancia: calculada de origem/destino (CEP ou lat/lon)
     """
-    valor_frete = (dados.peso * 10) + (dados.distancia * 0.5)
+    try:
+        distancia = resolver_distancia(dados)
+        valor_frete = tabela.cotar(dados.peso, distancia, dados.regiao)
+    except (ForaDaTabela, LocalDesconhecido) as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
-    logger.info(f"Frete calculado: peso={dados.peso}kg, distancia={dados.distancia}km, valor={valor_frete}")
+    logger.info(f"Frete calculado: peso={dados.peso}kg, distancia={distancia}km, valor={valor_frete}")
     
-    return FreteResponse(valor_frete=round(valor_frete, 2))
+    return FreteResponse(valor_frete=valor_frete, distancia=distancia)
+
+def ler_grade(valor: str, nome: str) -> tuple:
+    """"0.5,1,2" -> (0.5, 1.0, 2.0)"""
+    try:
+        grade = tuple(float(v) for v in valor.split(",") if v.strip())
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"{nome}: use números separados por vírgula")
+    if not grade or not all(math.isfinite(v) and v >= 0 for v in grade):
+        raise HTTPException(status_code=422, detail=f"{nome}: informe ao menos um valor, todos finitos e não negativos")
+    return grade
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match tem o ETag atual (ou "*")?"""
+    if not if_none_match:
+        return False
+    candidatos = {c.strip().removeprefix("W/") for c in if_none_match.split(",")}
+    return "*" in candidatos or etag in candidatos
+
+@app.post("/calcular/lote", response_model=FreteLoteResponse)
+def calcular_frete_lote(dados: FreteLoteRequest):
+    """
+    Calcula o frete de vários pares peso/distância de uma vez (NumPy)
+    Valores na mesma ordem dos itens; um único log por lote
+    """
+    inicio = time.perf_counter()
+    try:
+        distancias = np.array([item.distancia or 0 for item in dados.itens])
+        # Itens sem distancia: uma conta vetorizada para todos os pares origem/destino
+        sem_distancia = [k for k, item in enumerate(dados.itens) if item.distancia is None]
+        if sem_distancia:
+            itens = [dados.itens[k] for k in sem_distancia]
+            origens = [localidades.resolver(**item.origem.model_dump()) for item in itens]
+            destinos = [localidades.resolver(**item.destino.model_dump()) for item in itens]
+            distancias[sem_distancia] = np.floor(localidades.distancias_km(origens, destinos) + 0.5)
+        valores = tabela.cotar_lote(
+            [item.peso for item in dados.itens],
+            distancias,
+            [item.regiao for item in dados.itens],
+        )
+    except (ForaDaTabela, LocalDesconhecido) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    total = round(float(valores.sum()), 2)
+    
+    logger.info(
+        "Lote de frete calculado: quantidade=%d, total=%.2f, menor=%.2f, maior=%.2f, duracao_ms=%.2f",
+        len(valores), total, valores.min(), valores.max(), (time.perf_counter() - inicio) * 1000,
+    )
+    
+    return FreteLoteResponse(
+        valores_frete=valores.tolist(), distancias=distancias.tolist(), quantidade=len(valores), total=total
+    )
+
+@app.get("/tabela")
+def info_tabela():
+    """Tamanho da tabela de faixas, sobretaxas por região e uso do cache"""
+    return tabela.info()
+
+@app.get("/tabela/matriz")
+def matriz_precos(
+    pesos: str = Query(FRETE_MATRIZ_PESOS, description="kg, separados por vírgula"),
+    distancias: str = Query(FRETE_MATRIZ_DISTANCIAS, description="km, separados por vírgula"),
+    regiao: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Preços de uma grade peso × distância numa resposta só (valores[i][j] =
+    pesos[i] × distancias[j]). Gerada uma vez por versão da tabela; com
+    If-None-Match igual ao ETag a resposta é 304, sem corpo
+    """
+    grade_pesos = ler_grade(pesos, "pesos")
+    grade_distancias = ler_grade(distancias, "distancias")
+    if len(grade_pesos) * len(grade_distancias) > MAX_CELULAS_MATRIZ:
+        raise HTTPException(status_code=422, detail=f"Matriz acima de {MAX_CELULAS_MATRIZ} células")
+    try:
+        matriz = tabela.matriz(grade_pesos, grade_distancias, regiao)
+    except ForaDaTabela as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    cabecalhos = {"ETag": matriz.etag, "Cache-Control": f"public, max-age={FRETE_MATRIZ_MAX_AGE}"}
+    if etag_confere(if_none_match, matriz.etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(matriz.corpo, media_type="application/json", headers=cabecalhos)
+
+
+@app.get("/localidades")
+def info_localidades():
+    """Localidades de referência, índice em grade e uso do cache de distâncias"""
+    return localidades.info()
+
+@app.post("/cotar/transportadoras", response_model=CotacaoAgregadaResponse)
+async def cotar_transportadoras(dados: FreteRequest):
+    """
+    Pergunta a todas as transportadoras ao mesmo tempo e devolve a mais
+    barata que respondeu no prazo; nenhuma a tempo: fórmula local
+    """
+    try:
+        distancia = resolver_distancia(dados)
+        resultado = await agregador.cotar(dados.peso, distancia, dados.regiao)
+    except (ForaDaTabela, LocalDesconhecido) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    logger.info(
+        f"Cotação agregada: transportadora={resultado.transportadora}, valor={resultado.valor_frete}, "
+        f"fallback={resultado.fallback}"
+    )
+    
+    return CotacaoAgregadaResponse(
+        transportadora=resultado.transportadora,
+        valor_frete=resultado.valor_frete,
+        distancia=distancia,
+        fallback=resultado.fallback,
+        cotacoes=[CotacaoTransportadora(**asdict(c)) for c in resultado.cotacoes],
+    )
+
+@app.get("/transportadoras")
+def info_transportadoras():
+    """Prazo, cotações, fallbacks e contadores de cada transportadora"""
+    return agregador.info()
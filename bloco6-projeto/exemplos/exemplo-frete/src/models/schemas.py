@@ -1,8 +1,33 @@
-from pydantic import BaseModel
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+MAX_ITENS_LOTE = 10_000
+
+class Local(BaseModel):
+    """Prefixo de CEP ou coordenadas (o servidor acha a localidade mais próxima)"""
+    cep: Optional[str] = None
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lon: Optional[float] = Field(None, ge=-180, le=180)
+    
+    @model_validator(mode="after")
+    def cep_ou_coordenadas(self):
+        if not self.cep and (self.lat is None or self.lon is None):
+            raise ValueError("Informe cep ou lat e lon")
+        return self
 
 class FreteRequest(BaseModel):
-    peso: float  # em kg
-    distancia: int  # em km
+    peso: float = Field(..., ge=0, allow_inf_nan=False)  # em kg
+    distancia: Optional[int] = Field(None, ge=0)  # em km; sem distância: calculada de origem/destino
+    regiao: Optional[str] = None  # sem região: sem sobretaxa
+    origem: Optional[Local] = None
+    destino: Optional[Local] = None
+    
+    @model_validator(mode="after")
+    def distancia_ou_origem_destino(self):
+        if self.distancia is None and (self.origem is None or self.destino is None):
+            raise ValueError("Informe distancia ou origem e destino")
+        return self
     
     class Config:
         schema_extra = {
@@ -14,10 +39,70 @@ class FreteRequest(BaseModel):
 
 class FreteResponse(BaseModel):
     valor_frete: float
+    distancia: int  # a informada ou a calculada no servidor
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "valor_frete": 100.0,
+                "distancia": 100
+            }
+        }
+
+class FreteLoteRequest(BaseModel):
+    itens: List[FreteRequest] = Field(..., min_length=1, max_length=MAX_ITENS_LOTE)
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "itens": [
+                    {"peso": 5.0, "distancia": 100},
+                    {"peso": 10.0, "distancia": 50}
+                ]
+            }
+        }
+
+class FreteLoteResponse(BaseModel):
+    valores_frete: List[float]  # mesma ordem dos itens
+    distancias: List[int]
+    quantidade: int
+    total: float
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "valores_frete": [100.0, 125.0],
+                "distancias": [100, 50],
+                "quantidade": 2,
+                "total": 225.0
+            }
+        }
+
+class CotacaoTransportadora(BaseModel):
+    transportadora: str
+    status: str  # ok | timeout | erro
+    valor_frete: Optional[float] = None
+    latencia_ms: Optional[float] = None
+    erro: Optional[str] = None
+
+class CotacaoAgregadaResponse(BaseModel):
+    transportadora: str  # a mais barata no prazo, ou "local"
+    valor_frete: float
+    distancia: int
+    fallback: bool  # True: nenhuma respondeu a tempo, valeu a fórmula local
+    cotacoes: List[CotacaoTransportadora]
     
     class Config:
         schema_extra = {
             "example": {
-                "valor_frete": 100.0
+                "transportadora": "barata",
+                "valor_frete": 90.0,
+                "distancia": 100,
+                "fallback": False,
+                "cotacoes": [
+                    {"transportadora": "rapida", "status": "ok", "valor_frete": 110.0, "latencia_ms": 21.4},
+                    {"transportadora": "barata", "status": "ok", "valor_frete": 90.0, "latencia_ms": 203.7},
+                    {"transportadora": "lenta", "status": "timeout"}
+                ]
             }
         }
@@ -0,0 +1,202 @@
+"""
+Cálculo do frete por tabela de faixas (peso × distância) + sobretaxa regional
+
+Cada célula da tabela é uma faixa "até X kg" × "até Y km" com
+    frete = base + peso × por_kg + distância × por_km
+e o resultado é multiplicado por (1 + sobretaxa da região).
+
+Sem tabela configurada vale a regra padrão: uma faixa única com
+base 0, R$ 10 por kg e R$ 0,50 por km, sem sobretaxa.
+
+Os limites das faixas ficam em listas/arrays ordenados: a faixa é achada
+por busca binária (bisect / np.searchsorted), então o tempo de cada
+cotação quase não muda com dezenas de milhares de faixas.
+
+A matriz de preços (vários pesos × várias distâncias de uma vez) sai de
+uma única chamada de cotar_lote, já serializada em JSON compacto com um
+ETag forte (hash do corpo); fica em cache enquanto a tabela for a mesma.
+
+O valor é calculado em centavos e arredondado "meio centavo para cima"
+(R$ 12,345 -> R$ 12,35). O round() do Python arredonda para o par e
+ainda sofre com a representação binária (round(2.675, 2) == 2.67).
+"""
+
+import csv
+import hashlib
+import json
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+PRECO_POR_KG = 10.0
+PRECO_POR_KM = 0.5
+REGIAO_PADRAO = "padrao"
+INFINITO = float("inf")
+
+
+def arredondar_centavos(centavos: np.ndarray) -> np.ndarray:
+    """Centavos fracionários -> inteiros, meio centavo para cima"""
+    # round(.., 6) remove o ruído binário (1234.4999999999998 -> 1234.5)
+    return np.floor(np.round(centavos, 6) + 0.5).astype(np.int64)
+
+
+class ForaDaTabela(ValueError):
+    """Peso/distância além da última faixa ou região desconhecida"""
+
+
+@dataclass(frozen=True)
+class MatrizPrecos:
+    corpo: bytes  # JSON compacto, pronto para a resposta
+    etag: str  # forte: hash do corpo
+
+
+class TabelaFrete:
+    """Grade de faixas peso × distância em arrays ordenados + cache LRU das cotações"""
+
+    def __init__(
+        self,
+        limites_peso: Sequence[float],
+        limites_distancia: Sequence[float],
+        base: np.ndarray,
+        por_kg: np.ndarray,
+        por_km: np.ndarray,
+        sobretaxas: Optional[Dict[str, float]] = None,
+        tamanho_cache: int = 10_000,
+    ):
+        self.limites_peso = np.asarray(limites_peso, dtype=np.float64)
+        self.limites_distancia = np.asarray(limites_distancia, dtype=np.float64)
+        formato = (len(self.limites_peso), len(self.limites_distancia))
+        self.base = np.asarray(base, dtype=np.float64).reshape(formato)
+        self.por_kg = np.asarray(por_kg, dtype=np.float64).reshape(formato)
+        self.por_km = np.asarray(por_km, dtype=np.float64).reshape(formato)
+        if np.any(np.diff(self.limites_peso) <= 0) or np.any(np.diff(self.limites_distancia) <= 0):
+            raise ValueError("Limites das faixas devem ser crescentes e sem repetição")
+        if min(self.base.min(), self.por_kg.min(), self.por_km.min()) < 0:
+            raise ValueError("Preços da tabela não podem ser negativos")
+
+        self.sobretaxas = {REGIAO_PADRAO: 0.0, **(sobretaxas or {})}
+        # Listas Python para o bisect do caminho individual (mais rápido que numpy para 1 item)
+        self._peso = self.limites_peso.tolist()
+        self._distancia = self.limites_distancia.tolist()
+        self._celulas = list(zip(self.base.ravel().tolist(), self.por_kg.ravel().tolist(), self.por_km.ravel().tolist()))
+        # ✅ Cotações repetidas (mesmo peso, distância e região) saem do cache
+        self.cotar = lru_cache(maxsize=tamanho_cache)(self._cotar)
+        self.matriz = lru_cache(maxsize=64)(self._matriz)
+
+        # Versão = hash do conteúdo: mesma tabela, mesma versão (e mesmos ETags)
+        conteudo = hashlib.sha256()
+        for valores in (self.limites_peso, self.limites_distancia, self.base, self.por_kg, self.por_km):
+            conteudo.update(valores.tobytes())
+        conteudo.update(json.dumps(self.sobretaxas, sort_keys=True).encode())
+        self.versao = conteudo.hexdigest()[:16]
+
+    @property
+    def faixas(self) -> int:
+        return self.base.size
+
+    def _sobretaxa(self, regiao: Optional[str]) -> float:
+        try:
+            return self.sobretaxas[regiao or REGIAO_PADRAO]
+        except KeyError:
+            raise ForaDaTabela(f"Região desconhecida: {regiao}") from None
+
+    def _cotar(self, peso: float, distancia: float, regiao: Optional[str] = None) -> float:
+        """Valor do frete (R$) de uma cotação"""
+        if not (0 <= peso < INFINITO and 0 <= distancia < INFINITO):  # também recusa NaN
+            raise ForaDaTabela(f"Peso e distância devem ser finitos e não negativos: peso={peso}, distancia={distancia}")
+        i = bisect_left(self._peso, peso)  # primeira faixa com limite >= peso
+        j = bisect_left(self._distancia, distancia)
+        if i == len(self._peso) or j == len(self._distancia):
+            raise ForaDaTabela(f"Fora da tabela: peso={peso}kg, distancia={distancia}km")
+        base, por_kg, por_km = self._celulas[i * len(self._distancia) + j]
+        centavos = (base + peso * por_kg + distancia * por_km) * (1 + self._sobretaxa(regiao)) * 100
+        return float(arredondar_centavos(np.float64(centavos))) / 100
+
+    def cotar_lote(self, pesos, distancias, regioes: Optional[Sequence[Optional[str]]] = None) -> np.ndarray:
+        """Valores (R$) de todos os itens, na mesma ordem, numa passada vetorizada"""
+        pesos = np.asarray(pesos, dtype=np.float64)
+        distancias = np.asarray(distancias, dtype=np.float64)
+        invalidos = ~(np.isfinite(pesos) & np.isfinite(distancias) & (pesos >= 0) & (distancias >= 0))
+        if invalidos.any():
+            k = int(np.argmax(invalidos))
+            raise ForaDaTabela(f"Item {k}: peso e distância devem ser finitos e não negativos")
+        i = np.searchsorted(self.limites_peso, pesos, side="left")
+        j = np.searchsorted(self.limites_distancia, distancias, side="left")
+        fora = (i == len(self.limites_peso)) | (j == len(self.limites_distancia))
+        if fora.any():
+            k = int(np.argmax(fora))
+            raise ForaDaTabela(f"Item {k} fora da tabela: peso={pesos[k]}kg, distancia={distancias[k]}km")
+
+        centavos = (self.base[i, j] + pesos * self.por_kg[i, j] + distancias * self.por_km[i, j]) * 100
+        if regioes is not None and any(regioes):
+            centavos *= 1 + np.array([self._sobretaxa(regiao) for regiao in regioes])
+        return arredondar_centavos(centavos) / 100
+
+    def _matriz(self, pesos: Tuple[float, ...], distancias: Tuple[float, ...], regiao: Optional[str] = None) -> MatrizPrecos:
+        """Preços de todos os pesos × distâncias (linha = peso), gerados uma vez por tabela"""
+        grade_pesos, grade_distancias = np.meshgrid(pesos, distancias, indexing="ij")
+        regioes = [regiao] * grade_pesos.size if regiao else None
+        valores = self.cotar_lote(grade_pesos.ravel(), grade_distancias.ravel(), regioes).reshape(grade_pesos.shape)
+        corpo = json.dumps(
+            {
+                "versao": self.versao,
+                "regiao": regiao,
+                "pesos": list(pesos),
+                "distancias": list(distancias),
+                "valores": valores.tolist(),
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        return MatrizPrecos(corpo, f'"{hashlib.sha256(corpo).hexdigest()[:32]}"')
+
+    def info(self) -> Dict[str, object]:
+        cache = self.cotar.cache_info()
+        return {
+            "versao": self.versao,
+            "faixas": self.faixas,
+            "faixas_peso": len(self._peso),
+            "faixas_distancia": len(self._distancia),
+            "regioes": self.sobretaxas,
+            "cache": {"hits": cache.hits, "misses": cache.misses, "tamanho": cache.currsize, "maximo": cache.maxsize},
+        }
+
+
+def tabela_padrao(tamanho_cache: int = 10_000) -> TabelaFrete:
+    """Regra original: R$ 10 por kg + R$ 0,50 por km, faixa única"""
+    return TabelaFrete([INFINITO], [INFINITO], [0.0], [PRECO_POR_KG], [PRECO_POR_KM], tamanho_cache=tamanho_cache)
+
+
+def carregar_tabela(caminho_faixas: str, caminho_regioes: Optional[str] = None, tamanho_cache: int = 10_000) -> TabelaFrete:
+    """
+    CSV de faixas: peso_ate,distancia_ate,base,por_kg,por_km (uma linha por
+    combinação de faixa de peso × faixa de distância; use "inf" na última)
+    CSV de regiões: regiao,sobretaxa (0.15 = +15%)
+    """
+    with open(caminho_faixas, newline="", encoding="utf-8") as arquivo:
+        linhas = [
+            (float(l["peso_ate"]), float(l["distancia_ate"]), float(l["base"]), float(l["por_kg"]), float(l["por_km"]))
+            for l in csv.DictReader(arquivo)
+        ]
+    limites_peso = sorted({linha[0] for linha in linhas})
+    limites_distancia = sorted({linha[1] for linha in linhas})
+    celulas = {(linha[0], linha[1]): linha[2:] for linha in linhas}
+    if len(celulas) != len(linhas) or len(celulas) != len(limites_peso) * len(limites_distancia):
+        raise ValueError(
+            f"{caminho_faixas}: a tabela deve ter exatamente uma linha para cada "
+            f"faixa de peso × faixa de distância ({len(limites_peso)} × {len(limites_distancia)})"
+        )
+    valores = np.array([celulas[(p, d)] for p in limites_peso for d in limites_distancia])
+
+    sobretaxas = {}
+    if caminho_regioes:
+        with open(caminho_regioes, newline="", encoding="utf-8") as arquivo:
+            sobretaxas = {l["regiao"]: float(l["sobretaxa"]) for l in csv.DictReader(arquivo)}
+
+    return TabelaFrete(
+        limites_peso, limites_distancia,
+        valores[:, 0], valores[:, 1], valores[:, 2],
+        sobretaxas=sobretaxas, tamanho_cache=tamanho_cache,
+    )
@@ -0,0 +1,191 @@
+"""
+Distância calculada no servidor a partir de CEP ou coordenadas
+
+Em vez de cada cliente calcular `distancia`, ele pode mandar origem e
+destino como prefixo de CEP ou lat/lon. Os dois são levados à localidade
+de referência mais próxima (arquivo carregado na inicialização) e a
+distância é o haversine entre as duas localidades.
+
+- CEP: maior prefixo cadastrado ("01310-100" -> "01310", "0131", ... "01")
+- Coordenadas: vizinho mais próximo num índice em grade (células de
+  lat/lon); só as células ao redor do ponto são examinadas, então a busca
+  continua bem abaixo de 1 ms com centenas de milhares de localidades.
+  Ponto longe de tudo (fora da área da base ou numa região vazia): em vez
+  de abrir anéis sem fim, um único produto vetorizado contra todas as
+  localidades (vetores unitários 3D: mais próxima = maior produto escalar)
+- Haversine vetorizado (NumPy) para os candidatos e para os lotes
+- Pares de localidades frequentes ficam num cache LRU
+"""
+
+import csv
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RAIO_TERRA_KM = 6371.0088
+KM_POR_GRAU = math.pi * RAIO_TERRA_KM / 180
+MAX_ANEIS = 4  # além disso, busca em todas as localidades de uma vez
+
+
+class LocalDesconhecido(ValueError):
+    """CEP sem prefixo cadastrado ou local sem CEP e sem coordenadas"""
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distância em km pela superfície da Terra (aceita arrays)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def vetores_unitarios(lats, lons) -> np.ndarray:
+    """lat/lon -> pontos (x, y, z) na esfera unitária"""
+    lat, lon = np.radians(lats), np.radians(lons)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def arredondar_km(km) -> int:
+    """Distância inteira em km, meio km para cima (como `distancia` do FreteRequest)"""
+    return int(math.floor(km + 0.5))
+
+
+class IndiceLocalidades:
+    """Localidades de referência: prefixos de CEP + grade para vizinho mais próximo"""
+
+    def __init__(
+        self,
+        nomes: Sequence[str],
+        lats: Sequence[float],
+        lons: Sequence[float],
+        prefixos: Optional[Sequence[str]] = None,
+        tamanho_celula: Optional[float] = None,
+        tamanho_cache: int = 100_000,
+    ):
+        self.nomes = list(nomes)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        if not len(self.lats) or len(self.lats) != len(self.lons) or len(self.lats) != len(self.nomes):
+            raise ValueError("Informe ao menos uma localidade, com nome, lat e lon")
+
+        self.prefixos: Dict[str, int] = {}
+        for indice, prefixo in enumerate(prefixos or []):
+            digitos = "".join(c for c in (prefixo or "") if c.isdigit())
+            if digitos:
+                self.prefixos[digitos] = indice
+        self._maior_prefixo = max(map(len, self.prefixos), default=0)
+
+        # Célula com ~4 localidades em média (se não for informada)
+        if tamanho_celula is None:
+            area = max(np.ptp(self.lats), 0.01) * max(np.ptp(self.lons), 0.01)
+            tamanho_celula = max(math.sqrt(area * 4 / len(self.lats)), 0.001)
+        self.tamanho_celula = tamanho_celula
+        celula_lat = np.floor(self.lats / tamanho_celula).astype(np.int64)
+        celula_lon = np.floor(self.lons / tamanho_celula).astype(np.int64)
+        ordem = np.lexsort((celula_lon, celula_lat))
+        self._ordem = ordem
+        self._lats_ordenadas = self.lats[ordem]
+        self._lons_ordenadas = self.lons[ordem]
+        self._celulas: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        chaves = list(zip(celula_lat[ordem].tolist(), celula_lon[ordem].tolist()))
+        inicio = 0
+        for posicao in range(1, len(chaves) + 1):
+            if posicao == len(chaves) or chaves[posicao] != chaves[inicio]:
+                self._celulas[chaves[inicio]] = (inicio, posicao)
+                inicio = posicao
+        self._vetores = vetores_unitarios(self.lats, self.lons)
+        # Menor largura de célula em km (a longitude encolhe com a latitude)
+        maior_lat = min(float(np.abs(self.lats).max()) + tamanho_celula, 89.9)
+        self._celula_km = tamanho_celula * KM_POR_GRAU * math.cos(math.radians(maior_lat))
+
+        self._distancia_cache = lru_cache(maxsize=tamanho_cache)(self._distancia)
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def por_cep(self, cep: str) -> int:
+        """Localidade do maior prefixo cadastrado do CEP"""
+        digitos = "".join(c for c in cep if c.isdigit())
+        for tamanho in range(min(len(digitos), self._maior_prefixo), 0, -1):
+            indice = self.prefixos.get(digitos[:tamanho])
+            if indice is not None:
+                return indice
+        raise LocalDesconhecido(f"CEP sem localidade cadastrada: {cep}")
+
+    def _anel(self, i: int, j: int, k: int) -> List[Tuple[int, int]]:
+        """Fatias das células a exatamente k células de distância de (i, j)"""
+        if k == 0:
+            fatia = self._celulas.get((i, j))
+            return [fatia] if fatia else []
+        fatias = []
+        for di in range(-k, k + 1):
+            passo = 1 if abs(di) == k else 2 * k  # linhas do meio: só as bordas
+            for dj in range(-k, k + 1, passo):
+                fatia = self._celulas.get((i + di, j + dj))
+                if fatia:
+                    fatias.append(fatia)
+        return fatias
+
+    def mais_proxima(self, lat: float, lon: float) -> int:
+        """Índice da localidade mais próxima (busca exata em anéis de células)"""
+        i = math.floor(lat / self.tamanho_celula)
+        j = math.floor(lon / self.tamanho_celula)
+        melhor, melhor_km = -1, math.inf
+        for k in range(MAX_ANEIS + 1):
+            fatias = self._anel(i, j, k)
+            if fatias:
+                posicoes = np.concatenate([np.arange(a, b) for a, b in fatias])
+                distancias = haversine_km(lat, lon, self._lats_ordenadas[posicoes], self._lons_ordenadas[posicoes])
+                menor = int(np.argmin(distancias))
+                if distancias[menor] < melhor_km:
+                    melhor, melhor_km = int(self._ordem[posicoes[menor]]), float(distancias[menor])
+            # Células do anel k+1 estão a pelo menos k larguras de célula
+            if melhor >= 0 and melhor_km <= k * self._celula_km:
+                return melhor
+        # ⚠️ Nada garantido por perto: o custo por anel cresceria sem limite
+        return int(np.argmax(self._vetores @ vetores_unitarios(lat, lon)))
+
+    def resolver(self, cep: Optional[str] = None, lat: Optional[float] = None, lon: Optional[float] = None) -> int:
+        """Índice da localidade de um CEP ou de um par lat/lon"""
+        if cep:
+            return self.por_cep(cep)
+        if lat is not None and lon is not None:
+            return self.mais_proxima(lat, lon)
+        raise LocalDesconhecido("Informe cep ou lat/lon")
+
+    def _distancia(self, i: int, j: int) -> float:
+        return float(haversine_km(self.lats[i], self.lons[i], self.lats[j], self.lons[j]))
+
+    def distancia_km(self, i: int, j: int) -> float:
+        """Distância entre duas localidades (pares repetidos vêm do cache)"""
+        return self._distancia_cache(min(i, j), max(i, j))
+
+    def distancias_km(self, origens: Sequence[int], destinos: Sequence[int]) -> np.ndarray:
+        """Distâncias de vários pares numa única conta vetorizada"""
+        origens = np.asarray(origens, dtype=np.int64)
+        destinos = np.asarray(destinos, dtype=np.int64)
+        return haversine_km(self.lats[origens], self.lons[origens], self.lats[destinos], self.lons[destinos])
+
+    def info(self) -> Dict[str, object]:
+        cache = self._distancia_cache.cache_info()
+        return {
+            "localidades": len(self),
+            "prefixos_cep": len(self.prefixos),
+            "celulas": len(self._celulas),
+            "tamanho_celula_graus": round(self.tamanho_celula, 4),
+            "cache_pares": {"hits": cache.hits, "misses": cache.misses, "tamanho": cache.currsize},
+        }
+
+
+def carregar_localidades(caminho: str, tamanho_cache: int = 100_000) -> IndiceLocalidades:
+    """CSV: nome,cep_prefixo,lat,lon (cep_prefixo pode ficar vazio)"""
+    with open(caminho, newline="", encoding="utf-8") as arquivo:
+        linhas = list(csv.DictReader(arquivo))
+    return IndiceLocalidades(
+        [linha["nome"] for linha in linhas],
+        [float(linha["lat"]) for linha in linhas],
+        [float(linha["lon"]) for linha in linhas],
+        prefixos=[linha.get("cep_prefixo", "") for linha in linhas],
+        tamanho_cache=tamanho_cache,
+    )
@@ -0,0 +1,50 @@
+"""
+Transportadoras de mentira para testes e desenvolvimento
+
+Um único servidor com uma rota por transportadora, cada uma com o seu
+preço (fator sobre R$ 10/kg + R$ 0,50/km) e o seu atraso:
+
+    uvicorn src.services.stub_transportadoras:app --port 9001
+
+    FRETE_TRANSPORTADORAS="rapida=http://127.0.0.1:9001/rapida,\
+barata=http://127.0.0.1:9001/barata,lenta=http://127.0.0.1:9001/lenta"
+"""
+
+import asyncio
+from typing import Dict, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+# nome -> (fator de preço, atraso em segundos)
+PADRAO = {
+    "rapida": (1.10, 0.02),
+    "barata": (0.90, 0.20),
+    "lenta": (0.70, 2.00),
+}
+
+
+class CotacaoStub(BaseModel):
+    peso: float
+    distancia: float
+    regiao: Optional[str] = None
+
+
+def criar_stub(transportadoras: Dict[str, Tuple[float, float]] = PADRAO) -> FastAPI:
+    """POST /{nome}/cotacao para cada transportadora; fator <= 0 devolve 500"""
+    stub = FastAPI(title="Transportadoras (stub)")
+
+    @stub.post("/{nome}/cotacao")
+    async def cotacao(nome: str, dados: CotacaoStub):
+        if nome not in transportadoras:
+            raise HTTPException(status_code=404, detail=f"Transportadora desconhecida: {nome}")
+        fator, atraso = transportadoras[nome]
+        await asyncio.sleep(atraso)
+        if fator <= 0:
+            raise HTTPException(status_code=500, detail="Falha simulada")
+        return {"valor_frete": round((dados.peso * 10 + dados.distancia * 0.5) * fator, 2)}
+
+    return stub
+
+
+app = criar_stub()
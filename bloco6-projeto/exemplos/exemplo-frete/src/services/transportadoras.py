@@ -0,0 +1,195 @@
+"""
+Cotação em várias transportadoras ao mesmo tempo, com prazo
+
+Para cada envio o agregador pergunta a N transportadoras em paralelo e
+devolve a mais barata entre as que responderam dentro do prazo:
+
+- Um único httpx.AsyncClient (pool de conexões keep-alive) para todas
+- Prazo global por cotação: quem não respondeu até lá é cancelado e
+  conta como timeout (uma transportadora lenta não atrasa a resposta)
+- Nenhuma respondeu a tempo (ou todas falharam): vale a fórmula local
+- Contadores por transportadora: respostas, timeouts, erros, latência
+
+Contrato das transportadoras:
+    POST {url}/cotacao  {"peso": 5.0, "distancia": 100, "regiao": null}
+    -> {"valor_frete": 98.5}
+
+FRETE_TRANSPORTADORAS="rapida=http://127.0.0.1:9001/rapida,barata=http://..."
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+ORIGEM_LOCAL = "local"
+
+
+@dataclass(frozen=True)
+class Transportadora:
+    nome: str
+    url: str  # base; a cotação é POST {url}/cotacao
+
+
+def ler_transportadoras(valor: Optional[str]) -> List[Transportadora]:
+    """"nome=url,nome=url" -> lista (vazio: nenhuma transportadora)"""
+    transportadoras = []
+    for item in (valor or "").split(","):
+        if not item.strip():
+            continue
+        nome, separador, url = item.partition("=")
+        if not separador or not nome.strip() or not url.strip():
+            raise ValueError(f"Transportadora inválida (use nome=url): {item!r}")
+        transportadoras.append(Transportadora(nome.strip(), url.strip().rstrip("/")))
+    if len({t.nome for t in transportadoras}) != len(transportadoras):
+        raise ValueError("Nomes de transportadoras repetidos")
+    return transportadoras
+
+
+@dataclass
+class EstatisticasTransportadora:
+    consultas: int = 0
+    respostas: int = 0
+    timeouts: int = 0
+    erros: int = 0
+    melhor_oferta: int = 0
+    latencia_total_ms: float = 0.0
+    latencia_max_ms: float = 0.0
+
+    def registrar_resposta(self, latencia_ms: float) -> None:
+        self.respostas += 1
+        self.latencia_total_ms += latencia_ms
+        self.latencia_max_ms = max(self.latencia_max_ms, latencia_ms)
+
+    def como_dict(self) -> Dict[str, object]:
+        return {
+            "consultas": self.consultas,
+            "respostas": self.respostas,
+            "timeouts": self.timeouts,
+            "erros": self.erros,
+            "melhor_oferta": self.melhor_oferta,
+            "latencia_media_ms": round(self.latencia_total_ms / self.respostas, 2) if self.respostas else None,
+            "latencia_max_ms": round(self.latencia_max_ms, 2),
+        }
+
+
+@dataclass
+class Cotacao:
+    transportadora: str
+    status: str  # ok | timeout | erro
+    valor_frete: Optional[float] = None
+    latencia_ms: Optional[float] = None
+    erro: Optional[str] = None
+
+
+@dataclass
+class ResultadoAgregado:
+    transportadora: str  # a escolhida (ou "local")
+    valor_frete: float
+    fallback: bool
+    cotacoes: List[Cotacao] = field(default_factory=list)
+
+
+class AgregadorCotacoes:
+    """Fan-out para as transportadoras num cliente HTTP compartilhado"""
+
+    def __init__(
+        self,
+        transportadoras: List[Transportadora],
+        cotar_local: Callable[[float, float, Optional[str]], float],
+        prazo: float = 0.8,
+        cliente: Optional[httpx.AsyncClient] = None,
+        max_conexoes: int = 100,
+    ):
+        self.transportadoras = list(transportadoras)
+        self.cotar_local = cotar_local
+        self.prazo = prazo
+        self.max_conexoes = max_conexoes
+        self._cliente = cliente
+        self.cotacoes = 0
+        self.fallbacks = 0
+        self.estatisticas = {t.nome: EstatisticasTransportadora() for t in self.transportadoras}
+
+    def iniciar(self) -> None:
+        """Cria o cliente compartilhado (no lifespan; cotar() também cria se faltar)"""
+        if self._cliente is None:
+            self._cliente = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.prazo),
+                limits=httpx.Limits(max_connections=self.max_conexoes, max_keepalive_connections=self.max_conexoes),
+            )
+
+    async def fechar(self) -> None:
+        if self._cliente is not None:
+            await self._cliente.aclose()
+            self._cliente = None
+
+    async def _consultar(self, transportadora: Transportadora, payload: Dict[str, object]) -> Cotacao:
+        estatisticas = self.estatisticas[transportadora.nome]
+        estatisticas.consultas += 1
+        inicio = time.perf_counter()
+        try:
+            resposta = await self._cliente.post(f"{transportadora.url}/cotacao", json=payload)
+            resposta.raise_for_status()
+            valor = float(resposta.json()["valor_frete"])
+            if not valor >= 0:
+                raise ValueError(f"valor_frete inválido: {valor}")
+        except asyncio.CancelledError:
+            estatisticas.timeouts += 1
+            raise
+        except httpx.TimeoutException:
+            estatisticas.timeouts += 1
+            return Cotacao(transportadora.nome, "timeout")
+        except Exception as e:
+            estatisticas.erros += 1
+            logger.warning("Transportadora %s falhou: %s: %s", transportadora.nome, type(e).__name__, e)
+            return Cotacao(transportadora.nome, "erro", erro=f"{type(e).__name__}: {e}")
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        estatisticas.registrar_resposta(latencia_ms)
+        return Cotacao(transportadora.nome, "ok", valor, round(latencia_ms, 2))
+
+    async def cotar(self, peso: float, distancia: float, regiao: Optional[str] = None) -> ResultadoAgregado:
+        """Melhor cotação entre as que chegaram no prazo; senão, a fórmula local"""
+        self.iniciar()
+        self.cotacoes += 1
+        payload = {"peso": peso, "distancia": distancia, "regiao": regiao}
+        tarefas = {
+            asyncio.create_task(self._consultar(t, payload)): t.nome for t in self.transportadoras
+        }
+        cotacoes: List[Cotacao] = []
+        if tarefas:
+            prontas, pendentes = await asyncio.wait(tarefas, timeout=self.prazo)
+            # ✅ Quem passou do prazo é cancelado (conta como timeout em _consultar)
+            for tarefa in pendentes:
+                tarefa.cancel()
+            if pendentes:
+                await asyncio.gather(*pendentes, return_exceptions=True)
+            cotacoes = [
+                tarefa.result() if tarefa in prontas else Cotacao(nome, "timeout")
+                for tarefa, nome in tarefas.items()
+            ]
+
+        validas = [c for c in cotacoes if c.status == "ok"]
+        if validas:
+            melhor = min(validas, key=lambda c: c.valor_frete)
+            self.estatisticas[melhor.transportadora].melhor_oferta += 1
+            return ResultadoAgregado(melhor.transportadora, melhor.valor_frete, False, cotacoes)
+
+        self.fallbacks += 1
+        if self.transportadoras:
+            logger.warning("Nenhuma transportadora respondeu em %.0f ms: usando a fórmula local", self.prazo * 1000)
+        return ResultadoAgregado(ORIGEM_LOCAL, self.cotar_local(peso, distancia, regiao), True, cotacoes)
+
+    def info(self) -> Dict[str, object]:
+        return {
+            "prazo_ms": round(self.prazo * 1000),
+            "cotacoes": self.cotacoes,
+            "fallbacks": self.fallbacks,
+            "transportadoras": {
+                t.nome: {"url": t.url, **self.estatisticas[t.nome].como_dict()} for t in self.transportadoras
+            },
+        }
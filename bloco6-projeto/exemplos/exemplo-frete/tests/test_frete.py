@@ -27,3 +27,42 @@ def test_calculo_frete_distancia_longa():
     assert response.status_code == 200
     # 2kg * 10 = 20 + 500km * 0.5 = 250 → Total: 270
     assert response.json()["valor_frete"] == 270.0
+
+def test_calculo_frete_arredonda_meio_centavo_para_cima():
+    payload = {"peso": 1.2345, "distancia": 0}
+    response = client.post("/calcular", json=payload)
+    # 1.2345kg * 10 = 12.345 → 12.35 (round() daria 12.34)
+    assert response.json()["valor_frete"] == 12.35
+
+def test_lote_mantem_a_ordem():
+    payload = {"itens": [
+        {"peso": 5.0, "distancia": 100},
+        {"peso": 10.0, "distancia": 50},
+        {"peso": 2.0, "distancia": 500},
+        {"peso": 0.2675, "distancia": 0},
+    ]}
+    response = client.post("/calcular/lote", json=payload)
+    assert response.status_code == 200
+    dados = response.json()
+    # 0.2675kg * 10 = 2.675 → 2.68
+    assert dados["valores_frete"] == [100.0, 125.0, 270.0, 2.68]
+    assert dados["quantidade"] == 4
+    assert dados["total"] == 497.68
+
+def test_lote_igual_ao_calculo_individual():
+    itens = [{"peso": p / 7, "distancia": d} for p, d in zip(range(1, 60), range(0, 600, 10))]
+    lote = client.post("/calcular/lote", json={"itens": itens}).json()["valores_frete"]
+    individuais = [client.post("/calcular", json=item).json()["valor_frete"] for item in itens]
+    assert lote == individuais
+
+def test_lote_vazio_invalido():
+    response = client.post("/calcular/lote", json={"itens": []})
+    assert response.status_code == 422
+
+def test_lote_um_log_por_lote(caplog):
+    itens = [{"peso": 1.0, "distancia": 10}] * 100
+    with caplog.at_level("INFO"):
+        client.post("/calcular/lote", json={"itens": itens})
+    registros = [r for r in caplog.records if r.name == "src.api.main"]
+    assert len(registros) == 1
+    assert "quantidade=100" in registros[0].getMessage()
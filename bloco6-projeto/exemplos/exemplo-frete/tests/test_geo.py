@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.services.geo import IndiceLocalidades, LocalDesconhecido, carregar_localidades, haversine_km
+
+client = TestClient(app)
+
+DADOS = Path(__file__).resolve().parents[1] / "data"
+
+def localidades_exemplo():
+    return carregar_localidades(DADOS / "localidades_exemplo.csv")
+
+def test_haversine_sao_paulo_rio():
+    # ~361 km em linha reta
+    assert 359 < haversine_km(-23.5505, -46.6333, -22.9068, -43.1729) < 363
+
+def test_cep_pelo_maior_prefixo():
+    indice = localidades_exemplo()
+    assert indice.nomes[indice.por_cep("01310-100")] == "São Paulo"
+    assert indice.nomes[indice.por_cep("69005-000")] == "Manaus"  # "690" antes de "69..."
+    assert indice.nomes[indice.por_cep("69301-110")] == "Boa Vista"
+    with pytest.raises(LocalDesconhecido):
+        indice.por_cep("99999-000")
+
+def test_vizinho_mais_proximo_igual_forca_bruta():
+    rng = np.random.default_rng(3)
+    lats, lons = rng.uniform(-33, 5, 20_000), rng.uniform(-74, -34, 20_000)
+    indice = IndiceLocalidades([str(k) for k in range(len(lats))], lats, lons)
+    for lat, lon in zip(rng.uniform(-35, 7, 200), rng.uniform(-76, -32, 200)):
+        assert indice.mais_proxima(lat, lon) == int(np.argmin(haversine_km(lat, lon, lats, lons)))
+
+def test_vizinho_mais_proximo_longe_da_base():
+    # Fora da área (ou no meio do oceano) a busca não abre anéis sem fim
+    rng = np.random.default_rng(5)
+    lats, lons = rng.uniform(-33, 5, 20_000), rng.uniform(-74, -34, 20_000)
+    indice = IndiceLocalidades([str(k) for k in range(len(lats))], lats, lons)
+    for lat, lon in [(60.0, 10.0), (89.0, 179.0), (-89.9, -179.9), (0.0, 0.0), (-20.0, -20.0)]:
+        assert indice.mais_proxima(lat, lon) == int(np.argmin(haversine_km(lat, lon, lats, lons)))
+
+def test_cache_de_pares_ignora_a_ordem():
+    indice = localidades_exemplo()
+    indice.distancia_km(0, 3)
+    indice.distancia_km(3, 0)
+    assert indice.info()["cache_pares"]["hits"] == 1
+
+def test_api_distancia_por_cep_e_coordenadas():
+    # São Paulo (CEP) -> Rio (coordenadas perto do centro): 361 km
+    payload = {"peso": 1.0, "origem": {"cep": "01310-100"}, "destino": {"lat": -22.91, "lon": -43.18}}
+    dados = client.post("/calcular", json=payload).json()
+    assert dados["distancia"] == 361
+    assert dados["valor_frete"] == 10.0 + 361 * 0.5
+
+def test_api_sem_distancia_nem_origem_destino():
+    assert client.post("/calcular", json={"peso": 1.0}).status_code == 422
+    assert client.post("/calcular", json={"peso": 1.0, "origem": {"cep": "01310-100"}, "destino": {}}).status_code == 422
+    cep_desconhecido = {"peso": 1.0, "origem": {"cep": "99999-000"}, "destino": {"cep": "20000-000"}}
+    assert client.post("/calcular", json=cep_desconhecido).status_code == 422
+
+def test_api_lote_mistura_distancia_e_origem_destino():
+    itens = [
+        {"peso": 1.0, "distancia": 100},
+        {"peso": 1.0, "origem": {"cep": "01310-100"}, "destino": {"cep": "20040-020"}},
+    ]
+    dados = client.post("/calcular/lote", json={"itens": itens}).json()
+    assert dados["distancias"] == [100, 361]
+    assert dados["valores_frete"] == [60.0, 10.0 + 361 * 0.5]
+
+def test_api_distancia_negativa_invalida():
+    assert client.post("/calcular", json={"peso": 1.0, "distancia": -5}).status_code == 422
+    assert client.post("/calcular/lote", json={"itens": [{"peso": 1.0, "distancia": -5}]}).status_code == 422
@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.services.frete import TabelaFrete, carregar_tabela, tabela_padrao
+
+client = TestClient(app)
+
+DADOS = Path(__file__).resolve().parents[1] / "data"
+
+def tabela_exemplo():
+    return carregar_tabela(DADOS / "tabela_frete_exemplo.csv", DADOS / "regioes_exemplo.csv")
+
+def test_matriz_igual_as_cotacoes_individuais():
+    tabela = tabela_exemplo()
+    pesos, distancias = (0.5, 3.0, 40.0), (10.0, 250.0, 4000.0)
+    matriz = json.loads(tabela.matriz(pesos, distancias, "NE").corpo)
+    assert matriz["versao"] == tabela.versao
+    assert matriz["valores"] == [[tabela.cotar(p, d, "NE") for d in distancias] for p in pesos]
+
+def test_matriz_gerada_uma_vez_por_versao_da_tabela():
+    tabela = tabela_exemplo()
+    assert tabela.matriz((1.0,), (100.0,)) is tabela.matriz((1.0,), (100.0,))
+    # Mesmo conteúdo: mesma versão; preço diferente: outra versão e outro ETag
+    assert tabela_exemplo().versao == tabela.versao
+    outra = TabelaFrete([float("inf")], [float("inf")], [1.0], [10.0], [0.5])
+    assert outra.versao != tabela_padrao().versao
+    assert outra.matriz((1.0,), (100.0,)).etag != tabela_padrao().matriz((1.0,), (100.0,)).etag
+
+def test_api_matriz_responde_304_com_o_mesmo_etag():
+    resposta = client.get("/tabela/matriz", params={"pesos": "1,5", "distancias": "100,500"})
+    assert resposta.status_code == 200
+    assert resposta.json()["valores"] == [[60.0, 260.0], [100.0, 300.0]]
+    etag = resposta.headers["etag"]
+    assert "max-age" in resposta.headers["cache-control"]
+
+    repetida = client.get("/tabela/matriz", params={"pesos": "1,5", "distancias": "100,500"}, headers={"If-None-Match": etag})
+    assert repetida.status_code == 304
+    assert repetida.content == b""
+    assert repetida.headers["etag"] == etag
+
+    outra_grade = client.get("/tabela/matriz", params={"pesos": "1", "distancias": "100"}, headers={"If-None-Match": etag})
+    assert outra_grade.status_code == 200
+    assert outra_grade.headers["etag"] != etag
+
+def test_api_matriz_grade_padrao_e_invalida():
+    padrao = client.get("/tabela/matriz").json()
+    assert len(padrao["valores"]) == len(padrao["pesos"])
+    assert client.get("/tabela/matriz", params={"pesos": "1,x"}).status_code == 422
+    for invalido in ["inf", "nan", "-1"]:
+        assert client.get("/tabela/matriz", params={"pesos": invalido, "distancias": "10"}).status_code == 422
+    assert client.get("/tabela/matriz", params={"pesos": ",".join(["1"] * 200), "distancias": ",".join(["1"] * 200)}).status_code == 422
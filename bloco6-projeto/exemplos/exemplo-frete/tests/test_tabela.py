@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.services.frete import ForaDaTabela, TabelaFrete, carregar_tabela, tabela_padrao
+
+client = TestClient(app)
+
+DADOS = Path(__file__).resolve().parents[1] / "data"
+
+def tabela_exemplo():
+    return carregar_tabela(DADOS / "tabela_frete_exemplo.csv", DADOS / "regioes_exemplo.csv")
+
+def test_tabela_busca_a_faixa_certa():
+    tabela = tabela_exemplo()
+    # até 1kg e até 100km: base 8,00
+    assert tabela.cotar(1.0, 100) == 8.0
+    # 1,01kg cai na faixa até 5kg: 12 + 2 + 1,01*2,5 + 101*0,30 = 46,825 → 46,83
+    assert tabela.cotar(1.01, 101) == 46.83
+    # acima da última faixa de peso ("inf")
+    assert tabela.cotar(500.0, 5000) == 55.0 + 15.0 + 500 * 1.6 + 5000 * 0.22
+
+def test_tabela_sobretaxa_regional():
+    tabela = tabela_exemplo()
+    assert tabela.cotar(1.0, 100, "N") == 10.0  # 8,00 + 25%
+    with pytest.raises(ForaDaTabela):
+        tabela.cotar(1.0, 100, "XX")
+
+def test_tabela_lote_igual_individual():
+    tabela = tabela_exemplo()
+    rng = np.random.default_rng(7)
+    pesos = rng.uniform(0.1, 80, 500).round(3)
+    distancias = rng.integers(0, 5000, 500)
+    regioes = rng.choice(["SE", "S", "CO", "NE", "N"], 500).tolist()
+    lote = tabela.cotar_lote(pesos, distancias, regioes)
+    assert lote.tolist() == [tabela.cotar(p, int(d), r) for p, d, r in zip(pesos.tolist(), distancias, regioes)]
+
+def test_tabela_cache_de_cotacoes():
+    tabela = tabela_exemplo()
+    for _ in range(5):
+        tabela.cotar(3.0, 250, "S")
+    assert tabela.info()["cache"]["hits"] == 4
+    assert tabela.info()["cache"]["misses"] == 1
+
+def test_tabela_incompleta_invalida(tmp_path):
+    faixas = tmp_path / "faixas.csv"
+    faixas.write_text("peso_ate,distancia_ate,base,por_kg,por_km\n1,100,5,0,0\n5,500,9,1,0.1\n")
+    with pytest.raises(ValueError):
+        carregar_tabela(faixas)
+
+def test_tabela_sem_ultima_faixa_infinita():
+    tabela = TabelaFrete([10.0], [100.0], [5.0], [1.0], [0.1])
+    with pytest.raises(ForaDaTabela):
+        tabela.cotar(11.0, 50)
+
+def test_tabela_recusa_valores_nao_finitos():
+    tabela = tabela_padrao()
+    for peso, distancia in [(float("inf"), 10), (float("nan"), 10), (1.0, float("inf")), (-1.0, 10)]:
+        with pytest.raises(ForaDaTabela):
+            tabela.cotar(peso, distancia)
+        with pytest.raises(ForaDaTabela):
+            tabela.cotar_lote([1.0, peso], [10, distancia])
+
+def test_api_peso_infinito_invalido():
+    # JSON não tem Infinity, mas o parser do Python aceita
+    corpo = '{"peso": Infinity, "distancia": 10}'
+    resposta = client.post("/calcular", content=corpo, headers={"Content-Type": "application/json"})
+    assert resposta.status_code == 422
+    assert client.post("/calcular", json={"peso": -1.0, "distancia": 10}).status_code == 422
+
+def test_api_regiao_desconhecida():
+    response = client.post("/calcular", json={"peso": 1.0, "distancia": 10, "regiao": "XX"})
+    assert response.status_code == 422
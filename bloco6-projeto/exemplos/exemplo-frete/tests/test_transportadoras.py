@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import src.api.main as main
+from src.api.main import app
+from src.services.stub_transportadoras import criar_stub
+from src.services.transportadoras import AgregadorCotacoes, ler_transportadoras
+
+def agregador_stub(transportadoras, prazo):
+    """Transportadoras do stub servidas em memória (ASGI), sem abrir portas"""
+    cliente = httpx.AsyncClient(transport=httpx.ASGITransport(app=criar_stub(transportadoras)), base_url="http://stub")
+    return AgregadorCotacoes(
+        ler_transportadoras(",".join(f"{nome}=http://stub/{nome}" for nome in transportadoras)),
+        cotar_local=main.tabela.cotar,
+        prazo=prazo,
+        cliente=cliente,
+    )
+
+def test_agregador_escolhe_a_mais_barata_no_prazo():
+    agregador = agregador_stub({"rapida": (1.1, 0.01), "barata": (0.9, 0.05), "lenta": (0.5, 2.0)}, prazo=0.3)
+    inicio = time.perf_counter()
+    resultado = asyncio.run(agregador.cotar(5.0, 100))
+    # A lenta (mais barata de todas) não espera: corte no prazo
+    assert time.perf_counter() - inicio < 1.0
+    assert (resultado.transportadora, resultado.valor_frete, resultado.fallback) == ("barata", 90.0, False)
+    assert {c.transportadora: c.status for c in resultado.cotacoes} == {"rapida": "ok", "barata": "ok", "lenta": "timeout"}
+    info = agregador.info()["transportadoras"]
+    assert info["lenta"]["timeouts"] == 1
+    assert info["barata"]["melhor_oferta"] == 1
+    assert info["rapida"]["latencia_media_ms"] > 0
+
+def test_agregador_sem_resposta_usa_a_formula_local():
+    agregador = agregador_stub({"lenta": (0.5, 2.0), "quebrada": (0, 0.0)}, prazo=0.1)
+    resultado = asyncio.run(agregador.cotar(5.0, 100))
+    assert (resultado.transportadora, resultado.valor_frete, resultado.fallback) == ("local", 100.0, True)
+    info = agregador.info()
+    assert info["fallbacks"] == 1
+    assert info["transportadoras"]["quebrada"]["erros"] == 1
+
+def test_transportadoras_invalidas():
+    with pytest.raises(ValueError):
+        ler_transportadoras("sem-url")
+    with pytest.raises(ValueError):
+        ler_transportadoras("a=http://x,a=http://y")
+    assert ler_transportadoras("") == []
+
+def test_api_cotar_transportadoras(monkeypatch):
+    monkeypatch.setattr(main, "agregador", agregador_stub({"rapida": (1.1, 0.0), "barata": (0.9, 0.0)}, prazo=0.5))
+    with TestClient(app) as cliente:
+        dados = cliente.post("/cotar/transportadoras", json={"peso": 5.0, "distancia": 100}).json()
+        assert (dados["transportadora"], dados["valor_frete"], dados["fallback"]) == ("barata", 90.0, False)
+        assert cliente.get("/transportadoras").json()["cotacoes"] == 1